@@ -3,19 +3,27 @@
 Audit Logger - Append-only audit log for government compliance
 """
 
-import json
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from config import AUDIT_LOG_PATH
+from record_codec import RecordPayload
+from storage_backends import StorageBackend, create_backend
 
 
 class AuditLogger:
-    """Append-only audit log for government compliance"""
+    """
+    Append-only audit log for government compliance
+    
+    Entries go to the configured StorageBackend: AUDIT_LOG_PATH (JSONL),
+    AUDIT_LOG_PACKED (RECORD_FORMAT = "msgpack") or the SQLite audit_log table
+    """
+    
+    _backend: StorageBackend = create_backend("audit")
     
     @staticmethod
-    def log_prediction(tx_input: Dict[str, Any], prediction: Dict[str, Any], prediction_id: str) -> None:
-        """Log to immutable JSONL audit trail"""
+    def log_prediction(tx_input: Dict[str, Any], prediction: Dict[str, Any], prediction_id: str,
+                       payload: Optional[RecordPayload] = None) -> None:
+        """Log to immutable audit trail (payload: input/output already serialized for the store)"""
         try:
             audit_entry = {
                 "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -26,7 +34,16 @@ class AuditLogger:
                 "trained_at": prediction.get("trained_at")
             }
             
-            with open(AUDIT_LOG_PATH, "a") as f:
-                f.write(json.dumps(audit_entry) + "\n")
+            line = payload.to_json(
+                head={k: audit_entry[k] for k in ("timestamp", "prediction_id")},
+                tail={k: audit_entry[k] for k in ("model_version", "trained_at")},
+                prediction_id=prediction_id
+            ) if payload is not None else None
+            AuditLogger._backend.append(audit_entry, line)
         except Exception as e:
             print(f"WARNING: Audit log write failed: {e}")
+    
+    @staticmethod
+    def close() -> None:
+        """Flush buffered writes (shutdown)"""
+        AuditLogger._backend.close()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Performance Benchmarks for the Fraud Detection Service
+Run: python benchmark.py
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+from config import RANDOM_SEED, MODEL_VERSION
+from entity_stats import EntityStatsTable
+from ollama_integration import SummaryGenerator
+from record_codec import MSGPACK_AVAILABLE, RecordWriter, read_records, _frames
+
+
+def _synthetic_awards(n_rows: int, n_suppliers: int) -> pd.DataFrame:
+    rng = np.random.default_rng(RANDOM_SEED)
+    return pd.DataFrame({
+        "supplier_name": [f"Supplier {i} Pte Ltd" for i in rng.integers(0, n_suppliers, n_rows)],
+        "awarded_amt": rng.lognormal(11, 2, n_rows),
+    })
+
+
+def _deep_size(obj, seen=None) -> int:
+    """Retained size of dict/list/str/float/ndarray graphs (shared objects counted once)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_size(vars(obj), seen)
+    return size
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+# ==================== ENTITY STATS ====================
+def bench_entity_stats(n_rows: int = 400_000, n_suppliers: int = 100_000, n_lookups: int = 10_000) -> None:
+    """Nested to_dict('index') vs interned EntityStatsTable"""
+    print("=" * 60)
+    print(f"ENTITY STATS: {n_rows} rows, {n_suppliers} suppliers, {n_lookups} lookups")
+    print("=" * 60)
+    df = _synthetic_awards(n_rows, n_suppliers)
+
+    def build_dict():
+        stats = df.groupby("supplier_name")["awarded_amt"].agg(["mean", "count"]).reset_index()
+        stats.columns = ["supplier_name", "supplier_avg_amt", "supplier_contract_count"]
+        return stats.set_index("supplier_name").to_dict("index")
+
+    legacy, legacy_build = _timed(build_dict)
+    table, table_build = _timed(lambda: EntityStatsTable.from_frame(df, "supplier_name", "awarded_amt"))
+    legacy_mem, table_mem = _deep_size(legacy), _deep_size(table)
+
+    names = df["supplier_name"].sample(n_lookups, random_state=RANDOM_SEED).tolist()
+    variants = [n.upper().replace(" Pte Ltd", " PTE. LTD.") for n in names]
+
+    _, legacy_exact = _timed(lambda: [legacy.get(n, {}).get("supplier_avg_amt", 0) for n in names])
+    legacy_hits = sum(1 for n in variants if legacy.get(n, {}).get("supplier_avg_amt", 0))
+    _, table_cold = _timed(lambda: table.lookup(names))
+    _, table_warm = _timed(lambda: table.lookup(names))
+    (mean, _, _), _ = _timed(lambda: table.lookup(variants))
+    table_hits = int(np.count_nonzero(mean))
+
+    print(f"  dict-of-dicts : {legacy_mem / 1e6:8.2f} MB retained, build {legacy_build * 1e3:7.1f} ms")
+    print(f"  EntityStats   : {table_mem / 1e6:8.2f} MB retained, build {table_build * 1e3:7.1f} ms "
+          f"(arrays {table.nbytes() / 1e6:.2f} MB)")
+    print(f"  memory ratio  : {legacy_mem / max(table_mem, 1):.1f}x smaller")
+    print(f"  batch lookup  : dict {legacy_exact / n_lookups * 1e6:.2f} us/name, "
+          f"table {table_cold / n_lookups * 1e6:.2f} us/name cold, {table_warm / n_lookups * 1e6:.2f} us/name cached")
+    print(f"  variant names : dict {legacy_hits}/{n_lookups} hits, table {table_hits}/{n_lookups} hits")
+
+
+# ==================== RECORD CODEC ====================
+def _synthetic_records(n_records: int, n_vendors: int = 2000) -> list:
+    """Store records shaped like /predict output (velocity, last payment and duplicate fragments included)"""
+    rng = np.random.default_rng(RANDOM_SEED)
+    agencies = ["PM Awas Yojana", "Health Ministry", "Ministry of Road Transport", "Smart Cities Mission"]
+    reasons = ["Suspiciously round amount", "High value contract", "AI detected unusual pattern (Isolation Forest)",
+               "Transaction at unusual hours (10 PM - 6 AM)"]
+    window = {"1h": {"count": 0, "sum": 0.0}, "24h": {"count": 1, "sum": 1250.0}, "30d": {"count": 4, "sum": 98000.0}}
+    records = []
+    for i in range(n_records):
+        vendor, agency = f"Vendor {rng.integers(n_vendors)} Pvt Ltd", agencies[rng.integers(len(agencies))]
+        fired = [r for r in reasons if rng.random() < 0.3]
+        if rng.random() < 0.2:
+            fired.append(f"Amount is {rng.uniform(3, 9):.1f} std devs above {agency} average")
+        output = {
+            "fraud_score": round(float(rng.random()), 3),
+            "risk_score": int(10 + 15 * len(fired)),
+            "is_anomaly": len(fired) >= 3,
+            "reasons": fired,
+            "model_version": MODEL_VERSION,
+            "trained_at": "2026-01-10T21:32:10.816758Z",
+            "velocity": {"vendor": window, "vendor_agency": window},
+            "last_payment": {"last_payment_at": None, "days_since_last": None, "source": None},
+            "duplicates": {"exact_duplicates": [], "exact_count": 0, "near_duplicates": [], "near_count": 0,
+                           "split_purchase": None},
+        }
+        output["summary"] = SummaryGenerator.generate_basic_summary(output)
+        records.append({
+            "prediction_id": f"PRED-2026011020{i // 60000 % 60:02d}{i // 1000 % 60:02d}{i % 1000:03d}{i % 997:03d}",
+            "timestamp": f"2026-01-10T20:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d}{i % 997:03d}Z",
+            "input": {"amount": round(float(rng.lognormal(11, 2)), 2), "agency": agency, "vendor": vendor,
+                      "transaction_time": None, "payment_behavior": "REGULAR", "timing_accuracy_days": None},
+            "output": output,
+        })
+    return records
+
+
+def bench_record_codec(n_records: int = 50_000) -> None:
+    """JSONL store records vs schema + dictionary coded msgpack frames"""
+    print("=" * 60)
+    print(f"RECORD CODEC: {n_records} prediction records")
+    print("=" * 60)
+    if not MSGPACK_AVAILABLE:
+        print("  msgpack not installed - skipped")
+        return
+    records = _synthetic_records(n_records)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path, packed_path = os.path.join(tmp, "store.jsonl"), os.path.join(tmp, "store.msgpack")
+
+        def write_jsonl():
+            for record in records:
+                with open(jsonl_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+        writer = RecordWriter(packed_path)
+        _, jsonl_write = _timed(write_jsonl)
+        _, packed_write = _timed(lambda: [writer.append(r) for r in records])
+
+        def parse_jsonl():
+            with open(jsonl_path) as f:
+                for line in f:
+                    json.loads(line)
+
+        # Streaming parse (records consumed one at a time, as the aggregates do)
+        _, jsonl_parse = _timed(parse_jsonl)
+        _, frame_parse = _timed(lambda: sum(1 for _ in _frames(packed_path)))
+        _, packed_parse = _timed(lambda: sum(1 for _ in read_records(packed_path)))
+        with open(jsonl_path) as f:
+            lossless = all(json.loads(line) == record for line, record in zip(f, read_records(packed_path)))
+        jsonl_bytes, packed_bytes = os.path.getsize(jsonl_path), os.path.getsize(packed_path)
+
+    per = lambda seconds: seconds / n_records * 1e6
+    print(f"  JSONL         : {jsonl_bytes / n_records:7.1f} bytes/record, write {per(jsonl_write):6.2f} us, "
+          f"parse {per(jsonl_parse):6.2f} us")
+    print(f"  msgpack codec : {packed_bytes / n_records:7.1f} bytes/record, write {per(packed_write):6.2f} us, "
+          f"parse {per(packed_parse):6.2f} us (frames only {per(frame_parse):.2f} us)")
+    print(f"  size ratio    : {jsonl_bytes / packed_bytes:.1f}x smaller")
+    print(f"  lossless      : {lossless}")
+
+
+if __name__ == "__main__":
+    bench_entity_stats()
+    print()
+    bench_record_codec()
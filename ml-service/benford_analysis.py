@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Benford Analysis - Population-level digit conformity per vendor and agency
+First-digit and first-two-digit counters maintained incrementally on every
+scored transaction; chi-square / MAD computed in O(1) from the counters
+"""
+
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+from config import BENFORD_CHECKPOINT, BENFORD_MIN_SAMPLES
+from entity_stats import normalize_name
+from rule_engine import first_digits
+from streaming import StreamingAggregate
+
+
+# ==================== BENFORD REFERENCE ====================
+FIRST_DIGITS = np.arange(1, 10)
+FIRST_TWO_DIGITS = np.arange(10, 100)
+P_FIRST = np.log10(1 + 1 / FIRST_DIGITS)
+P_FIRST_TWO = np.log10(1 + 1 / FIRST_TWO_DIGITS)
+
+# Nigrini MAD conformity bands: (upper bound, label)
+MAD_BANDS = {
+    1: [(0.006, "close"), (0.012, "acceptable"), (0.015, "marginal")],
+    2: [(0.0012, "close"), (0.0018, "acceptable"), (0.0022, "marginal")],
+}
+
+ENTITY_TYPES = ("vendor", "agency")
+
+
+def conformity_label(mad: float, digits: int = 1) -> str:
+    for bound, label in MAD_BANDS[digits]:
+        if mad <= bound:
+            return label
+    return "nonconformity"
+
+
+def _conformity(counts: np.ndarray, expected_p: np.ndarray) -> tuple:
+    """Row-wise (n, chi-square, MAD) for a (rows x bins) count matrix"""
+    counts = np.atleast_2d(counts).astype(np.float64)
+    n = counts.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+    expected = np.outer(safe_n, expected_p)
+    chi2 = np.sum(np.square(counts - expected) / expected, axis=1)
+    mad = np.mean(np.abs(counts / safe_n[:, None] - expected_p), axis=1)
+    return n, chi2, mad
+
+
+class _DigitCounters:
+    """Growable per-entity digit count matrices keyed by normalized name"""
+
+    def __init__(self, capacity: int = 64):
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.first = np.zeros((capacity, 9), dtype=np.int64)
+        self.first_two = np.zeros((capacity, 90), dtype=np.int64)
+
+    def row(self, name: str) -> int:
+        key = normalize_name(name)
+        i = self.index.get(key)
+        if i is None:
+            i = len(self.names)
+            self.index[key] = i
+            self.names.append(name)
+            if i >= len(self.first):
+                self.first = np.vstack([self.first, np.zeros_like(self.first)])
+                self.first_two = np.vstack([self.first_two, np.zeros_like(self.first_two)])
+        return i
+
+    def find(self, name: str) -> int:
+        return self.index.get(normalize_name(name), -1)
+
+    def used(self) -> tuple:
+        n = len(self.names)
+        return self.first[:n], self.first_two[:n]
+
+
+class BenfordTracker(StreamingAggregate):
+    """
+    Incremental Benford digit distributions per vendor and per agency
+
+    - O(1) update per scored transaction (two counter increments per entity)
+    - O(1) chi-square / MAD per entity from fixed-size counters
+    - Checkpointed to BENFORD_CHECKPOINT, rebuildable from the prediction store
+    """
+
+    name = "benford"
+
+    def __init__(self, checkpoint_path: Optional[str] = BENFORD_CHECKPOINT, **kwargs):
+        super().__init__(checkpoint_path, **kwargs)
+
+    def _reset(self) -> None:
+        self.counters = {entity: _DigitCounters() for entity in ENTITY_TYPES}
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        tx = record.get("input", {})
+        amount = tx.get("amount") or 0
+        if amount < 10:
+            return
+        d1 = int(first_digits([amount], 1)[0])
+        d2 = int(first_digits([amount], 2)[0])
+        for entity in ENTITY_TYPES:
+            name = tx.get(entity)
+            if not name:
+                continue
+            counters = self.counters[entity]
+            i = counters.row(name)
+            counters.first[i, d1 - 1] += 1
+            counters.first_two[i, d2 - 10] += 1
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {}
+        for entity, counters in self.counters.items():
+            first, first_two = counters.used()
+            arrays[f"{entity}_names"] = np.array(counters.names, dtype=str)
+            arrays[f"{entity}_first"] = first.copy()
+            arrays[f"{entity}_first_two"] = first_two.copy()
+        return arrays
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        for entity in ENTITY_TYPES:
+            counters = _DigitCounters(capacity=max(len(arrays[f"{entity}_names"]), 64))
+            for name in arrays[f"{entity}_names"].tolist():
+                counters.row(name)
+            n = len(counters.names)
+            counters.first[:n] = arrays[f"{entity}_first"]
+            counters.first_two[:n] = arrays[f"{entity}_first_two"]
+            self.counters[entity] = counters
+
+    # ----- queries -----
+    def entity_report(self, entity: str, name: str) -> Optional[Dict[str, Any]]:
+        """Digit distribution and conformity for one vendor/agency"""
+        with self._lock:
+            counters = self.counters[entity]
+            i = counters.find(name)
+            if i < 0:
+                return None
+            first = counters.first[i].copy()
+            first_two = counters.first_two[i].copy()
+            display = counters.names[i]
+
+        n, chi2_1, mad_1 = _conformity(first, P_FIRST)
+        _, chi2_2, mad_2 = _conformity(first_two, P_FIRST_TWO)
+        return {
+            "entity": entity,
+            "name": display,
+            "count": int(n[0]),
+            "first_digit": {
+                "observed": {str(d): int(c) for d, c in zip(FIRST_DIGITS, first)},
+                "expected_share": {str(d): round(float(p), 4) for d, p in zip(FIRST_DIGITS, P_FIRST)},
+                "chi_square": round(float(chi2_1[0]), 3),
+                "mad": round(float(mad_1[0]), 5),
+                "conformity": conformity_label(float(mad_1[0]), 1),
+            },
+            "first_two_digits": {
+                "chi_square": round(float(chi2_2[0]), 3),
+                "mad": round(float(mad_2[0]), 5),
+                "conformity": conformity_label(float(mad_2[0]), 2),
+            },
+            "sufficient_sample": bool(n[0] >= BENFORD_MIN_SAMPLES),
+        }
+
+    def ranking(self, entity: str = "vendor", digits: int = 1, limit: int = 20,
+                min_count: int = BENFORD_MIN_SAMPLES) -> List[Dict[str, Any]]:
+        """Least-conforming entities by MAD (ties broken by chi-square)"""
+        with self._lock:
+            counters = self.counters[entity]
+            first, first_two = counters.used()
+            counts = (first if digits == 1 else first_two).copy()
+            names = list(counters.names)
+
+        if not names:
+            return []
+        n, chi2, mad = _conformity(counts, P_FIRST if digits == 1 else P_FIRST_TWO)
+        eligible = np.flatnonzero(n >= min_count)
+        order = eligible[np.lexsort((-chi2[eligible], -mad[eligible]))][:limit]
+        return [{
+            "name": names[i],
+            "count": int(n[i]),
+            "chi_square": round(float(chi2[i]), 3),
+            "mad": round(float(mad[i]), 5),
+            "conformity": conformity_label(float(mad[i]), digits),
+        } for i in order]
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Chat Retrieval Index - Stored prediction context for PFMS Sahayak (/chat)
+Inverted index over vendor, agency, reason and summary terms, plus vendor / agency recognition in messages
+"""
+
+import re
+import time
+import numpy as np
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from config import CHAT_CONTEXT_MAX_RECORDS, CHAT_CONTEXT_MAX_CHARS, CHAT_MAX_ENTITIES, CHAT_MAX_CANDIDATES
+from entity_stats import normalize_name, RAW_CACHE_LIMIT
+from prediction_index import _Column
+from streaming import StreamingAggregate, record_epoch, iso_utc
+
+SECONDS_PER_DAY = 86400
+
+_WORD = re.compile(r"[a-z][a-z&]{2,}")
+
+# Words too generic to retrieve on (question phrasing, severity boilerplate from summaries)
+_STOPWORDS = {
+    "the", "and", "for", "with", "was", "were", "why", "what", "which", "who", "how", "when", "are", "has",
+    "have", "had", "did", "does", "this", "that", "these", "those", "from", "about", "any", "all", "show",
+    "tell", "list", "give", "last", "past", "week", "month", "today", "yesterday", "days", "day", "recent",
+    "recently", "vendor", "vendors", "agency", "agencies", "transaction", "transactions", "payment",
+    "payments", "risk", "score", "recommend", "human", "review", "appears", "normal", "low", "moderate",
+    "please", "can", "you", "me", "our", "its", "their", "there", "been", "being", "into", "than",
+}
+
+# Message words that ask for flagged records first
+_FLAG_WORDS = {"flagged", "flag", "flags", "anomaly", "anomalies", "anomalous", "suspicious", "risky", "high", "fraud"}
+
+_WINDOWS = [
+    (re.compile(r"\btoday\b"), 1),
+    (re.compile(r"\byesterday\b"), 2),
+    (re.compile(r"\b(?:last|past|this) week\b"), 7),
+    (re.compile(r"\b(?:last|past|this) month\b"), 31),
+    (re.compile(r"\b(?:last|past) year\b"), 366),
+]
+_LAST_N_DAYS = re.compile(r"\b(?:last|past) (\d{1,4}) days?\b")
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.casefold()) if w not in _STOPWORDS]
+
+
+def _contains(sorted_rows: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Membership mask of rows in an ascending posting list"""
+    if not len(sorted_rows):
+        return np.zeros(len(rows), dtype=bool)
+    position = np.minimum(np.searchsorted(sorted_rows, rows), len(sorted_rows) - 1)
+    return sorted_rows[position] == rows
+
+
+class ChatIndex(StreamingAggregate):
+    """
+    In-memory retrieval over stored predictions for chat grounding
+
+    - Per row: epoch, amount, risk_score, is_anomaly in numpy columns;
+      prediction_id for loading the few records shown
+    - Postings (term -> ascending row numbers) for vendor and
+      agency keys and for reason / summary words; appended on every save
+    - Entity recognition: token n-grams of the message looked up in the
+      normalize_name() tables of known vendors and agencies (longest match wins)
+    - context(message) returns a size-capped text block: per-entity aggregates
+      and the most relevant records, flagged and recent first; records are
+      ranked among the newest CHAT_MAX_CANDIDATES matches (aggregates use all)
+
+    Not checkpointed: rebuilt from the prediction store in one pass at startup.
+    """
+
+    name = "chat_index"
+
+    def __init__(self, load_record: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None, **kwargs):
+        self.load_record = load_record
+        super().__init__(None, **kwargs)
+
+    def _reset(self) -> None:
+        self.prediction_ids: List[str] = []
+        self.epochs = _Column(np.float64)
+        self.amounts = _Column(np.float64)
+        self.risk = _Column(np.int16)
+        self.anomaly = _Column(np.bool_)
+        # normalized name -> first-seen display name
+        self.names: Dict[str, Dict[str, str]] = {"vendor": {}, "agency": {}}
+        self.max_name_tokens = 1
+        self.postings: Dict[str, _Column] = {}
+        self._keys: Dict[Optional[str], str] = {}  # raw name -> normalize_name()
+
+    def _entity_key(self, entity: str, name: Optional[str]) -> str:
+        key = self._keys.get(name)
+        if key is None:
+            if len(self._keys) >= RAW_CACHE_LIMIT:
+                self._keys.clear()
+            key = self._keys[name] = normalize_name(name)
+        table = self.names[entity]
+        if key not in table:
+            table[key] = str(name or "UNKNOWN")
+            self.max_name_tokens = max(self.max_name_tokens, len(key.split()))
+        return key
+
+    def _post(self, term: str, row: int) -> None:
+        postings = self.postings.get(term)
+        if postings is None:
+            postings = self.postings[term] = _Column(np.int32, capacity=4)
+        if not postings.size or postings.data[postings.size - 1] != row:
+            postings.append(row)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        tx, output = record.get("input", {}), record.get("output", {})
+        row = len(self.prediction_ids)
+        vendor_key = self._entity_key("vendor", tx.get("vendor"))
+        agency_key = self._entity_key("agency", tx.get("agency"))
+
+        self.prediction_ids.append(record["prediction_id"])
+        self.epochs.append(record_epoch(record))
+        self.amounts.append(float(tx.get("amount") or 0.0))
+        self.risk.append(int(output.get("risk_score", 0)))
+        self.anomaly.append(bool(output.get("is_anomaly", False)))
+
+        self._post(f"vendor:{vendor_key}", row)
+        self._post(f"agency:{agency_key}", row)
+        text = " ".join(output.get("reasons", [])) + " " + str(output.get("summary", ""))
+        for word in set(_terms(text)):
+            self._post(f"word:{word}", row)
+
+    # ----- message analysis -----
+    def recognize(self, message: str) -> List[Tuple[str, str]]:
+        """(entity, normalized name) mentions in a message, longest n-gram first, left to right"""
+        tokens = normalize_name(message).split()
+        found, i = [], 0
+        with self._lock:
+            while i < len(tokens):
+                for n in range(min(self.max_name_tokens, len(tokens) - i), 0, -1):
+                    gram = " ".join(tokens[i:i + n])
+                    hits = [(entity, gram) for entity in ("vendor", "agency") if gram in self.names[entity]]
+                    if hits and (n > 1 or len(gram) > 2):
+                        found.extend(hit for hit in hits if hit not in found)
+                        i += n
+                        break
+                else:
+                    i += 1
+        return found[:CHAT_MAX_ENTITIES]
+
+    @staticmethod
+    def time_window(message: str) -> Optional[int]:
+        """Days covered by 'today', 'last week', 'past 30 days', ... (None = all time)"""
+        text = message.casefold()
+        match = _LAST_N_DAYS.search(text)
+        if match:
+            return int(match.group(1))
+        for pattern, days in _WINDOWS:
+            if pattern.search(text):
+                return days
+        return None
+
+    # ----- retrieval -----
+    def _rows(self, term: str) -> np.ndarray:
+        postings = self.postings.get(term)
+        return postings.view() if postings is not None else np.empty(0, dtype=np.int32)
+
+    def retrieve(self, message: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Matched entities with aggregates, plus the top record rows for a message"""
+        now = time.time() if now is None else now
+        entities = self.recognize(message)
+        entity_words = {w for _, name in entities for w in name.split()}
+        days = self.time_window(message)
+        wants_flagged = bool(_FLAG_WORDS & set(_WORD.findall(message.casefold())))
+
+        with self._lock:
+            words = [w for w in dict.fromkeys(_terms(message))
+                     if w not in entity_words and f"word:{w}" in self.postings]
+            if not entities and not words:
+                return {"entities": [], "words": [], "days": days, "rows": []}
+            epochs, risk = self.epochs.view(), self.risk.view()
+            anomaly, amounts = self.anomaly.view(), self.amounts.view()
+            since = now - days * SECONDS_PER_DAY if days else float("-inf")
+
+            # Candidates: rows of every mentioned vendor / agency (intersected across types), else word matches
+            candidates = None
+            for entity in ("vendor", "agency"):
+                mentioned = [self._rows(f"{entity}:{name}") for e, name in entities if e == entity]
+                if mentioned:
+                    rows = mentioned[0] if len(mentioned) == 1 else np.unique(np.concatenate(mentioned))
+                    candidates = rows if candidates is None else candidates[_contains(rows, candidates)]
+            if candidates is None:
+                # Postings ascend with time: the newest matches are each list's tail
+                candidates = np.unique(np.concatenate([self._rows(f"word:{w}")[-CHAT_MAX_CANDIDATES:] for w in words]))
+            candidates = candidates[-CHAT_MAX_CANDIDATES:]
+            candidates = candidates[epochs[candidates] >= since]
+
+            aggregates = []
+            for entity, name in entities:
+                rows = self._rows(f"{entity}:{name}")
+                rows = rows[epochs[rows] >= since]
+                aggregates.append({
+                    "entity": entity,
+                    "name": self.names[entity][name],
+                    "predictions": int(len(rows)),
+                    "flagged": int(anomaly[rows].sum()),
+                    "mean_risk": round(float(risk[rows].mean()), 1) if len(rows) else None,
+                    "total_amount": float(amounts[rows].sum()),
+                    "last_seen": iso_utc(float(epochs[rows].max())) if len(rows) else None,
+                })
+
+            # Rank: word matches, then flagged (if asked), then risk, then recency
+            matches = np.zeros(len(candidates), dtype=np.int32)
+            for w in words:
+                matches += _contains(self._rows(f"word:{w}"), candidates)
+            flagged = anomaly[candidates] if wants_flagged else np.zeros(len(candidates), dtype=np.bool_)
+            order = np.lexsort((epochs[candidates], risk[candidates], flagged, matches))[::-1]
+            top = candidates[order[:CHAT_CONTEXT_MAX_RECORDS]]
+            prediction_ids = [self.prediction_ids[r] for r in top.tolist()]
+
+        return {
+            "entities": aggregates,
+            "words": words,
+            "days": days,
+            "matched": int(len(candidates)),
+            "rows": prediction_ids,
+        }
+
+    def context(self, message: str, now: Optional[float] = None,
+                max_chars: int = CHAT_CONTEXT_MAX_CHARS) -> Tuple[Optional[str], Dict[str, Any], List[str]]:
+        """
+        Compact context block for the chat prompt (None when nothing matches), the retrieval
+        result, and the prediction IDs whose records made it into the block
+        """
+        retrieval = self.retrieve(message, now)
+        if not retrieval["entities"] and not retrieval["rows"]:
+            return None, retrieval, []
+
+        scope = f"last {retrieval['days']} days" if retrieval["days"] else "all stored predictions"
+        # (line, prediction ID it cites or None)
+        lines = [(f"Stored prediction data ({scope}, {retrieval.get('matched', 0)} matching records):", None)]
+        for agg in retrieval["entities"]:
+            if not agg["predictions"]:
+                lines.append((f"- {agg['entity'].title()} {agg['name']}: no stored predictions in scope", None))
+                continue
+            lines.append((
+                f"- {agg['entity'].title()} {agg['name']}: {agg['predictions']} predictions, {agg['flagged']} flagged, "
+                f"mean risk {agg['mean_risk']}, total ₹{agg['total_amount']:,.2f}, last {agg['last_seen'][:10]}", None
+            ))
+        if retrieval["rows"] and self.load_record is not None:
+            lines.append(("Most relevant records:", None))
+            for prediction_id in retrieval["rows"]:
+                record = self.load_record(prediction_id)
+                if not record:
+                    continue
+                tx, output = record["input"], record["output"]
+                flag = "FLAGGED" if output.get("is_anomaly") else "not flagged"
+                reasons = "; ".join(output.get("reasons", [])) or "no risk indicators"
+                lines.append((
+                    f"- {record['timestamp'][:10]} {prediction_id}: {tx.get('vendor')} / {tx.get('agency')}, "
+                    f"₹{float(tx.get('amount') or 0):,.2f}, risk {output.get('risk_score')} ({flag}): {reasons}",
+                    prediction_id
+                ))
+
+        # Whole lines only, within the character budget
+        block, sources, size = [], [], 0
+        for line, prediction_id in lines:
+            if size + len(line) + 1 > max_chars:
+                break
+            block.append(line)
+            size += len(line) + 1
+            if prediction_id is not None:
+                sources.append(prediction_id)
+        return "\n".join(block), retrieval, sources
+
+    def nbytes(self) -> int:
+        columns = [self.epochs, self.amounts, self.risk, self.anomaly, *self.postings.values()]
+        return sum(column.data.nbytes for column in columns)
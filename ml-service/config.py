@@ -6,5 +6,199 @@ Configuration Constants for Fraud Detection Service
 # ==================== DETERMINISTIC CONFIGURATION ====================
 RANDOM_SEED = 42
 MODEL_VERSION = "FraudEngine-v2.5-Full-Ollama"
+# FraudEngine training parameters (train_sample_size None = train on the full dataset)
+ENGINE_PARAMS = {"n_estimators": 300, "contamination": 0.03, "train_sample_size": 10000}
 AUDIT_LOG_PATH = "fraud_predictions_audit.jsonl"
 PREDICTIONS_STORE = "predictions_store.jsonl"
+
+# Record encoding for the prediction store and audit log: "jsonl" or "msgpack"
+# (compact binary, needs the msgpack package; export with `python record_codec.py <file>`)
+RECORD_FORMAT = "jsonl"
+AUDIT_LOG_PACKED = "fraud_predictions_audit.msgpack"
+PREDICTIONS_STORE_PACKED = "predictions_store.msgpack"
+
+# Storage backend for predictions + audit log: "jsonl" (files above, per RECORD_FORMAT)
+# or "sqlite" (embedded WAL database; migrate with `python storage_backends.py migrate`)
+STORAGE_BACKEND = "jsonl"
+SQLITE_PATH = "ml_service.sqlite3"
+SQLITE_BATCH_SIZE = 64  # rows per insert transaction
+SQLITE_FLUSH_SECONDS = 0.5  # max time a buffered row waits before commit
+
+# ==================== ENTITY NAMES ====================
+# Alternative spellings resolved onto an existing entity's statistics (normalize_name
+# already folds case, punctuation and company forms): alias -> canonical name as trained
+ENTITY_ALIASES = {
+    "supplier": {},
+    "agency": {},
+}
+
+# ==================== STREAMING STATE ====================
+# Aggregates maintained from the prediction stream checkpoint every N records
+STATE_CHECKPOINT_EVERY = 200
+BENFORD_CHECKPOINT = "benford_counters.npz"
+BENFORD_MIN_SAMPLES = 30  # Below this, digit tests are not meaningful
+
+# Velocity sliding windows: name -> (span seconds, ring buffer buckets)
+VELOCITY_WINDOWS = {
+    "1h": (3600, 12),
+    "24h": (24 * 3600, 24),
+    "30d": (30 * 24 * 3600, 30),
+}
+VELOCITY_MAX_ENTITIES = 20000  # LRU bound per key type (vendor, vendor x agency)
+
+LAST_PAYMENT_CHECKPOINT = "last_payment.npz"
+
+# Duplicate / split-purchase index (in-memory, bounded by window eviction)
+DUPLICATE_WINDOW_SECONDS = 72 * 3600
+NEAR_DUPLICATE_TOLERANCE = 0.01  # Relative amount difference treated as near-duplicate
+SPLIT_THRESHOLD = 100_000  # Approval threshold that split purchases stay under
+SPLIT_MIN_FRACTION = 0.25  # Only payments >= 25% of the threshold count toward a split
+SPLIT_WINDOW_SECONDS = 30 * 24 * 3600
+SPLIT_MIN_COUNT = 2
+
+# Amount quantile sketches (t-digest): global + per agency
+QUANTILE_COMPRESSION = 200  # Centroid budget per digest (accuracy vs. memory)
+QUANTILE_BUFFER_SIZE = 500  # Online values buffered before a compression pass
+QUANTILE_ONLINE_UPDATES = False  # Fold scored traffic into the training sketches
+QUANTILE_SNAPSHOT = "amount_quantiles.npz"  # Written at shutdown for offline analysis
+
+# Heavy hitters (Space-Saving top-K): window name -> (span seconds, time buckets)
+HEAVY_HITTER_WINDOWS = {
+    "24h": (24 * 3600, 24),
+    "7d": (7 * 24 * 3600, 7),
+}
+HEAVY_HITTER_CAPACITY = 100  # Counters per summary; estimate error <= total / capacity
+
+# Daily rollups per (agency, day) and (vendor, day) for dashboard time series
+ROLLUP_CHECKPOINT = "daily_rollups.npz"
+ROLLUP_RISK_BINS = 10  # Equal-width risk score bins over 0-100
+ROLLUP_FRAUD_BINS = 10  # Equal-width fraud score bins over 0-1
+
+# Vendor x agency award graph for the network risk layers and /network analytics
+NETWORK_CHECKPOINT = "vendor_agency_network.npz"
+NETWORK_CLUSTER_MAX_AGENCIES = 3  # Clusters: vendors sharing one exact set of 2..3 agencies
+
+# ==================== DRIFT MONITORING ====================
+# Live feature / fraud_score histograms vs. training reference (drift_monitor.py)
+DRIFT_BINS = 10  # Training deciles per series
+# Inference fills agency_contract_count, year and month with fixed placeholders,
+# so only the features computed from each request are monitored (plus fraud_score)
+DRIFT_FEATURES = ["awarded_amt", "log_amount", "supplier_avg_amt", "supplier_contract_count", "agency_avg_amt"]
+DRIFT_WINDOWS = {
+    "1h": (3600, 12),
+    "24h": (24 * 3600, 24),
+    "7d": (7 * 24 * 3600, 7),
+}
+DRIFT_MIN_SAMPLES = 200  # Below this a window reports insufficient_data
+DRIFT_PSI_WARN = 0.1
+DRIFT_PSI_ALERT = 0.25
+# Optional: retrain in the background when DRIFT_RETRAIN_WINDOW crosses DRIFT_PSI_ALERT
+DRIFT_RETRAIN_ENABLED = False
+DRIFT_RETRAIN_WINDOW = "24h"
+DRIFT_CHECK_EVERY = 500  # Scored rows between threshold checks
+DRIFT_RETRAIN_COOLDOWN = 24 * 3600
+# A retrain fits stored predictions from DRIFT_RETRAIN_WINDOW plus this many training
+# rows per recent record, so the new reference follows live traffic (skipped below
+# DRIFT_MIN_SAMPLES recent records)
+DRIFT_RETRAIN_HISTORY_RATIO = 1.0
+
+# ==================== SHADOW SCORING ====================
+# Candidate engine scored off the request path on a sample of traffic (shadow.py);
+# never affects the primary response
+SHADOW_ENABLED = False
+SHADOW_MODEL_VERSION = "FraudEngine-v2.6-Shadow"
+SHADOW_ENGINE_PARAMS = {"n_estimators": 500, "contamination": 0.02, "train_sample_size": None}
+SHADOW_SAMPLE_RATE = 0.1
+SHADOW_QUEUE_SIZE = 1000  # Samples beyond this are dropped, not queued
+SHADOW_BATCH_SIZE = 64  # Queued samples scored per shadow pass
+
+# ==================== SIMILAR TRANSACTIONS ====================
+# kNN over scaled feature vectors of stored (and training) transactions (similarity_index.py);
+# same request-computed features as drift monitoring
+SIMILARITY_FEATURES = DRIFT_FEATURES
+SIMILARITY_INCLUDE_TRAINING = True
+SIMILARITY_BATCH_SIZE = 4096  # Saved inputs vectorized per pass
+SIMILARITY_REBUILD_EVERY = 20000  # Rows outside the KD-tree before it is rebuilt (in the background)
+SIMILARITY_LEAF_SIZE = 40
+SIMILARITY_MAX_K = 100
+
+# ==================== CHAT RETRIEVAL ====================
+# Stored-prediction context injected into /chat prompts (chat_index.py);
+# bounded so prompt size (and LLM latency) stays flat as the store grows
+CHAT_CONTEXT_MAX_RECORDS = 5
+CHAT_CONTEXT_MAX_CHARS = 1500
+CHAT_MAX_ENTITIES = 3
+CHAT_MAX_CANDIDATES = 5000  # Newest matching records ranked per message
+
+# ==================== MICRO-BATCHING ====================
+# Coalesce concurrent /predict calls into one FraudEngine.predict_batch pass
+# (micro_batcher.py); adds up to MICRO_BATCH_MAX_WAIT_MS of latency per request
+MICRO_BATCH_ENABLED = False
+MICRO_BATCH_MAX_SIZE = 64
+MICRO_BATCH_MAX_WAIT_MS = 3.0
+MICRO_BATCH_TIMEOUT_S = 30.0  # submit() gives up on a request not scored within this
+
+# ==================== RISK RULES ====================
+# Declarative risk layers evaluated by rule_engine.RuleEngine, in this order.
+# "condition" names a function registered in rule_engine.CONDITIONS, "params"
+# are passed to it, and "reason" is formatted with per-transaction context fields.
+BASE_RISK_SCORE = 10
+RISK_RULES = [
+    # Layer 1: Agency statistical outlier
+    {"name": "agency_zscore", "condition": "zscore_above", "params": {"threshold": 3},
+     "weight": 40, "reason": "Amount is {z:.1f} std devs above {agency} average", "enabled": True},
+    # Layer 2: Supplier pattern deviation
+    {"name": "supplier_deviation", "condition": "supplier_multiple", "params": {"factor": 3},
+     "weight": 25, "reason": "Amount 3x higher than {vendor} typical contracts", "enabled": True},
+    # Layer 3: Global extreme
+    {"name": "global_extreme", "condition": "above_global_99th", "params": {},
+     "weight": 30, "reason": "Amount in global top 1%", "enabled": True},
+    # Layer 3b: Agency percentile (robust to heavy tails, t-digest sketch per agency)
+    {"name": "agency_percentile", "condition": "above_agency_quantile", "params": {"field": "agency_p99", "min_count": 100},
+     "weight": 20, "reason": "Amount above {agency} 99th percentile ({agency_p99:,.0f})", "enabled": False},
+    # Layer 4: AI anomaly (Isolation Forest)
+    {"name": "isolation_forest", "condition": "isolation_forest_outlier", "params": {},
+     "weight": 25, "reason": "AI detected unusual pattern (Isolation Forest)", "enabled": True},
+    # Layer 5: Autoencoder anomaly
+    {"name": "autoencoder", "condition": "reconstruction_error_above", "params": {"threshold": 0.5},
+     "weight": 20, "reason": "Deep learning detected subtle anomaly (Autoencoder)", "enabled": True},
+    # Layer 6: Forensic heuristics
+    {"name": "round_amount", "condition": "round_amount", "params": {"min_amount": 10000, "unit": 1000},
+     "weight": 15, "reason": "Suspiciously round amount", "enabled": True},
+    {"name": "high_value", "condition": "amount_above", "params": {"threshold": 5_000_000},
+     "weight": 10, "reason": "High value contract", "enabled": True},
+    # Layer 7: Benford's Law
+    {"name": "benford_first_digit", "condition": "first_digit_at_least", "params": {"digit": 8, "min_amount": 10},
+     "weight": 15, "reason": "First digit {first_digit} violates Benford's Law", "enabled": True},
+    # Layer 8: Time-based
+    {"name": "night_hours", "condition": "hour_outside", "params": {"start": 6, "end": 22},
+     "weight": 20, "reason": "Transaction at unusual hours (10 PM - 6 AM)", "enabled": True},
+    {"name": "late_evening", "condition": "hour_within", "params": {"start": 18, "end": 22},
+     "weight": 10, "reason": "Transaction during late evening", "enabled": True},
+    # Layer 9: Payment behavior
+    {"name": "quarterly_frequency", "condition": "days_since_last_below", "params": {"behavior": "QUARTERLY", "days": 85},
+     "weight": 35, "reason": "Payment frequency (days={days_since_last}) violates QUARTERLY schedule", "enabled": True},
+    {"name": "daily_frequency", "condition": "days_since_last_below", "params": {"behavior": "REGULAR", "days": 2},
+     "weight": 15, "reason": "High frequency payment (Daily)", "enabled": True},
+    # Layer 10: Velocity (live sliding windows, prior payments only)
+    {"name": "vendor_burst_1h", "condition": "feature_at_least", "params": {"field": "vendor_count_1h", "threshold": 20},
+     "weight": 20, "reason": "{vendor_count_1h} payments to {vendor} in the last hour", "enabled": True},
+    {"name": "pair_burst_24h", "condition": "feature_at_least", "params": {"field": "pair_count_24h", "threshold": 10},
+     "weight": 15, "reason": "{pair_count_24h} payments from {agency} to {vendor} in the last 24 hours", "enabled": True},
+    {"name": "vendor_volume_spike", "condition": "volume_spike", "params": {"ratio": 5, "min_count_30d": 10},
+     "weight": 15, "reason": "24h volume to {vendor} is {vendor_volume_ratio:.1f}x its 30-day daily average", "enabled": True},
+    # Layer 11: Duplicate and split-purchase findings (see DUPLICATE_* / SPLIT_* above)
+    {"name": "exact_duplicate", "condition": "feature_at_least", "params": {"field": "exact_duplicate_count", "threshold": 1},
+     "weight": 30, "reason": f"Duplicate payment: same amount paid to {{vendor}} by {{agency}} {{exact_duplicate_count}} time(s) in the last {DUPLICATE_WINDOW_SECONDS / 3600:g} hours", "enabled": True},
+    {"name": "near_duplicate", "condition": "feature_at_least", "params": {"field": "near_duplicate_count", "threshold": 1},
+     "weight": 15, "reason": f"Near-duplicate payment: {{near_duplicate_count}} payment(s) to {{vendor}} within {NEAR_DUPLICATE_TOLERANCE * 100:g}% of this amount in the last {DUPLICATE_WINDOW_SECONDS / 3600:g} hours", "enabled": True},
+    {"name": "split_purchase", "condition": "feature_at_least", "params": {"field": "split_cluster_count", "threshold": 1},
+     "weight": 25, "reason": "Possible split purchase: {split_cluster_count} sub-threshold payments to {vendor} from {agency} total {split_cluster_total:,.0f}", "enabled": True},
+    # Layer 12: Vendor-agency network structure (network.py; opt-in)
+    {"name": "agency_concentration", "condition": "agency_concentration", "params": {"hhi": 0.5, "min_share": 0.5, "min_contracts": 20},
+     "weight": 15, "reason": "{agency} spend is concentrated (HHI {agency_hhi:.2f}); {vendor} holds {vendor_agency_share:.0%} of it", "enabled": False},
+    {"name": "captive_vendor", "condition": "captive_vendor", "params": {"max_agencies": 1, "min_contracts": 10},
+     "weight": 10, "reason": "{vendor} has won only from {vendor_fan_in} agency(ies) across {vendor_network_contracts} contracts", "enabled": False},
+    {"name": "closed_cluster", "condition": "feature_at_least", "params": {"field": "cluster_vendors", "threshold": 3},
+     "weight": 15, "reason": "{vendor} is one of {cluster_vendors} suppliers that only win from the same {cluster_agencies} agencies", "enabled": False},
+]
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Drift Monitor - Live feature / fraud_score distributions vs. the training reference
+Training-time decile histograms, rolling-window live histograms, PSI and binned KS
+"""
+
+import time
+import threading
+import numpy as np
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from config import (
+    DRIFT_BINS, DRIFT_FEATURES, DRIFT_WINDOWS, DRIFT_MIN_SAMPLES, DRIFT_PSI_WARN, DRIFT_PSI_ALERT,
+    DRIFT_RETRAIN_WINDOW, DRIFT_CHECK_EVERY, DRIFT_RETRAIN_COOLDOWN
+)
+
+SCORE = "fraud_score"
+_EPSILON = 1e-4  # Smoothing for empty bins in PSI
+
+
+class DriftReference:
+    """
+    Training distribution of each model feature and of fraud_score
+
+    Bins are the training quantiles (equal reference mass, duplicates merged),
+    so every series is compared on the bins where its training data lives.
+    """
+
+    def __init__(self, names: List[str], edges: List[np.ndarray], proportions: np.ndarray, samples: int):
+        self.names = names
+        self.edges = edges  # inner edges per series; len(edges[i]) + 1 bins
+        self.proportions = proportions  # (series, DRIFT_BINS) padded with zeros
+        self.samples = samples
+
+    @classmethod
+    def from_training(cls, X: np.ndarray, feature_names: List[str], scores: np.ndarray,
+                      bins: int = DRIFT_BINS) -> "DriftReference":
+        columns = np.column_stack([np.asarray(X, dtype=np.float64), scores])
+        names = list(feature_names) + [SCORE]
+        qs = np.linspace(0, 1, bins + 1)[1:-1]
+        edges, proportions = [], np.zeros((len(names), bins))
+        for i in range(len(names)):
+            inner = np.unique(np.quantile(columns[:, i], qs))
+            counts = np.bincount(np.searchsorted(inner, columns[:, i], side="right"), minlength=inner.size + 1)
+            edges.append(inner)
+            proportions[i, :counts.size] = counts / max(len(columns), 1)
+        return cls(names, edges, proportions, len(columns))
+
+    def bin(self, columns: np.ndarray, series: List[int]) -> np.ndarray:
+        """(n, len(series)) bin indices of live values"""
+        return np.column_stack([
+            np.searchsorted(self.edges[s], columns[:, j], side="right") for j, s in enumerate(series)
+        ])
+
+
+def psi(live: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Population stability index per row: sum((p - q) * ln(p / q))"""
+    return ((live - reference) * np.log((live + _EPSILON) / (reference + _EPSILON))).sum(axis=1)
+
+
+def binned_ks(live: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """Kolmogorov-Smirnov distance per row, evaluated at the bin edges"""
+    return np.abs(np.cumsum(live, axis=1) - np.cumsum(reference, axis=1)).max(axis=1)
+
+
+class DriftMonitor:
+    """
+    Rolling-window live histograms for the monitored features + fraud_score
+
+    - FraudEngine batch observer: each scored batch costs one searchsorted per
+      series and one scatter-add per window (no store rescans)
+    - Each window is a ring of time buckets, each a (series x bins) count matrix
+    - report(window) compares the merged buckets with the training reference
+    - Optional on_drift(report) callback when the retrain window's max PSI
+      crosses DRIFT_PSI_ALERT (checked every DRIFT_CHECK_EVERY rows, with cooldown)
+    """
+
+    def __init__(self, reference: DriftReference, features: Optional[List[str]] = None,
+                 windows: Optional[Dict[str, Tuple[float, int]]] = None,
+                 on_drift: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.windows = dict(DRIFT_WINDOWS if windows is None else windows)
+        self.on_drift = on_drift
+        self._lock = threading.Lock()
+        self._last_trigger = float("-inf")  # cooldown spans reference swaps
+        self.set_reference(reference, DRIFT_FEATURES if features is None else features)
+
+    def set_reference(self, reference: DriftReference, features: Optional[List[str]] = None) -> None:
+        """Compare against a new training reference (after retraining); live windows restart"""
+        features = [name for name in (features or self.names[:-1]) if name in reference.names]
+        with self._lock:
+            self.reference = reference
+            self.names = features + [SCORE]
+            self.series = [reference.names.index(name) for name in self.names]
+            self.bins = reference.proportions.shape[1]
+            self.rings = {
+                name: (np.full(buckets, -1, dtype=np.int64), np.zeros((buckets, len(self.series), self.bins), dtype=np.int64))
+                for name, (_, buckets) in self.windows.items()
+            }
+            self.observed = 0
+            self._since_check = 0
+
+    def observe_batch(self, X: np.ndarray, scores: np.ndarray, *_, now: Optional[float] = None) -> None:
+        """FraudEngine batch observer: X is the raw (unscaled) feature matrix"""
+        now = time.time() if now is None else now
+        columns = np.column_stack([X, scores])
+        n = len(columns)
+        with self._lock:
+            bins = self.reference.bin(columns[:, self.series], list(self.series))
+            rows = np.broadcast_to(np.arange(len(self.series)), bins.shape)
+            for name, (span, buckets) in self.windows.items():
+                epochs, counts = self.rings[name]
+                epoch = int(now // (span / buckets))
+                slot = epoch % buckets
+                if epochs[slot] != epoch:
+                    epochs[slot] = epoch
+                    counts[slot] = 0
+                np.add.at(counts[slot], (rows, bins), 1)
+            self.observed += n
+            self._since_check += n
+            check = self.on_drift is not None and self._since_check >= DRIFT_CHECK_EVERY
+            if check:
+                self._since_check = 0
+
+        if check:
+            self._maybe_trigger(now)
+
+    def _live_counts(self, window: str, now: float) -> np.ndarray:
+        span, buckets = self.windows[window]
+        current = int(now // (span / buckets))
+        epochs, counts = self.rings[window]
+        valid = (epochs > current - buckets) & (epochs <= current)
+        return counts[valid].sum(axis=0)
+
+    def report(self, window: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """PSI / KS per monitored series over one rolling window"""
+        now = time.time() if now is None else now
+        with self._lock:
+            counts = self._live_counts(window, now)
+            reference = self.reference.proportions[self.series]
+        samples = int(counts[0].sum()) if len(counts) else 0
+        live = counts / max(samples, 1)
+        psi_values = psi(live, reference)
+        ks_values = binned_ks(live, reference)
+        enough = samples >= DRIFT_MIN_SAMPLES
+
+        def status(value: float) -> str:
+            if not enough:
+                return "insufficient_data"
+            if value >= DRIFT_PSI_ALERT:
+                return "drift"
+            return "warning" if value >= DRIFT_PSI_WARN else "stable"
+
+        series = {
+            name: {"psi": round(float(p), 4), "ks": round(float(k), 4), "status": status(p)}
+            for name, p, k in zip(self.names, psi_values, ks_values)
+        }
+        return {
+            "window": window,
+            "samples": samples,
+            "min_samples": DRIFT_MIN_SAMPLES,
+            "reference_samples": self.reference.samples,
+            "max_psi": round(float(psi_values.max()), 4) if enough else None,
+            "drifted": [name for name, s in series.items() if s["status"] == "drift"],
+            "series": series,
+        }
+
+    def _maybe_trigger(self, now: float) -> None:
+        report = self.report(DRIFT_RETRAIN_WINDOW, now)
+        if not report["drifted"] or now - self._last_trigger < DRIFT_RETRAIN_COOLDOWN:
+            return
+        self._last_trigger = now
+        print(f"[DRIFT] {report['drifted']} drifted over {DRIFT_RETRAIN_WINDOW} (max PSI {report['max_psi']})")
+        try:
+            self.on_drift(report)
+        except Exception as e:
+            print(f"WARNING: Drift callback failed: {e}")
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Duplicate Index - Near-duplicate and split-purchase detection over recent transactions
+Time-bucketed hash index keyed by (vendor, agency, amount bucket); O(matches) per request
+"""
+
+import math
+import time
+import numpy as np
+from collections import deque
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Deque
+
+from config import (
+    DUPLICATE_WINDOW_SECONDS, NEAR_DUPLICATE_TOLERANCE, SPLIT_THRESHOLD,
+    SPLIT_MIN_FRACTION, SPLIT_WINDOW_SECONDS, SPLIT_MIN_COUNT
+)
+from entity_stats import normalize_name
+from streaming import StreamingAggregate, record_epoch
+
+MAX_REPORTED_MATCHES = 10
+
+# (timestamp, amount, prediction_id)
+_Entry = Tuple[float, float, str]
+
+
+class DuplicateIndex(StreamingAggregate):
+    """
+    Recent-transaction index for duplicate and split-purchase findings
+
+    - Duplicates: same (vendor, agency) with an identical amount, or one within
+      NEAR_DUPLICATE_TOLERANCE, inside DUPLICATE_WINDOW_SECONDS. Amounts are hashed
+      into log-width buckets so only the matching and adjacent buckets are probed.
+    - Split purchases: near-threshold payments (>= SPLIT_MIN_FRACTION of SPLIT_THRESHOLD,
+      below it) from the same (vendor, agency) inside SPLIT_WINDOW_SECONDS whose
+      running total, including the current one, reaches SPLIT_THRESHOLD.
+    - Memory bounded by window eviction; warmed from the prediction store at startup
+    """
+
+    name = "duplicates"
+
+    def __init__(self, duplicate_window: float = DUPLICATE_WINDOW_SECONDS,
+                 tolerance: float = NEAR_DUPLICATE_TOLERANCE,
+                 split_threshold: float = SPLIT_THRESHOLD,
+                 split_min_fraction: float = SPLIT_MIN_FRACTION,
+                 split_window: float = SPLIT_WINDOW_SECONDS,
+                 split_min_count: int = SPLIT_MIN_COUNT):
+        self.duplicate_window = duplicate_window
+        self.tolerance = tolerance
+        # Matches are relative to the larger amount, so ratios reach 1 / (1 - tolerance);
+        # a bucket that wide keeps every match within one bucket of the amount
+        self.bucket_width = -math.log1p(-tolerance)
+        self.split_threshold = split_threshold
+        self.split_floor = split_threshold * split_min_fraction
+        self.split_window = split_window
+        self.split_min_count = split_min_count
+        super().__init__(checkpoint_path=None)
+
+    def _reset(self) -> None:
+        self.buckets: Dict[Tuple[str, str, int], Deque[_Entry]] = {}
+        self.pairs: Dict[Tuple[str, str], Deque[_Entry]] = {}
+        self.pair_totals: Dict[Tuple[str, str], float] = {}
+        self._bucket_timeline: Deque[Tuple[float, Tuple[str, str, int]]] = deque()
+        self._pair_timeline: Deque[Tuple[float, Tuple[str, str]]] = deque()
+
+    def _bucket(self, amount: float) -> int:
+        return int(math.log1p(max(amount, 0.0)) // self.bucket_width)
+
+    @staticmethod
+    def _pair(tx: Dict[str, Any]) -> Tuple[str, str]:
+        return normalize_name(tx.get("vendor")), normalize_name(tx.get("agency"))
+
+    # ----- eviction -----
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.duplicate_window
+        while self._bucket_timeline and self._bucket_timeline[0][0] < cutoff:
+            _, key = self._bucket_timeline.popleft()
+            entries = self.buckets.get(key)
+            while entries and entries[0][0] < cutoff:
+                entries.popleft()
+            if entries is not None and not entries:
+                del self.buckets[key]
+
+        cutoff = now - self.split_window
+        while self._pair_timeline and self._pair_timeline[0][0] < cutoff:
+            _, key = self._pair_timeline.popleft()
+            entries = self.pairs.get(key)
+            while entries and entries[0][0] < cutoff:
+                self.pair_totals[key] -= entries.popleft()[1]
+            if entries is not None and not entries:
+                del self.pairs[key]
+                del self.pair_totals[key]
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        tx = record.get("input", {})
+        ts = record_epoch(record)
+        now = time.time()
+        amount = float(tx.get("amount") or 0)
+        entry = (ts, amount, record.get("prediction_id", ""))
+        pair = self._pair(tx)
+
+        if ts >= now - self.duplicate_window:
+            key = (*pair, self._bucket(amount))
+            self.buckets.setdefault(key, deque()).append(entry)
+            self._bucket_timeline.append((ts, key))
+
+        if self.split_floor <= amount < self.split_threshold and ts >= now - self.split_window:
+            self.pairs.setdefault(pair, deque()).append(entry)
+            self.pair_totals[pair] = self.pair_totals.get(pair, 0.0) + amount
+            self._pair_timeline.append((ts, pair))
+
+        self._evict(now)
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        pass
+
+    # ----- queries -----
+    def find(self, tx: Dict[str, Any], now: Optional[float] = None,
+             batch_peers: Sequence[float] = ()) -> Dict[str, Any]:
+        """
+        Duplicate and split-purchase findings for one incoming transaction
+
+        batch_peers are the amounts of earlier same-pair rows of the batch being
+        scored: not stored yet, so they count towards the totals but have no IDs.
+        """
+        now = time.time() if now is None else now
+        amount = float(tx.get("amount") or 0)
+        pair = self._pair(tx)
+        bucket = self._bucket(amount)
+        exact, near = [], []
+        peer_exact = sum(1 for prior in batch_peers if prior == amount)
+        peer_near = sum(1 for prior in batch_peers
+                        if prior != amount and abs(prior - amount) <= self.tolerance * max(prior, amount))
+        peer_split = [prior for prior in batch_peers if self.split_floor <= prior < self.split_threshold]
+
+        with self._lock:
+            self._evict(now)
+            for b in (bucket - 1, bucket, bucket + 1):
+                for ts, prior, prediction_id in self.buckets.get((*pair, b), ()):
+                    if prior == amount:
+                        exact.append(prediction_id)
+                    elif abs(prior - amount) <= self.tolerance * max(prior, amount):
+                        near.append(prediction_id)
+
+            cluster_count, cluster_total, cluster_ids = 0, 0.0, []
+            if self.split_floor <= amount < self.split_threshold and (pair in self.pairs or peer_split):
+                stored = self.pairs.get(pair, ())
+                cluster_count = len(stored) + len(peer_split) + 1
+                cluster_total = self.pair_totals.get(pair, 0.0) + sum(peer_split) + amount
+                cluster_ids = [e[2] for e in stored]
+
+        is_split = cluster_count >= self.split_min_count and cluster_total >= self.split_threshold
+        return {
+            "exact_duplicates": exact[:MAX_REPORTED_MATCHES],
+            "exact_count": len(exact) + peer_exact,
+            "near_duplicates": near[:MAX_REPORTED_MATCHES],
+            "near_count": len(near) + peer_near,
+            "split_purchase": {
+                "count": cluster_count,
+                "total": round(cluster_total, 2),
+                "threshold": self.split_threshold,
+                "prediction_ids": cluster_ids[-MAX_REPORTED_MATCHES:],
+            } if is_split else None,
+        }
+
+    def features(self, txs: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+        """Rule context arrays: exact/near duplicate counts, split cluster count and total"""
+        now = time.time() if now is None else now
+        findings, peers = [], {}
+        for tx in txs:
+            # Earlier rows of the same batch are not stored until after scoring
+            amounts = peers.setdefault(self._pair(tx), [])
+            findings.append(self.find(tx, now, amounts))
+            amounts.append(float(tx.get("amount") or 0))
+        return {
+            "duplicates": findings,
+            "exact_duplicate_count": np.array([f["exact_count"] for f in findings]),
+            "near_duplicate_count": np.array([f["near_count"] for f in findings]),
+            "split_cluster_count": np.array([f["split_purchase"]["count"] if f["split_purchase"] else 0 for f in findings]),
+            "split_cluster_total": np.array([f["split_purchase"]["total"] if f["split_purchase"] else 0.0 for f in findings]),
+        }
+
+    def report(self, features: Dict[str, Any], i: int) -> Dict[str, Any]:
+        """Per-transaction output fragment (prediction['duplicates'])"""
+        return features["duplicates"][i]
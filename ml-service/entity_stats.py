@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Entity Statistics - Compact, interned agency/supplier statistics
+Normalized name -> integer ID table backed by NumPy arrays (mean, std, count)
+"""
+
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# ==================== NAME NORMALIZATION ====================
+_NON_WORD = re.compile(r"[^\w&]+")
+
+# Spelled-out legal forms collapse to one canonical token
+_TOKEN_CANON = {
+    "private": "pte",
+    "pvt": "pte",
+    "limited": "ltd",
+    "company": "co",
+    "corporation": "corp",
+    "incorporated": "inc",
+    "and": "&",
+}
+
+# Trailing company-form tokens dropped from the key ("ABC Pte Ltd" == "ABC")
+_LEGAL_SUFFIXES = {"pte", "ltd", "co", "corp", "inc", "plc", "llc"}
+
+# Trailing entity-class tokens kept in the key: a partnership or trust is a
+# different legal entity from a company of the same name ("ABC LLP" != "ABC")
+_ENTITY_CLASSES = {"llp", "lp", "trust", "society", "foundation"}
+
+# Connectors left dangling once a suffix is dropped ("Tan & Co" -> "tan")
+_CONNECTORS = {"&"}
+
+# Upper bound on raw request strings remembered after a successful lookup
+RAW_CACHE_LIMIT = 100_000
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Case-, punctuation- and company-form-insensitive key: 'ABC Pte. Ltd' -> 'abc', 'ABC LLP' -> 'abc llp'"""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKC", str(name)).casefold()
+    tokens = [_TOKEN_CANON.get(t, t) for t in _NON_WORD.sub(" ", text).split()]
+    entity_class = None
+    while len(tokens) > 1 and tokens[-1] in _LEGAL_SUFFIXES | _ENTITY_CLASSES | _CONNECTORS:
+        token = tokens.pop()
+        if token in _ENTITY_CLASSES and entity_class is None:
+            entity_class = token
+    if entity_class is not None:
+        tokens.append(entity_class)
+    return " ".join(tokens)
+
+
+# ==================== STATS TABLE ====================
+class EntityStatsTable:
+    """
+    Interned per-entity amount statistics
+
+    - One integer ID per normalized name
+    - mean / std / count held in contiguous NumPy arrays
+    - Alias index for alternative spellings (config ENTITY_ALIASES, add_alias())
+    - Bounded raw-string cache so repeat lookups skip normalization
+    """
+
+    def __init__(self, names: Iterable[str], mean: np.ndarray, std: np.ndarray, count: np.ndarray):
+        self.names = list(names)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.nan_to_num(np.asarray(std, dtype=np.float64), nan=0.0)
+        self.count = np.asarray(count, dtype=np.int32)
+
+        self._index: Dict[str, int] = {key: i for i, key in enumerate(self.names)}
+        self._aliases: Dict[str, int] = {}
+        self._raw: Dict[str, int] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, name_col: str, value_col: str,
+                   aliases: Optional[Dict[str, str]] = None) -> "EntityStatsTable":
+        """Aggregate mean/std/count of value_col per normalized name_col; aliases maps spelling -> canonical name"""
+        # Normalize each distinct raw name once, then aggregate by integer code
+        raw_codes, raw_names = pd.factorize(df[name_col], use_na_sentinel=False)
+        key_codes, keys = pd.factorize(np.array([normalize_name(n) for n in raw_names], dtype=object))
+        codes = key_codes[raw_codes]
+
+        values = df[value_col].to_numpy(dtype=np.float64)
+        n = len(keys)
+        count = np.bincount(codes, minlength=n)
+        total = np.bincount(codes, weights=values, minlength=n)
+        mean = total / np.maximum(count, 1)
+        sq_dev = np.bincount(codes, weights=np.square(values - mean[codes]), minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(sq_dev / (count - 1))  # sample std (ddof=1), NaN for singletons
+        table = cls(keys, mean, std, count)
+        for alias, canonical in (aliases or {}).items():
+            if not table.add_alias(alias, canonical):
+                print(f"WARNING: Alias {alias!r} -> unknown {name_col} {canonical!r}")
+        return table
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add_alias(self, alias: str, canonical: str) -> bool:
+        """Map an alternative spelling onto an existing entity"""
+        i = self.id_of(canonical)
+        if i < 0:
+            return False
+        self._aliases[normalize_name(alias)] = i
+        return True
+
+    def id_of(self, name: Optional[str]) -> int:
+        """Entity ID for a raw name, -1 if unknown"""
+        if name is None:
+            return -1
+        i = self._raw.get(name)
+        if i is not None:
+            return i
+        key = normalize_name(name)
+        i = self._index.get(key)
+        if i is None:
+            i = self._aliases.get(key, -1)
+        if i >= 0 and len(self._raw) < RAW_CACHE_LIMIT:
+            self._raw[name] = i
+        return i
+
+    def ids(self, names: Iterable[Optional[str]]) -> np.ndarray:
+        """Vectorized ID lookup for a batch of raw names"""
+        return np.fromiter((self.id_of(n) for n in names), dtype=np.int64)
+
+    def gather(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """mean, std, count arrays for IDs (zeros where ID is -1)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self.names):
+            zeros = np.zeros(len(ids))
+            return zeros, zeros.copy(), zeros.copy()
+        known = ids >= 0
+        safe = np.where(known, ids, 0)
+        mean = np.where(known, self.mean[safe], 0.0)
+        std = np.where(known, self.std[safe], 0.0)
+        count = np.where(known, self.count[safe], 0)
+        return mean, std, count
+
+    def lookup(self, names: Iterable[Optional[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """mean, std, count arrays for a batch of raw names"""
+        return self.gather(self.ids(names))
+
+    def get(self, name: Optional[str]) -> Optional[Dict[str, float]]:
+        """Single-entity view, None if unknown"""
+        i = self.id_of(name)
+        if i < 0:
+            return None
+        return {"mean": float(self.mean[i]), "std": float(self.std[i]), "count": int(self.count[i])}
+
+    def nbytes(self) -> int:
+        """Approximate array payload size (excludes name strings and dicts)"""
+        return self.mean.nbytes + self.std.nbytes + self.count.nbytes
@@ -8,9 +8,17 @@ import numpy as np
 import pandas as pd
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
-from config import RANDOM_SEED, MODEL_VERSION
+from config import RANDOM_SEED, MODEL_VERSION, ENGINE_PARAMS, ENTITY_ALIASES
+from entity_stats import EntityStatsTable
+from rule_engine import RuleEngine, first_digits, parse_hours
+from quantile_sketch import AmountQuantiles
+from drift_monitor import DriftReference
+from attribution import ForestAttributor
+
+# Fixed values inference uses for features it does not compute per request
+INFERENCE_PLACEHOLDERS = {"agency_contract_count": 0, "year": 2024, "month": 1}
 
 
 class FraudEngine:
@@ -24,14 +32,18 @@ class FraudEngine:
     - Deterministic, reproducible, audit-ready
     """
     
-    def __init__(self):
+    def __init__(self, params: Optional[Dict[str, Any]] = None, model_version: str = MODEL_VERSION):
+        self.params = {**ENGINE_PARAMS, **(params or {})}
         self.if_model = None
         self.ae_model = None
         self.scaler = None
         self.mm_scaler = None
         self.stats = {}
         self.trained_at = None
-        self.model_version = MODEL_VERSION
+        self.model_version = model_version
+        self.rules = RuleEngine.from_config()
+        self.context_providers = []
+        self.batch_observers = []
         
     def train(self, df: pd.DataFrame) -> None:
         """Train once at startup - NEVER during inference"""
@@ -58,11 +70,15 @@ class FraudEngine:
         self.trained_at = datetime.utcnow().isoformat() + "Z"
         df = df.copy()
 
+        # Amount percentiles over the FULL dataset in constant memory (before sampling)
+        amount_quantiles = AmountQuantiles.from_frame(df, "agency", "awarded_amt")
+
         # Memory optimization: Sample large datasets
         original_size = len(df)
-        if len(df) > 10000:
-            print(f"[MEMORY OPT] Dataset has {len(df)} records, sampling 10000 for training")
-            df = df.sample(n=10000, random_state=RANDOM_SEED)
+        sample_size = self.params["train_sample_size"]
+        if sample_size and len(df) > sample_size:
+            print(f"[MEMORY OPT] Dataset has {len(df)} records, sampling {sample_size} for training")
+            df = df.sample(n=sample_size, random_state=RANDOM_SEED)
         print(f"[TRAINING] Using {len(df)} records (original: {original_size})")
 
         # Preprocessing
@@ -73,14 +89,18 @@ class FraudEngine:
         df["log_amount"] = np.log1p(df["awarded_amt"])
 
         # Supplier statistics (vendor-centric fraud patterns)
-        supplier_stats = df.groupby("supplier_name")["awarded_amt"].agg(["mean", "count"]).reset_index()
-        supplier_stats.columns = ["supplier_name", "supplier_avg_amt", "supplier_contract_count"]
-        df = df.merge(supplier_stats, on="supplier_name", how="left")
+        # Interned by normalized name: "ABC Pte Ltd" and "abc pte. ltd" share one entry
+        supplier_stats = EntityStatsTable.from_frame(df, "supplier_name", "awarded_amt", ENTITY_ALIASES["supplier"])
+        supplier_mean, _, supplier_count = supplier_stats.lookup(df["supplier_name"])
+        df["supplier_avg_amt"] = supplier_mean
+        df["supplier_contract_count"] = supplier_count
 
         # Agency statistics (agency-centric patterns)
-        agency_stats = df.groupby("agency")["awarded_amt"].agg(["mean", "std", "count"]).reset_index()
-        agency_stats.columns = ["agency", "agency_avg_amt", "agency_std", "agency_contract_count"]
-        df = df.merge(agency_stats, on="agency", how="left")
+        agency_stats = EntityStatsTable.from_frame(df, "agency", "awarded_amt", ENTITY_ALIASES["agency"])
+        agency_mean, agency_std, agency_count = agency_stats.lookup(df["agency"])
+        df["agency_avg_amt"] = agency_mean
+        df["agency_std"] = agency_std
+        df["agency_contract_count"] = agency_count
 
         df["year"] = df["award_date"].dt.year
         df["month"] = df["award_date"].dt.month
@@ -93,6 +113,7 @@ class FraudEngine:
             "year", "month"
         ]
         X = df[features].fillna(0)
+        self.feature_names = features
 
         # Scaling (deterministic)
         self.scaler = StandardScaler()
@@ -100,11 +121,14 @@ class FraudEngine:
 
         # Isolation Forest (anomaly detection)
         self.if_model = IsolationForest(
-            n_estimators=300, 
-            contamination=0.03, 
+            n_estimators=self.params["n_estimators"], 
+            contamination=self.params["contamination"], 
             random_state=RANDOM_SEED
         )
         self.if_model.fit(X_scaled)
+        # Per-node path statistics for per-feature attributions of the IF score
+        # (placeholder features are constant at inference, so never reported as drivers)
+        self.attributor = ForestAttributor(self.if_model, features, X_scaled, exclude=INFERENCE_PLACEHOLDERS)
 
         # Autoencoder (subtle anomaly detection - silent but powerful)
         if self.use_autoencoder:
@@ -137,187 +161,203 @@ class FraudEngine:
              self.mm_scaler.fit(if_score.reshape(-1, 1))
 
         # Global statistics
+        # Exact on the training frame; the sketch serves per-agency and streaming quantiles
+        self.stats["amount_quantiles"] = amount_quantiles
         self.stats["global_99th"] = df["awarded_amt"].quantile(0.99)
         self.stats["global_mean"] = df["awarded_amt"].mean()
-        self.stats["agency_stats"] = agency_stats.set_index("agency").to_dict("index")
-        self.stats["supplier_stats"] = supplier_stats.set_index("supplier_name").to_dict("index")
+        self.stats["agency_stats"] = agency_stats
+        self.stats["supplier_stats"] = supplier_stats
+
+        # Training distributions for drift monitoring; reference fraud_scores are taken on the
+        # feature vectors inference builds (placeholder columns included), so they match live scores
+        X_live = X.to_numpy(dtype=np.float64).copy()
+        for name, value in INFERENCE_PLACEHOLDERS.items():
+            X_live[:, features.index(name)] = value
+        train_scores = self._fraud_scores(self.scaler.transform(X_live))[0]
+        self.stats["drift_reference"] = DriftReference.from_training(X.to_numpy(), features, train_scores)
 
         print(f"[OK] Fraud Engine trained: {len(df)} records, {len(agency_stats)} agencies, {len(supplier_stats)} suppliers")
 
-    def benford_check(self, amount: float) -> tuple:
-        """Benford's Law analysis"""
-        if amount < 10:
-            return 0, None
-        first_digit = int(str(int(amount))[0])
-        if first_digit >= 8:
-            return 15, f"First digit {first_digit} violates Benford's Law"
-        return 0, None
-
-    def time_check(self, transaction_time: Optional[str]) -> tuple:
-        """Time-based anomaly detection"""
-        if not transaction_time:
-            return 0, None
-        try:
-            hour = int(transaction_time.split(":")[0])
-            if hour < 6 or hour >= 22:
-                return 20, "Transaction at unusual hours (10 PM - 6 AM)"
-            if hour >= 18:
-                return 10, "Transaction during late evening"
-        except:
-            pass
-        return 0, None
-
-    def payment_behavior_check(self, behavior: Optional[str], days_since_last: Optional[int], tolerance: int = 0) -> tuple:
-        """Check payment behavior compliance"""
-        if not behavior or not days_since_last:
-            return 0, None
-            
-        behavior = behavior.upper()
-        
-        # Quarterly: Expect ~90 days
-        if behavior == "QUARTERLY":
-            if days_since_last < (85 - tolerance):
-                return 35, f"Payment frequency (days={days_since_last}) violates QUARTERLY schedule"
-        
-        # Monthly/Regular: Expect ~30 days (less critical if frequent, but too frequent is bad)
-        if behavior == "REGULAR" and days_since_last < 2:
-            return 15, "High frequency payment (Daily)"
-            
-        return 0, None
+    def add_context_provider(self, provider) -> None:
+        """
+        Attach a live-feature source for the risk layers
 
-    def predict(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        provider.features(txs) -> dict of per-transaction arrays merged into the rule context
+            (row i must account for rows < i of the same batch, which are not stored yet)
+        provider.report(features, i) -> output fragment stored under prediction[provider.name]
         """
-        SINGLE DECISION AUTHORITY - deterministic fraud detection
-        
-        Returns:
-            fraud_score: ML-based anomaly score (0.0 - 1.0)
-            risk_score: Rule-based risk assessment (0 - 99)
-            is_anomaly: Binary classification
-            reasons: Transparent explanations
+        self.context_providers.append(provider)
+
+    def add_batch_observer(self, observer) -> None:
         """
-        amount = tx["amount"]
-        agency = tx["agency"]
-        vendor = tx.get("vendor", "UNKNOWN")
-        time = tx.get("transaction_time")
+        observer.observe_batch(X, fraud_scores, txs, context, results, fired) sees each scored batch
 
-        # Feature vector construction
-        agency_data = self.stats["agency_stats"].get(agency, {})
-        agency_avg = agency_data.get("agency_avg_amt", 0)
-        agency_std = agency_data.get("agency_std", 0)
+        X is the raw feature matrix; context the providers' features; results are read-only;
+        fired lists the names of the rules that fired per transaction
+        """
+        self.batch_observers.append(observer)
+
+    def _fraud_scores(self, X_scaled: np.ndarray) -> tuple:
+        """Vectorized hybrid ML signal: (fraud_score, if_label, ae_score) arrays"""
+        n = len(X_scaled)
+        if_score = -self.if_model.score_samples(X_scaled)
+        # Same rule as IsolationForest.predict, without a second pass over the forest
+        if_label = np.where(-if_score - self.if_model.offset_ < 0, -1, 1)
+        ae_score = np.full(n, np.nan)
+
+        if self.use_autoencoder and self.ae_model:
+            try:
+                recon = self.ae_model.predict(X_scaled, verbose=0)
+                ae_score = np.mean(np.square(X_scaled - recon), axis=1)
+                norm = self.mm_scaler.transform(np.column_stack([if_score, ae_score]))
+                fraud_score = 0.6 * norm[:, 0] + 0.4 * norm[:, 1]  # Weighted hybrid
+            except:
+                # Fallback if prediction fails
+                fraud_score = self.mm_scaler.transform(if_score.reshape(-1, 1))[:, 0]
+        else:
+            # Pure Isolation Forest score if Autoencoder disabled
+            if hasattr(self.mm_scaler, 'n_features_in_') and self.mm_scaler.n_features_in_ == 2:
+                # Scaler fit with 2 dims but autoencoder now unavailable: normalize on the IF column only
+                fraud_score = (if_score - self.mm_scaler.data_min_[0]) / (self.mm_scaler.data_max_[0] - self.mm_scaler.data_min_[0])
+            else:
+                fraud_score = self.mm_scaler.transform(if_score.reshape(-1, 1))[:, 0]
+
+        # Ensure valid range
+        return np.clip(fraud_score, 0.0, 1.0), if_label, ae_score
+
+    def _rule_context(self, txs: List[Dict[str, Any]], if_label: np.ndarray, ae_score: np.ndarray,
+                      agency_avg: np.ndarray, agency_std: np.ndarray, supplier_avg: np.ndarray) -> Dict[str, Any]:
+        """Per-transaction arrays that rule conditions and reason templates read"""
+        amount = np.array([tx["amount"] for tx in txs], dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.where(agency_std > 0, (amount - agency_avg) / np.where(agency_std > 0, agency_std, 1), 0.0)
 
-        supplier_data = self.stats["supplier_stats"].get(vendor, {})
-        supplier_avg = supplier_data.get("supplier_avg_amt", 0)
-        supplier_count = supplier_data.get("supplier_contract_count", 0)
+        # Layer 9 input: caller-supplied days since last payment ('timing_accuracy_days');
+        # an attached LastPaymentTracker fills in server-side values when the caller omits it
+        days_raw = [tx.get("timing_accuracy_days") for tx in txs]
 
-        X = np.array([[
+        agencies = [tx["agency"] for tx in txs]
+        quantiles = self.stats["amount_quantiles"]
+
+        return {
+            "amount": amount,
+            "agency": agencies,
+            "vendor": [tx.get("vendor", "UNKNOWN") for tx in txs],
+            "agency_avg": agency_avg,
+            "agency_std": agency_std,
+            "supplier_avg": supplier_avg,
+            "z": z,
+            "global_99th": self.stats["global_99th"],
+            "agency_p95": quantiles.lookup(agencies, 0.95),
+            "agency_p99": quantiles.lookup(agencies, 0.99),
+            "agency_sample_count": quantiles.counts(agencies),
+            "if_label": if_label,
+            "ae_score": ae_score,
+            "first_digit": first_digits(amount),
+            "hour": parse_hours([tx.get("transaction_time") for tx in txs]),
+            "behavior": np.array([(tx.get("payment_behavior") or "").upper() for tx in txs], dtype=object),
+            "days": np.array([float(d) if d else np.nan for d in days_raw], dtype=np.float64),
+            "days_since_last": days_raw,
+        }
+
+    def _feature_matrix(self, txs: List[Dict[str, Any]]) -> tuple:
+        """Raw model features (n x 8) plus the entity stats looked up for them"""
+        amount = np.array([tx["amount"] for tx in txs], dtype=np.float64)
+
+        # Feature vector construction
+        agency_avg, agency_std, _ = self.stats["agency_stats"].lookup([tx["agency"] for tx in txs])
+        supplier_avg, _, supplier_count = self.stats["supplier_stats"].lookup([tx.get("vendor", "UNKNOWN") for tx in txs])
+
+        n = len(txs)
+        X = np.column_stack([
             amount,
             np.log1p(amount),
             supplier_avg,
             supplier_count,
             agency_avg,
-            0,  # agency_contract_count (not used in inference)
-            2024,  # year
-            1  # month
-        ]])
+            np.full(n, INFERENCE_PLACEHOLDERS["agency_contract_count"]),  # not used in inference
+            np.full(n, INFERENCE_PLACEHOLDERS["year"]),
+            np.full(n, INFERENCE_PLACEHOLDERS["month"])
+        ])
+        return X, agency_avg, agency_std, supplier_avg
+
+    def scaled_features(self, txs: List[Dict[str, Any]]) -> np.ndarray:
+        """Scaler-transformed model features (n x len(feature_names)), as the models see them"""
+        X, _, _, _ = self._feature_matrix(txs)
+        return self.scaler.transform(X)
+
+    def explain(self, txs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Per-feature attributions of the Isolation Forest score (no rule evaluation)"""
+        return self.attributor.explain(self.scaled_features(txs))
+
+    def predict_batch(self, txs: List[Dict[str, Any]], context: Optional[list] = None,
+                      explain: bool = False) -> List[Dict[str, Any]]:
+        """
+        SINGLE DECISION AUTHORITY - deterministic fraud detection over a batch
+
+        Identical per-transaction output to predict(); one vectorized pass
+        context: [(provider, features)] captured earlier, instead of querying providers now
+        (lets a shadow engine see the same live state the primary saw)
+        explain: add per-feature IF attributions under "attributions" (scores unchanged)
+        """
+        return self.score_batch(txs, context, explain)[0]
+
+    def score_batch(self, txs: List[Dict[str, Any]], context: Optional[list] = None,
+                    explain: bool = False) -> tuple:
+        """predict_batch results plus the names of the rules that fired for each transaction"""
+        if not txs:
+            return [], []
+        X, agency_avg, agency_std, supplier_avg = self._feature_matrix(txs)
+        n = len(txs)
         X_scaled = self.scaler.transform(X)
 
         # ===== FRAUD SCORE (ML Signal) =====
-        if_score = -self.if_model.score_samples(X_scaled)[0]
-        
-        if self.use_autoencoder and self.ae_model:
-            try:
-                recon = self.ae_model.predict(X_scaled, verbose=0)[0]
-                ae_score = np.mean(np.square(X_scaled[0] - recon))
-                if_norm, ae_norm = self.mm_scaler.transform([[if_score, ae_score]])[0]
-                fraud_score = 0.6 * if_norm + 0.4 * ae_norm  # Weighted hybrid
-            except:
-                # Fallback if prediction fails
-                 fraud_score = self.mm_scaler.transform([[if_score]])[0][0]
-        else:
-             # Pure Isolation Forest score if Autoencoder disabled
-             if hasattr(self.mm_scaler, 'n_features_in_') and self.mm_scaler.n_features_in_ == 2:
-                  # If scaler was somehow fit with 2 dims but we only have 1 now (should handle in init)
-                  # Re-fit scaler for 1 dim logic on the fly or just use raw normalization
-                  fraud_score = (if_score - self.mm_scaler.data_min_[0]) / (self.mm_scaler.data_max_[0] - self.mm_scaler.data_min_[0])
-             else:
-                  fraud_score = self.mm_scaler.transform([[if_score]])[0][0]
-
-        # Ensure valid range
-        fraud_score = max(0.0, min(1.0, fraud_score))
+        fraud_scores, if_label, ae_score = self._fraud_scores(X_scaled)
 
         # ===== RISK SCORE (Human Judgment Layer) =====
-        risk_score = 10
-        reasons = []
-
-        # Layer 1: Agency statistical outlier
-        if agency_std and agency_std > 0:
-            z = (amount - agency_avg) / agency_std
-            if z > 3:
-                risk_score += 40
-                reasons.append(f"Amount is {z:.1f} std devs above {agency} average")
-
-        # Layer 2: Supplier pattern deviation
-        if supplier_avg > 0 and amount > supplier_avg * 3:
-            risk_score += 25
-            reasons.append(f"Amount 3x higher than {vendor} typical contracts")
-
-        # Layer 3: Global extreme
-        if amount > self.stats["global_99th"]:
-            risk_score += 30
-            reasons.append("Amount in global top 1%")
-
-        # Layer 4: AI anomaly (Isolation Forest)
-        if self.if_model.predict(X_scaled)[0] == -1:
-            risk_score += 25
-            reasons.append("AI detected unusual pattern (Isolation Forest)")
-
-        # Layer 5: Autoencoder anomaly (silent but powerful)
-        if self.use_autoencoder and 'ae_score' in locals() and ae_score > 0.5:  # High reconstruction error
-            risk_score += 20
-            reasons.append("Deep learning detected subtle anomaly (Autoencoder)")
-
-        # Layer 6: Forensic heuristics
-        if amount > 10000 and amount % 1000 == 0:
-            risk_score += 15
-            reasons.append("Suspiciously round amount")
-
-        if amount > 5_000_000:
-            risk_score += 10
-            reasons.append("High value contract")
-
-        # Layer 7: Benford's Law
-        b_score, b_reason = self.benford_check(amount)
-        if b_score:
-            risk_score += b_score
-            reasons.append(b_reason)
-
-        # Layer 8: Time-based
-        t_score, t_reason = self.time_check(time)
-        if t_score:
-            risk_score += t_score
-            reasons.append(t_reason)
-            
-        # Layer 9: Payment Behavior
-        behavior = tx.get("payment_behavior")
-        days_diff = tx.get("timing_accuracy_days") # mapped from 'days_since_last' theoretically, but here we use what we get
-        # NOTE: ml_model.py passes 'timing_accuracy_days' but the intent was 'days_since_last_payment'
-        # To avoid confusion, let's assume the input 'timing_accuracy_days' IS the actual days since last payment passed by caller
-         
-        pb_score, pb_reason = self.payment_behavior_check(behavior, days_diff)
-        if pb_score:
-            risk_score += pb_score
-            reasons.append(pb_reason)
+        ctx = self._rule_context(txs, if_label, ae_score, agency_avg, agency_std, supplier_avg)
+        provided = context if context is not None else [(provider, provider.features(txs)) for provider in self.context_providers]
+        for _, features in provided:
+            ctx.update(features)
+        risk_scores, reasons, fired = self.rules.evaluate(ctx, n)
 
         # Enforce constraints
-        risk_score = min(99, max(0, risk_score))
-        fraud_score = round(float(fraud_score), 3)
-        is_anomaly = risk_score > 70
+        risk_scores = np.clip(risk_scores, 0, 99)
+
+        results = []
+        for i in range(n):
+            risk_score = int(risk_scores[i])
+            result = {
+                "fraud_score": round(float(fraud_scores[i]), 3),  # ML signal
+                "risk_score": risk_score,  # Human judgment
+                "is_anomaly": risk_score > 70,
+                "reasons": reasons[i],
+                "model_version": self.model_version,
+                "trained_at": self.trained_at
+            }
+            for provider, features in provided:
+                result[provider.name] = provider.report(features, i)
+            results.append(result)
+
+        if explain:
+            for result, attribution in zip(results, self.attributor.explain(X_scaled)):
+                result["attributions"] = attribution
+
+        for observer in self.batch_observers:
+            try:
+                observer.observe_batch(X, fraud_scores, txs, provided, results, fired)
+            except Exception as e:
+                print(f"WARNING: Batch observer failed: {e}")
+        return results, fired
 
-        return {
-            "fraud_score": fraud_score,  # ML signal
-            "risk_score": int(risk_score),  # Human judgment
-            "is_anomaly": is_anomaly,
-            "reasons": reasons,
-            "model_version": self.model_version,
-            "trained_at": self.trained_at
-        }
+    def predict(self, tx: Dict[str, Any], explain: bool = False) -> Dict[str, Any]:
+        """
+        SINGLE DECISION AUTHORITY - deterministic fraud detection
+        
+        Returns:
+            fraud_score: ML-based anomaly score (0.0 - 1.0)
+            risk_score: Rule-based risk assessment (0 - 99)
+            is_anomaly: Binary classification
+            reasons: Transparent explanations
+        """
+        return self.predict_batch([tx], explain=explain)[0]
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Heavy Hitters - Bounded-memory top-K vendors/agencies over the scoring stream
+Weighted Space-Saving summaries per time bucket, merged over rolling windows
+"""
+
+import time
+import heapq
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import HEAVY_HITTER_CAPACITY, HEAVY_HITTER_WINDOWS
+from entity_stats import normalize_name
+from streaming import StreamingAggregate, record_epoch
+
+ENTITY_TYPES = ("vendor", "agency")
+METRICS = ("count", "volume", "anomalies", "flagged_volume")
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving summary (Metwally et al.) with at most `capacity` counters
+
+    For every tracked key: true <= estimate <= true + error, and any key whose
+    true weight exceeds total / capacity is guaranteed to be tracked.
+
+    The smallest counter is found through a lazy min-heap with one
+    (estimate, key) entry per counter. Estimates only grow, so an entry is a
+    lower bound; a stale minimum is re-pushed at its current estimate, keeping
+    an insert at O(log capacity) amortized instead of a scan of every counter.
+    """
+
+    __slots__ = ("capacity", "counters", "total", "heap")
+
+    def __init__(self, capacity: int = HEAVY_HITTER_CAPACITY):
+        self.capacity = capacity
+        self.counters: Dict[str, List] = {}  # key -> [estimate, error, label]
+        self.total = 0.0
+        self.heap: List[Tuple[float, str]] = []
+
+    def add(self, key: str, label: str, weight: float = 1.0) -> None:
+        if weight <= 0:
+            return
+        self.total += weight
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0.0, label]
+            heapq.heappush(self.heap, (weight, key))
+            return
+        # Replace the smallest counter; the newcomer inherits its count as error
+        _, min_key = self._settle()
+        floor = self.counters.pop(min_key)[0]
+        self.counters[key] = [floor + weight, floor, label]
+        heapq.heapreplace(self.heap, (floor + weight, key))
+
+    def _settle(self) -> Tuple[float, str]:
+        """Refresh stale heap entries until the top is the smallest counter"""
+        heap, counters = self.heap, self.counters
+        while True:
+            estimate, key = heap[0]
+            current = counters[key][0]
+            if current == estimate:
+                return estimate, key
+            heapq.heapreplace(heap, (current, key))
+
+    def floor(self) -> float:
+        """Upper bound on the weight of any key not tracked"""
+        if len(self.counters) < self.capacity:
+            return 0.0
+        return self._settle()[0]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Mergeable-summaries combine (Agarwal et al.): sum, charge absent keys the other's floor, keep top capacity"""
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        merged.total = self.total + other.total
+        floor_a, floor_b = self.floor(), other.floor()
+        for key in self.counters.keys() | other.counters.keys():
+            a = self.counters.get(key)
+            b = other.counters.get(key)
+            estimate = (a[0] if a else floor_a) + (b[0] if b else floor_b)
+            error = (a[1] if a else floor_a) + (b[1] if b else floor_b)
+            merged.counters[key] = [estimate, error, (a or b)[2]]
+        if len(merged.counters) > merged.capacity:
+            keep = sorted(merged.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:merged.capacity]
+            merged.counters = dict(keep)
+        merged.heap = [(counter[0], key) for key, counter in merged.counters.items()]
+        heapq.heapify(merged.heap)
+        return merged
+
+    def top(self, k: int) -> List[Tuple[str, List]]:
+        return sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:k]
+
+
+class _Bucket:
+    """One time bucket: a Space-Saving summary per (entity type, metric)"""
+
+    __slots__ = ("epoch", "summaries")
+
+    def __init__(self, epoch: int, capacity: int):
+        self.epoch = epoch
+        self.summaries = {(e, m): SpaceSaving(capacity) for e in ENTITY_TYPES for m in METRICS}
+
+
+class HeavyHitters(StreamingAggregate):
+    """
+    Top-K vendors and agencies by count, volume, anomaly count and flagged volume
+
+    - Each window is a ring of time buckets; each bucket holds fixed-capacity
+      Space-Saving summaries, so memory is independent of distinct vendors
+    - Queries merge the buckets inside the window (O(buckets x capacity))
+    - Updated on every saved prediction; warmed by replaying recent history
+    """
+
+    name = "heavy_hitters"
+
+    def __init__(self, windows: Optional[Dict[str, Tuple[float, int]]] = None,
+                 capacity: int = HEAVY_HITTER_CAPACITY):
+        self.windows = dict(HEAVY_HITTER_WINDOWS if windows is None else windows)
+        self.capacity = capacity
+        self.horizon = max(span for span, _ in self.windows.values())
+        super().__init__(checkpoint_path=None)
+
+    def _reset(self) -> None:
+        self.rings: Dict[str, List[Optional[_Bucket]]] = {
+            name: [None] * buckets for name, (_, buckets) in self.windows.items()
+        }
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        ts = record_epoch(record)
+        if ts < time.time() - self.horizon:
+            return
+        tx = record.get("input", {})
+        output = record.get("output", {})
+        amount = float(tx.get("amount") or 0)
+        flagged = bool(output.get("is_anomaly"))
+        weights = {
+            "count": 1.0,
+            "volume": amount,
+            "anomalies": 1.0 if flagged else 0.0,
+            "flagged_volume": amount if flagged else 0.0,
+        }
+
+        for name, (span, buckets) in self.windows.items():
+            epoch = int(ts // (span / buckets))
+            ring = self.rings[name]
+            slot = epoch % buckets
+            bucket = ring[slot]
+            if bucket is None or bucket.epoch < epoch:
+                bucket = ring[slot] = _Bucket(epoch, self.capacity)
+            elif bucket.epoch > epoch:
+                continue  # older than the window
+            for entity in ENTITY_TYPES:
+                label = tx.get(entity) or "UNKNOWN"
+                key = normalize_name(label)
+                for metric, weight in weights.items():
+                    bucket.summaries[(entity, metric)].add(key, label, weight)
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        pass
+
+    # ----- queries -----
+    def summary(self, window: str, entity: str, metric: str, now: Optional[float] = None) -> SpaceSaving:
+        """Merged Space-Saving summary over the buckets currently inside the window"""
+        now = time.time() if now is None else now
+        span, buckets = self.windows[window]
+        current = int(now // (span / buckets))
+        merged = SpaceSaving(self.capacity)
+        with self._lock:
+            for bucket in self.rings[window]:
+                if bucket is not None and current - buckets < bucket.epoch <= current:
+                    merged = merged.merge(bucket.summaries[(entity, metric)])
+        return merged
+
+    def top(self, window: str, entity: str, metric: str, k: int = 10, now: Optional[float] = None) -> Dict[str, Any]:
+        merged = self.summary(window, entity, metric, now)
+        return {
+            "window": window,
+            "entity": entity,
+            "metric": metric,
+            "total": round(merged.total, 2),
+            # Any entity with true value above this is guaranteed to appear
+            "max_error": round(merged.total / self.capacity, 2),
+            "top": [{
+                "name": label,
+                "estimate": round(estimate, 2),
+                "guaranteed_min": round(estimate - error, 2),
+                "error": round(error, 2),
+            } for _, (estimate, error, label) in merged.top(k)],
+        }
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        """Combine another worker's summaries bucket by bucket (same window config)"""
+        with self._lock:
+            for name, ring in self.rings.items():
+                for slot, theirs in enumerate(other.rings[name]):
+                    if theirs is None:
+                        continue
+                    mine = ring[slot]
+                    if mine is None or mine.epoch < theirs.epoch:
+                        ring[slot] = mine = _Bucket(theirs.epoch, self.capacity)
+                    if mine.epoch == theirs.epoch:
+                        for key, summary in theirs.summaries.items():
+                            mine.summaries[key] = mine.summaries[key].merge(summary)
+        return self
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Last Payment Tracker - Server-side days-since-last-payment per (vendor, agency)
+Replaces the caller-supplied 'timing_accuracy_days' unless the caller overrides it
+"""
+
+import time
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import LAST_PAYMENT_CHECKPOINT
+from entity_stats import normalize_name
+from streaming import StreamingAggregate, record_epoch, iso_utc
+
+SECONDS_PER_DAY = 86400
+
+
+class LastPaymentTracker(StreamingAggregate):
+    """
+    Persistent (vendor, agency) -> last payment timestamp map
+
+    - O(1) dict lookup per request, O(1) update per saved prediction
+    - Updates keep the max timestamp, so concurrent or out-of-order writers converge
+    - Checkpointed to LAST_PAYMENT_CHECKPOINT, rebuildable from the prediction store
+    - Context provider for FraudEngine: fills Layer 9 (payment behavior) inputs
+    """
+
+    name = "last_payment"
+
+    def __init__(self, checkpoint_path: Optional[str] = LAST_PAYMENT_CHECKPOINT, **kwargs):
+        super().__init__(checkpoint_path, **kwargs)
+
+    def _reset(self) -> None:
+        self.last_paid: Dict[Tuple[str, str], float] = {}
+
+    @staticmethod
+    def _key(tx: Dict[str, Any]) -> Tuple[str, str]:
+        return normalize_name(tx.get("vendor")), normalize_name(tx.get("agency"))
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        key = self._key(record.get("input", {}))
+        ts = record_epoch(record)
+        if ts > self.last_paid.get(key, float("-inf")):
+            self.last_paid[key] = ts
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        keys = list(self.last_paid)
+        return {
+            "vendors": np.array([k[0] for k in keys], dtype=str),
+            "agencies": np.array([k[1] for k in keys], dtype=str),
+            "timestamps": np.array([self.last_paid[k] for k in keys], dtype=np.float64),
+        }
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        self.last_paid = dict(zip(
+            zip(arrays["vendors"].tolist(), arrays["agencies"].tolist()),
+            arrays["timestamps"].tolist()
+        ))
+
+    # ----- queries -----
+    def last_payment(self, tx: Dict[str, Any]) -> Optional[float]:
+        with self._lock:
+            return self.last_paid.get(self._key(tx))
+
+    def describe(self, tx: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """Last payment time and whole days since, for one (vendor, agency)"""
+        last = self.last_payment(tx)
+        if last is None:
+            return {"last_payment_at": None, "days_since_last": None}
+        now = time.time() if now is None else now
+        return {"last_payment_at": iso_utc(last), "days_since_last": max(0, int((now - last) // SECONDS_PER_DAY))}
+
+    def features(self, txs: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+        """Layer 9 inputs: caller-supplied timing_accuracy_days wins, tracker fills the rest"""
+        now = time.time() if now is None else now
+        days_raw, days, reports, batch = [], [], [], set()
+        for tx in txs:
+            supplied = tx.get("timing_accuracy_days")
+            key = self._key(tx)
+            if key in batch:
+                # An earlier row of this batch is the pair's latest payment (stored only after scoring)
+                report = {"last_payment_at": iso_utc(now), "days_since_last": 0}
+            else:
+                report = self.describe(tx, now)
+                batch.add(key)
+            if supplied is not None:
+                # Caller semantics unchanged: 0 means "not applicable"
+                report.update(days_since_last=supplied, source="caller")
+                days.append(float(supplied) if supplied else np.nan)
+            else:
+                tracked = report["days_since_last"]
+                report["source"] = "tracker" if tracked is not None else None
+                days.append(np.nan if tracked is None else float(tracked))
+            days_raw.append(report["days_since_last"])
+            reports.append(report)
+        return {
+            "days": np.array(days, dtype=np.float64),
+            "days_since_last": days_raw,
+            "last_payment": reports,
+        }
+
+    def report(self, features: Dict[str, Any], i: int) -> Dict[str, Any]:
+        """Per-transaction output fragment (prediction['last_payment'])"""
+        return features["last_payment"][i]
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-Batching - Coalesce concurrent single-transaction /predict calls
+One scoring thread collects requests for a few milliseconds and scores them in one vectorized pass
+"""
+
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, Any, Callable, List, Optional
+
+from config import MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS, MICRO_BATCH_TIMEOUT_S
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of FraudEngine.predict_batch
+
+    - submit(tx) blocks the calling (threadpool) thread until its result is ready
+    - The scoring thread takes every waiting request (up to max_size); while
+      traffic is concurrent (the previous batch held more than one request) it
+      keeps collecting until max_wait_ms after the first request arrived, so a
+      lone request under light load is scored without waiting
+    - One predict_batch call per batch: one scaler / forest / rule pass instead
+      of one per request, and one thread doing numpy work instead of many
+      contending for the GIL
+    - A failed batch (or one that returns the wrong number of results) is
+      retried one request at a time, so one bad transaction only fails its own caller
+    - submit() gives up after timeout_s; requests still queued at stop() fail
+      instead of waiting forever
+    - Batch-size histogram (power-of-two buckets) and queue-wait statistics
+
+    Context providers learn about a transaction only once its record is saved,
+    so each provider's features(txs) counts the earlier rows of the same batch
+    (duplicates, velocity, last payment, network contract counts) to keep
+    batched scoring in line with one-at-a-time scoring.
+
+    score(txs, explain) is looked up per batch, so an engine swapped in by a
+    retrain is picked up without restarting the batcher.
+    """
+
+    def __init__(self, score: Callable[[List[Dict[str, Any]], bool], List[Dict[str, Any]]],
+                 max_size: int = MICRO_BATCH_MAX_SIZE, max_wait_ms: float = MICRO_BATCH_MAX_WAIT_MS,
+                 timeout_s: float = MICRO_BATCH_TIMEOUT_S):
+        self.score = score
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout_s
+        self.queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # bucket b counts batches of size in [2**b, 2**(b+1))
+        self.size_buckets = np.zeros(max(int(max_size).bit_length(), 1), dtype=np.int64)
+        self.batches = 0
+        self.requests = 0
+        self.failed_batches = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self._last_size = 0
+
+    # ----- request path -----
+    def submit(self, tx: Dict[str, Any], explain: bool = False) -> Dict[str, Any]:
+        """Score one transaction as part of the next batch"""
+        if self._stop.is_set():
+            raise RuntimeError("Micro-batcher is stopped")
+        future: Future = Future()
+        self.queue.put((tx, explain, time.perf_counter(), future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # Skipped by the scoring thread if not picked up yet
+            raise
+
+    # ----- scoring thread -----
+    def start(self) -> "MicroBatcher":
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the scoring thread and fail every request it did not pick up"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        while True:
+            try:
+                future = self.queue.get_nowait()[3]
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Micro-batcher stopped before scoring the request"))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                jobs = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            deadline = jobs[0][2] + self.max_wait
+            while len(jobs) < self.max_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0 and self._last_size > 1:
+                        jobs.append(self.queue.get(timeout=remaining))
+                    else:
+                        jobs.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._last_size = len(jobs)
+            jobs = [job for job in jobs if job[3].set_running_or_notify_cancel()]  # Drop timed-out requests
+            if jobs:
+                self.run_batch(jobs)
+
+    def run_batch(self, jobs: list) -> None:
+        """Score (tx, explain, enqueued_at, future) jobs and resolve their futures"""
+        started = time.perf_counter()
+        waits = [started - enqueued for _, _, enqueued, _ in jobs]
+        try:
+            explain = any(e for _, e, _, _ in jobs)
+            results = self.score([tx for tx, _, _, _ in jobs], explain)
+            if len(results) != len(jobs):
+                raise ValueError(f"Scorer returned {len(results)} results for {len(jobs)} transactions")
+        except Exception as e:
+            with self._lock:
+                self.failed_batches += 1
+            if len(jobs) == 1:
+                jobs[0][3].set_exception(e)
+            else:
+                for job in jobs:
+                    self.run_batch([job])
+            return
+
+        for (_, wanted, _, future), result in zip(jobs, results):
+            if explain and not wanted:
+                result.pop("attributions", None)
+            future.set_result(result)
+        with self._lock:
+            self.size_buckets[min(len(jobs).bit_length(), len(self.size_buckets)) - 1] += 1
+            self.batches += 1
+            self.requests += len(jobs)
+            self.wait_sum += sum(waits)
+            self.wait_max = max(self.wait_max, max(waits))
+
+    # ----- queries -----
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = self.size_buckets.tolist()
+            histogram = {}
+            for b, count in enumerate(buckets):
+                low = 1 << b
+                high = min((1 << (b + 1)) - 1, self.max_size) if b < len(buckets) - 1 else self.max_size
+                histogram[str(low) if low == high else f"{low}-{high}"] = count
+            return {
+                "max_batch_size": self.max_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self.batches,
+                "requests": self.requests,
+                "failed_batches": self.failed_batches,
+                "mean_batch_size": round(self.requests / max(self.batches, 1), 2),
+                "batch_size_histogram": histogram,
+                "queue_wait_ms": {
+                    "mean": round(self.wait_sum / max(self.requests, 1) * 1000.0, 3),
+                    "max": round(self.wait_max * 1000.0, 3),
+                },
+                "queued": self.queue.qsize(),
+            }
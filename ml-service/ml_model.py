@@ -15,18 +15,41 @@ GOVERNANCE RULES:
 import numpy as np
 import pandas as pd
 import os
+import json
+import time
+import threading
 import traceback
 from typing import Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
 # Import from modular components
-from config import MODEL_VERSION
+from config import (
+    MODEL_VERSION, RANDOM_SEED, QUANTILE_ONLINE_UPDATES, QUANTILE_SNAPSHOT, DRIFT_RETRAIN_ENABLED,
+    DRIFT_RETRAIN_WINDOW, DRIFT_RETRAIN_HISTORY_RATIO, DRIFT_WINDOWS, DRIFT_MIN_SAMPLES,
+    SHADOW_ENABLED, SHADOW_ENGINE_PARAMS, SHADOW_MODEL_VERSION, MICRO_BATCH_ENABLED,
+    SIMILARITY_INCLUDE_TRAINING, SIMILARITY_MAX_K
+)
 from fraud_engine import FraudEngine
 from ollama_integration import SummaryGenerator
 from prediction_store import PredictionStore
 from audit_logger import AuditLogger
+from record_codec import RecordPayload
+from benford_analysis import BenfordTracker, ENTITY_TYPES
+from velocity import VelocityTracker
+from last_payment import LastPaymentTracker
+from duplicate_index import DuplicateIndex
+from heavy_hitters import HeavyHitters, METRICS
+from prediction_index import parse_time
+from drift_monitor import DriftMonitor
+from shadow import ShadowScorer
+from micro_batcher import MicroBatcher
+from similarity_index import SimilarityIndex
+from chat_index import ChatIndex
+from network import VendorAgencyNetwork
+from rollups import DailyRollups, SECONDS_PER_DAY, ENTITY_TYPES as ROLLUP_ENTITIES
 
 
 # ==================== FASTAPI APPLICATION ====================
@@ -45,8 +68,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+TRAINING_CSV = "government-procurement-via-gebiz.csv"
+
 fraud_engine: Optional[FraudEngine] = None
 
+# Incremental aggregates over the prediction stream (see streaming.py)
+benford_tracker: Optional[BenfordTracker] = None
+velocity_tracker: Optional[VelocityTracker] = None
+last_payment_tracker: Optional[LastPaymentTracker] = None
+duplicate_index: Optional[DuplicateIndex] = None
+heavy_hitters: Optional[HeavyHitters] = None
+daily_rollups: Optional[DailyRollups] = None
+chat_index: Optional[ChatIndex] = None
+vendor_network: Optional[VendorAgencyNetwork] = None
+stream_aggregates = []
+
+# Live feature / score drift vs. the training reference (see drift_monitor.py)
+drift_monitor: Optional[DriftMonitor] = None
+_retrain_lock = threading.Lock()
+
+# Candidate engine scored on sampled traffic, off the request path (see shadow.py)
+shadow_scorer: Optional[ShadowScorer] = None
+
+# kNN over scaled feature vectors for /similar (see similarity_index.py)
+similarity_index: Optional[SimilarityIndex] = None
+
+# Coalesces concurrent /predict calls into one engine pass (see micro_batcher.py)
+micro_batcher: Optional[MicroBatcher] = None
+
 
 # ==================== PYDANTIC MODELS ====================
 class Transaction(BaseModel):
@@ -55,7 +104,7 @@ class Transaction(BaseModel):
     vendor: str
     transaction_time: Optional[str] = None
     payment_behavior: Optional[str] = "REGULAR" 
-    timing_accuracy_days: Optional[int] = 0
+    timing_accuracy_days: Optional[int] = None  # Override; server tracks days since last payment
     total_tender_amount: Optional[float] = 0.0 # NEW: Sync with Gateway
 
 
@@ -72,34 +121,217 @@ def load_and_train_model():
     fraud_engine = FraudEngine()
     
     try:
-        csv_path = "government-procurement-via-gebiz.csv"
-        
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
-            
-            if df['awarded_amt'].dtype == object:
-                df['awarded_amt'] = df['awarded_amt'].str.replace('$', '').str.replace(',', '').astype(float)
-            
-            fraud_engine.train(df)
+        training_frame = load_training_frame()
+        fraud_engine.train(training_frame)
+        if os.path.exists(TRAINING_CSV):
             print("=" * 60)
             print("FRAUD DETECTION ENGINE READY")
             print("Features: Isolation Forest + Autoencoder + Supplier Stats")
             print("=" * 60)
-            
-        else:
-            print(f"WARNING: Dataset not found")
-            df_fallback = pd.DataFrame({
-                "awarded_amt": [1000, 5000, 10000, 50000, 100000, 500000],
-                "supplier_name": ["Vendor A", "Vendor B", "Vendor C", "Vendor D", "Vendor E", "Vendor F"],
-                "agency": ["Agency 1", "Agency 2", "Agency 1", "Agency 3", "Agency 2", "Agency 1"],
-                "award_date": pd.date_range("2024-01-01", periods=6)
-            })
-            fraud_engine.train(df_fallback)
-            
     except Exception as e:
         print(f"CRITICAL ERROR: {e}")
         traceback.print_exc()
         raise
+    
+    start_stream_aggregates(training_frame)
+    start_drift_monitor()
+    start_similarity_index(training_frame)
+    
+    if MICRO_BATCH_ENABLED:
+        start_micro_batching()
+    
+    if SHADOW_ENABLED:
+        # Train the candidate in the background; sampling starts once it is ready
+        threading.Thread(target=start_shadow_scoring, name="shadow-training", daemon=True).start()
+
+
+def load_training_frame() -> pd.DataFrame:
+    """Training dataset (GeBIZ procurement CSV), or a tiny fallback frame"""
+    if os.path.exists(TRAINING_CSV):
+        df = pd.read_csv(TRAINING_CSV)
+        
+        if df['awarded_amt'].dtype == object:
+            df['awarded_amt'] = df['awarded_amt'].str.replace('$', '').str.replace(',', '').astype(float)
+        return df
+    
+    print(f"WARNING: Dataset not found")
+    return pd.DataFrame({
+        "awarded_amt": [1000, 5000, 10000, 50000, 100000, 500000],
+        "supplier_name": ["Vendor A", "Vendor B", "Vendor C", "Vendor D", "Vendor E", "Vendor F"],
+        "agency": ["Agency 1", "Agency 2", "Agency 1", "Agency 3", "Agency 2", "Agency 1"],
+        "award_date": pd.date_range("2024-01-01", periods=6)
+    })
+
+
+def start_stream_aggregates(training_frame: pd.DataFrame):
+    """Warm incremental aggregates from the prediction store and subscribe them to new saves"""
+    global benford_tracker, velocity_tracker, last_payment_tracker, duplicate_index, heavy_hitters, daily_rollups
+    global chat_index, vendor_network
+    
+    benford_tracker = BenfordTracker()
+    velocity_tracker = VelocityTracker()
+    last_payment_tracker = LastPaymentTracker()
+    duplicate_index = DuplicateIndex()
+    heavy_hitters = HeavyHitters()
+    daily_rollups = DailyRollups()
+    # Retrieval for /chat grounding (rebuilt each start, no checkpoint)
+    chat_index = ChatIndex(PredictionStore.load_prediction)
+    # Vendor x agency award graph, seeded with the training awards
+    vendor_network = VendorAgencyNetwork()
+    vendor_network.seed(training_frame)
+    
+    # Secondary indexes for /predictions and ID lookups
+    PredictionStore.build_index()
+    
+    for aggregate in [benford_tracker, velocity_tracker, last_payment_tracker, duplicate_index, heavy_hitters,
+                      daily_rollups, chat_index, vendor_network]:
+        aggregate.warm(PredictionStore.iter_records)
+        PredictionStore.add_listener(aggregate.observe)
+        stream_aggregates.append(aggregate)
+    
+    # Live sliding-window features feed the velocity risk layers
+    fraud_engine.add_context_provider(velocity_tracker)
+    # Server-side days since last payment feeds the payment behavior layer
+    fraud_engine.add_context_provider(last_payment_tracker)
+    # Recent-transaction index feeds duplicate / split-purchase findings
+    fraud_engine.add_context_provider(duplicate_index)
+    # Award-graph position feeds the (opt-in) network structure layers
+    fraud_engine.add_context_provider(vendor_network)
+    
+    # Optional: fold scored traffic into the training-time amount sketches
+    if QUANTILE_ONLINE_UPDATES:
+        for record in PredictionStore.iter_records():
+            observe_amount_quantiles(record)
+        PredictionStore.add_listener(observe_amount_quantiles)
+
+
+def observe_amount_quantiles(record: dict):
+    """Online update of the active engine's amount sketches (follows drift retrains)"""
+    fraud_engine.stats["amount_quantiles"].observe(record)
+
+
+def start_drift_monitor():
+    """Compare live features / fraud scores with the training reference; optionally retrain on drift"""
+    global drift_monitor
+    
+    on_drift = None
+    if DRIFT_RETRAIN_ENABLED:
+        on_drift = lambda report: threading.Thread(target=retrain_engine, args=(report,), daemon=True).start()
+    drift_monitor = DriftMonitor(fraud_engine.stats["drift_reference"], on_drift=on_drift)
+    fraud_engine.add_batch_observer(drift_monitor)
+
+
+def start_shadow_scoring():
+    """Train the shadow engine and attach its sampler to the primary engine"""
+    global shadow_scorer
+    
+    try:
+        engine = FraudEngine(SHADOW_ENGINE_PARAMS, model_version=SHADOW_MODEL_VERSION)
+        engine.train(load_training_frame())
+        shadow_scorer = ShadowScorer(engine).start()
+        fraud_engine.add_batch_observer(shadow_scorer)
+        print(f"[SHADOW] Scoring {shadow_scorer.sample_rate:.0%} of traffic with {engine.model_version} {engine.params}")
+    except Exception as e:
+        print(f"WARNING: Shadow engine startup failed: {e}")
+
+
+def start_similarity_index(training_frame: pd.DataFrame):
+    """Index training + stored transactions for /similar and subscribe to new saves"""
+    global similarity_index
+    
+    try:
+        index = SimilarityIndex(fraud_engine)
+        if SIMILARITY_INCLUDE_TRAINING:
+            index.add_training(training_frame)
+        stored = index.load(PredictionStore.iter_records())
+        PredictionStore.add_listener(index.observe)
+        similarity_index = index
+        print(f"[SIMILARITY] Indexed {len(index.training)} training + {stored} stored transactions on {index.features}")
+    except Exception as e:
+        print(f"WARNING: Similarity index startup failed: {e}")
+
+
+def start_micro_batching():
+    """Score concurrent /predict requests together; the engine is looked up per batch (survives retrains)"""
+    global micro_batcher
+    
+    micro_batcher = MicroBatcher(lambda txs, explain: fraud_engine.predict_batch(txs, explain=explain)).start()
+    print(f"[BATCH] Micro-batching /predict: up to {micro_batcher.max_size} requests or {micro_batcher.max_wait * 1000:g}ms")
+
+
+def drift_training_frame(window: str) -> Optional[pd.DataFrame]:
+    """
+    Retraining data: stored predictions from the drift window plus a sample of the
+    training frame (DRIFT_RETRAIN_HISTORY_RATIO rows per recent record); None if too few recent
+    """
+    span, _ = DRIFT_WINDOWS[window]
+    columns = {"awarded_amt": [], "supplier_name": [], "agency": [], "award_date": []}
+    for record in PredictionStore.export(start=time.time() - span):
+        tx = record["input"]
+        columns["awarded_amt"].append(float(tx.get("amount") or 0.0))
+        columns["supplier_name"].append(tx.get("vendor") or "UNKNOWN")
+        columns["agency"].append(tx.get("agency") or "UNKNOWN")
+        columns["award_date"].append(record["timestamp"][:10])
+    recent = pd.DataFrame(columns)
+    if len(recent) < DRIFT_MIN_SAMPLES:
+        return None
+    
+    history = load_training_frame()[list(columns)]
+    keep = int(len(recent) * DRIFT_RETRAIN_HISTORY_RATIO)
+    if len(history) > keep:
+        history = history.sample(n=keep, random_state=RANDOM_SEED)
+    return pd.concat([history, recent], ignore_index=True)
+
+
+def retrain_engine(report: dict):
+    """Train a fresh engine on recent traffic in the background, then swap it in (requests keep using the old one meanwhile)"""
+    global fraud_engine
+    
+    if not _retrain_lock.acquire(blocking=False):
+        return  # A retrain is already running
+    try:
+        frame = drift_training_frame(DRIFT_RETRAIN_WINDOW)
+        if frame is None:
+            print(f"[DRIFT] Retrain skipped: fewer than {DRIFT_MIN_SAMPLES} stored predictions in {DRIFT_RETRAIN_WINDOW}")
+            return
+        print(f"[DRIFT] Retraining on {len(frame)} rows after drift in {report['drifted']}")
+        engine = FraudEngine()
+        engine.train(frame)
+        engine.context_providers = list(fraud_engine.context_providers)
+        engine.batch_observers = list(fraud_engine.batch_observers)
+        engine.rules.inherit_metrics(fraud_engine.rules)
+        drift_monitor.set_reference(engine.stats["drift_reference"])
+        fraud_engine = engine
+        print(f"[DRIFT] Retrained engine active (trained_at {engine.trained_at})")
+    except Exception as e:
+        print(f"WARNING: Drift retrain failed: {e}")
+    finally:
+        _retrain_lock.release()
+
+
+@app.on_event("shutdown")
+def checkpoint_stream_aggregates():
+    """Persist incremental aggregates so the next start only replays new records"""
+    for aggregate in stream_aggregates:
+        aggregate.checkpoint()
+    
+    if micro_batcher is not None:
+        micro_batcher.stop()
+    
+    if shadow_scorer is not None:
+        shadow_scorer.stop()
+    
+    # Commit any batched storage writes (SQLite backend)
+    PredictionStore.close()
+    AuditLogger.close()
+    
+    # Offline export of the amount sketches (AmountQuantiles.load); not read back at startup,
+    # where training rebuilds the sketches and online updates are replayed from the store
+    if fraud_engine is not None and "amount_quantiles" in fraud_engine.stats:
+        try:
+            fraud_engine.stats["amount_quantiles"].save(QUANTILE_SNAPSHOT)
+        except Exception as e:
+            print(f"WARNING: Quantile snapshot failed: {e}")
 
 
 # ==================== ROUTES ====================
@@ -127,12 +359,13 @@ def health():
 
 
 @app.post("/predict")
-def predict_fraud(tx: Transaction):
+def predict_fraud(tx: Transaction, explain: bool = False):
     """
     Predict fraud risk using FraudEngine (single decision authority)
     
     Architecture: Store prediction once, profile later
     Returns: prediction with ID for later profiling
+    explain: include per-feature attributions (stored with the prediction for profiling)
     """
     try:
         if fraud_engine is None:
@@ -147,19 +380,25 @@ def predict_fraud(tx: Transaction):
             "timing_accuracy_days": tx.timing_accuracy_days
         }
         
-        # SINGLE DECISION AUTHORITY
-        prediction = fraud_engine.predict(tx_dict)
+        # SINGLE DECISION AUTHORITY (scored with concurrent requests when micro-batching)
+        if micro_batcher is not None:
+            prediction = micro_batcher.submit(tx_dict, explain)
+        else:
+            prediction = fraud_engine.predict(tx_dict, explain=explain)
         
         # Generate basic summary
         summary = SummaryGenerator.generate_basic_summary(prediction)
         prediction["summary"] = summary
         
+        # Serialize once for both the prediction store and the audit trail
+        payload = RecordPayload(tx_dict, prediction)
+        
         # Store prediction for later profiling
-        prediction_id = PredictionStore.save_prediction(tx_dict, prediction)
+        prediction_id = PredictionStore.save_prediction(tx_dict, prediction, payload)
         prediction["prediction_id"] = prediction_id
         
         # Log to audit trail
-        AuditLogger.log_prediction(tx_dict, prediction, prediction_id)
+        AuditLogger.log_prediction(tx_dict, prediction, prediction_id, payload)
         
         return prediction
         
@@ -179,6 +418,255 @@ def predict_fraud(tx: Transaction):
         }
 
 
+@app.get("/rules")
+def get_rules():
+    """
+    Declarative risk rule registry (config.RISK_RULES)
+    
+    Returns each rule's weight, enabled flag, hit count and evaluation time
+    """
+    if fraud_engine is None:
+        raise HTTPException(status_code=503, detail="Engine not initialized")
+    return {
+        "base_score": fraud_engine.rules.base_score,
+        "rules": fraud_engine.rules.metrics()
+    }
+
+
+@app.get("/benford/ranking")
+def benford_ranking(entity: str = "vendor", digits: int = 1, limit: int = 20, min_count: Optional[int] = None):
+    """
+    Rank vendors/agencies by Benford nonconformity of their full amount history
+    
+    digits=1: first-digit test, digits=2: first-two-digits test (MAD, chi-square)
+    """
+    if benford_tracker is None:
+        raise HTTPException(status_code=503, detail="Benford tracker not initialized")
+    if entity not in ENTITY_TYPES or digits not in (1, 2):
+        raise HTTPException(status_code=400, detail="entity must be vendor|agency, digits must be 1|2")
+    
+    kwargs = {"min_count": min_count} if min_count is not None else {}
+    return {
+        "entity": entity,
+        "digits": digits,
+        "ranking": benford_tracker.ranking(entity, digits, limit, **kwargs)
+    }
+
+
+@app.get("/benford/{entity}/{name}")
+def benford_entity(entity: str, name: str):
+    """Digit distribution and Benford conformity for one vendor or agency"""
+    if benford_tracker is None:
+        raise HTTPException(status_code=503, detail="Benford tracker not initialized")
+    if entity not in ENTITY_TYPES:
+        raise HTTPException(status_code=400, detail="entity must be vendor|agency")
+    
+    report = benford_tracker.entity_report(entity, name)
+    if not report:
+        raise HTTPException(status_code=404, detail=f"No transactions recorded for {entity} {name}")
+    return report
+
+
+@app.get("/quantiles")
+def get_quantiles(agency: Optional[str] = None, q: str = "0.5,0.95,0.99"):
+    """
+    Amount percentiles from the t-digest sketches (global, or per agency)
+    
+    q: comma-separated quantiles in [0, 1]
+    """
+    if fraud_engine is None:
+        raise HTTPException(status_code=503, detail="Engine not initialized")
+    try:
+        qs = [float(v) for v in q.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="q must be comma-separated numbers")
+    
+    summary = fraud_engine.stats["amount_quantiles"].summary(qs, agency)
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"No amount sketch for agency {agency}")
+    return {"agency": agency, **summary}
+
+
+@app.get("/last-payment")
+def get_last_payment(vendor: str, agency: str):
+    """Server-side last payment timestamp and days since, per (vendor, agency)"""
+    if last_payment_tracker is None:
+        raise HTTPException(status_code=503, detail="Last payment tracker not initialized")
+    
+    return {
+        "vendor": vendor,
+        "agency": agency,
+        **last_payment_tracker.describe({"vendor": vendor, "agency": agency})
+    }
+
+
+@app.get("/top-entities")
+def get_top_entities(entity: str = "vendor", metric: str = "flagged_volume", window: str = "24h", k: int = 10):
+    """
+    Approximate top-K vendors/agencies over a rolling window (Space-Saving)
+    
+    metric: count | volume | anomalies | flagged_volume
+    Each entry carries its error bound: true value lies in [guaranteed_min, estimate]
+    """
+    if heavy_hitters is None:
+        raise HTTPException(status_code=503, detail="Heavy hitters not initialized")
+    if entity not in ENTITY_TYPES:
+        raise HTTPException(status_code=400, detail=f"entity must be one of {list(ENTITY_TYPES)}")
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {list(METRICS)}")
+    if window not in heavy_hitters.windows:
+        raise HTTPException(status_code=400, detail=f"window must be one of {list(heavy_hitters.windows)}")
+    
+    return heavy_hitters.top(window, entity, metric, k=max(1, min(k, heavy_hitters.capacity)))
+
+
+@app.get("/rollups")
+def get_rollups(entity: str = "agency", name: Optional[str] = None,
+                start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Daily time series from the materialized rollups (cost O(days), not O(transactions))
+    
+    entity: agency | vendor | all; name required unless entity=all
+    start / end: ISO dates, inclusive (default: the 30 days ending today, UTC)
+    """
+    if daily_rollups is None:
+        raise HTTPException(status_code=503, detail="Rollups not initialized")
+    if entity not in ROLLUP_ENTITIES:
+        raise HTTPException(status_code=400, detail=f"entity must be one of {list(ROLLUP_ENTITIES)}")
+    if entity != "all" and not name:
+        raise HTTPException(status_code=400, detail="name is required for agency / vendor rollups")
+    try:
+        start_time = parse_time(start)
+        end_time = parse_time(end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start / end must be ISO dates, e.g. 2026-01-10")
+    
+    if end_time is None:
+        end_time = time.time()
+    end_day = int(end_time // SECONDS_PER_DAY)
+    if start_time is None:
+        start_day = end_day - 29
+    else:
+        start_day = int(start_time // SECONDS_PER_DAY)
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    
+    return daily_rollups.series(entity, name, start_day, end_day)
+
+
+@app.get("/drift")
+def get_drift(window: str = "24h"):
+    """
+    Drift of live feature / fraud_score distributions vs. training, over a rolling window
+    
+    PSI per series (>= 0.1 warning, >= 0.25 drift) and binned KS distance
+    """
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Drift monitor not initialized")
+    if window not in drift_monitor.windows:
+        raise HTTPException(status_code=400, detail=f"window must be one of {list(drift_monitor.windows)}")
+    
+    return {
+        "trained_at": fraud_engine.trained_at,
+        "retrain_on_drift": DRIFT_RETRAIN_ENABLED,
+        **drift_monitor.report(window)
+    }
+
+
+@app.get("/shadow")
+def get_shadow_stats():
+    """Agreement between the primary engine and the shadow candidate on sampled traffic"""
+    if shadow_scorer is None:
+        raise HTTPException(status_code=503, detail="Shadow scoring not enabled (SHADOW_ENABLED) or still training")
+    
+    return {
+        "primary_model_version": fraud_engine.model_version,
+        "primary_params": fraud_engine.params,
+        **shadow_scorer.stats()
+    }
+
+
+@app.get("/batching")
+def get_batching_stats():
+    """Micro-batching metrics: batch-size distribution and added queue wait"""
+    if micro_batcher is None:
+        raise HTTPException(status_code=503, detail="Micro-batching not enabled (MICRO_BATCH_ENABLED)")
+    
+    return micro_batcher.stats()
+
+
+@app.get("/network")
+def network_summary():
+    """Vendor x agency award graph: size, connected components, cluster count"""
+    if vendor_network is None:
+        raise HTTPException(status_code=503, detail="Vendor network not initialized")
+    return vendor_network.summary()
+
+
+@app.get("/network/agencies")
+def network_agency_concentration(limit: int = 20, min_contracts: int = 10):
+    """Agencies ranked by spend concentration across vendors (HHI)"""
+    if vendor_network is None:
+        raise HTTPException(status_code=503, detail="Vendor network not initialized")
+    return {"agencies": vendor_network.agency_concentration(limit, min_contracts)}
+
+
+@app.get("/network/clusters")
+def network_clusters(min_vendors: int = 2, limit: int = 20):
+    """Groups of vendors that only ever win from the same small set of agencies"""
+    if vendor_network is None:
+        raise HTTPException(status_code=503, detail="Vendor network not initialized")
+    return {
+        "max_agencies": vendor_network.cluster_max_agencies,
+        "clusters": vendor_network.clusters(min_vendors, limit)
+    }
+
+
+@app.get("/network/vendor/{name}")
+def network_vendor(name: str, limit: int = 10):
+    """A vendor's agencies (share of each agency's spend) and co-bidders sharing its agencies"""
+    if vendor_network is None:
+        raise HTTPException(status_code=503, detail="Vendor network not initialized")
+    profile = vendor_network.vendor_profile(name, limit)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Vendor not in network")
+    return profile
+
+
+@app.get("/predictions")
+def list_predictions(agency: Optional[str] = None, vendor: Optional[str] = None,
+                     start: Optional[str] = None, end: Optional[str] = None,
+                     min_risk: Optional[int] = None, max_risk: Optional[int] = None,
+                     is_anomaly: Optional[bool] = None, limit: int = 50,
+                     cursor: Optional[int] = None, format: str = "json"):
+    """
+    Stored predictions, newest first, filtered through the secondary indexes
+    
+    start / end: ISO date or datetime (UTC if no offset), end exclusive
+    format=json: one page + next_cursor (pass back as ?cursor=)
+    format=ndjson: stream every match, one record per line
+    """
+    if not PredictionStore.is_indexed():
+        raise HTTPException(status_code=503, detail="Prediction index not initialized")
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json|ndjson")
+    try:
+        filters = {
+            "agency": agency, "vendor": vendor,
+            "start": parse_time(start), "end": parse_time(end),
+            "min_risk": min_risk, "max_risk": max_risk, "is_anomaly": is_anomaly,
+        }
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start / end must be ISO dates, e.g. 2026-01-10 or 2026-01-10T20:00:00Z")
+    
+    if format == "ndjson":
+        lines = (json.dumps(record) + "\n" for record in PredictionStore.export(cursor=cursor, **filters))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    
+    records, next_cursor = PredictionStore.query(limit=limit, cursor=cursor, **filters)
+    return {"predictions": records, "count": len(records), "next_cursor": next_cursor}
+
+
 @app.post("/generate-profile/{prediction_id}")
 def generate_profile_by_id(prediction_id: str):
     """
@@ -197,6 +685,14 @@ def generate_profile_by_id(prediction_id: str):
         tx_data = record["input"]
         prediction = record["output"]
         
+        # Attributions cached at /predict?explain=true; otherwise explain the stored input
+        # (explanation only - the stored scores are never recomputed)
+        attributions = prediction.get("attributions")
+        attributions_cached = attributions is not None
+        if attributions is None and fraud_engine is not None:
+            attributions = fraud_engine.explain([tx_data])[0]
+            prediction = {**prediction, "attributions": attributions}
+        
         # Generate vendor/agency profile using Ollama
         profile = SummaryGenerator.generate_vendor_profile(tx_data, prediction)
         
@@ -208,6 +704,8 @@ def generate_profile_by_id(prediction_id: str):
             "risk_score": prediction.get("risk_score"),
             "is_anomaly": prediction.get("is_anomaly"),
             "reasons": prediction.get("reasons", []),
+            "attributions": attributions,
+            "attributions_cached": attributions_cached,
             "vendor_profile": profile
         }
         
@@ -261,6 +759,51 @@ def generate_profile_direct(tx: Transaction):
         raise HTTPException(status_code=500, detail="Profile generation failed")
 
 
+@app.get("/similar/{prediction_id}")
+def similar_transactions(prediction_id: str, k: int = 10):
+    """
+    Historical transactions closest to a stored prediction in the model's feature space
+    
+    Neighbours are stored predictions (with their stored scores) or training transactions
+    """
+    if similarity_index is None:
+        raise HTTPException(status_code=503, detail="Similarity index not initialized")
+    
+    record = PredictionStore.load_prediction(prediction_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    
+    k = max(1, min(k, SIMILARITY_MAX_K))
+    started = time.perf_counter()
+    neighbors = similarity_index.query(record["input"], k, exclude=prediction_id)
+    query_ms = (time.perf_counter() - started) * 1000
+    
+    for neighbor in neighbors:
+        if "prediction_id" not in neighbor:
+            neighbor["source"] = "training"
+            continue
+        stored = PredictionStore.load_prediction(neighbor["prediction_id"]) or {}
+        output = stored.get("output", {})
+        neighbor.update({
+            "source": "prediction",
+            "timestamp": stored.get("timestamp"),
+            "transaction": stored.get("input"),
+            "fraud_score": output.get("fraud_score"),
+            "risk_score": output.get("risk_score"),
+            "is_anomaly": output.get("is_anomaly"),
+        })
+    
+    return {
+        "prediction_id": prediction_id,
+        "transaction": record["input"],
+        "features": similarity_index.features,
+        "k": k,
+        "query_ms": round(query_ms, 3),
+        "neighbors": neighbors,
+        "index": similarity_index.stats()
+    }
+
+
 @app.get("/vendor-history/{vendor}")
 def get_vendor_history(vendor: str):
     """
@@ -292,8 +835,14 @@ async def chat(request: dict):
             raise HTTPException(status_code=400, detail="Message required")
             
         print(f"Chat Request: {message}")
-        response_text = SummaryGenerator.chat_response(message)
-        return {"response": response_text}
+        
+        # Ground the answer in stored predictions for recognized vendors / agencies / reason terms
+        context, sources = None, []
+        if chat_index is not None:
+            context, _, sources = chat_index.context(message)
+        
+        response_text = SummaryGenerator.chat_response(message, context)
+        return {"response": response_text, "sources": sources}
         
     except Exception as e:
         print(f"Chat Error: {e}")
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Vendor-Agency Network - Concentration and collusion signals on the award graph
+Bipartite vendor x agency spend matrix (SciPy sparse) with incrementally maintained structure statistics
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import NETWORK_CHECKPOINT, NETWORK_CLUSTER_MAX_AGENCIES
+from entity_stats import normalize_name, RAW_CACHE_LIMIT
+from prediction_index import _Column
+from streaming import StreamingAggregate
+
+
+class VendorAgencyNetwork(StreamingAggregate):
+    """
+    Weighted bipartite graph: edge (vendor, agency) = contract count and spend
+
+    Maintained in O(1) per transaction (no rebuilds):
+    - Agency concentration: HHI = sum_v (spend_av / spend_a)^2, kept as
+      sum_v spend_av^2 per agency and updated by 2*s*x + x^2
+    - Vendor fan-in: number of distinct agencies the vendor has won from
+    - Clusters: vendors grouped by their exact agency set when it has 2 to
+      NETWORK_CLUSTER_MAX_AGENCIES agencies ("suppliers that only win from the
+      same agencies"; single-agency vendors are the captive-vendor signal)
+    - Connected components: union-find over vendors + agencies (edges are only added)
+
+    Seeded from the training frame, then updated from saved predictions
+    (PredictionStore listener). matrix() materializes the SciPy CSR matrix
+    on demand for analytics (co-bidders); the request path never builds it.
+    Context provider for FraudEngine: fills the network risk layers.
+    """
+
+    name = "network"
+
+    def __init__(self, checkpoint_path: Optional[str] = NETWORK_CHECKPOINT,
+                 cluster_max_agencies: int = NETWORK_CLUSTER_MAX_AGENCIES, **kwargs):
+        self.cluster_max_agencies = cluster_max_agencies
+        self._training: Optional[pd.DataFrame] = None
+        self._keys: Dict[Any, str] = {}  # raw name -> normalize_name()
+        self._matrix: Optional[Tuple[int, sp.csr_matrix]] = None
+        self.version = 0  # Bumped on every graph change (including resets); keys the matrix() cache
+        super().__init__(checkpoint_path, **kwargs)
+
+    # ----- graph state -----
+    def _reset(self) -> None:
+        self.vendor_index: Dict[str, int] = {}
+        self.vendor_names: List[str] = []
+        self.agency_index: Dict[str, int] = {}
+        self.agency_names: List[str] = []
+        self.pairs: Dict[Tuple[int, int], int] = {}
+        self.pair_vendor = _Column(np.int32)
+        self.pair_agency = _Column(np.int32)
+        self.pair_count = _Column(np.int64)
+        self.pair_amount = _Column(np.float64)
+
+        self.agency_count: List[int] = []
+        self.agency_amount: List[float] = []
+        self.agency_amount_sq: List[float] = []  # sum over vendors of spend_av^2
+        self.agency_vendors: List[int] = []
+        self.vendor_count: List[int] = []
+        self.vendor_agencies: List[set] = []
+        self.groups: Dict[frozenset, int] = {}  # exact agency set -> vendors (clusterable sets only)
+
+        # Union-find over nodes; vendor / agency -> node id
+        self.vendor_node: List[int] = []
+        self.agency_node: List[int] = []
+        self.parent: List[int] = []
+        self.component_vendors: List[int] = []
+        self.component_agencies: List[int] = []
+        self.edges = 0
+        self.version += 1
+
+        if self._training is not None:
+            for row in self._training.itertuples(index=False):
+                self._add(row.vendor, row.agency, row.amount, row.count)
+
+    def seed(self, df: pd.DataFrame) -> None:
+        """Training-time graph (supplier_name, agency, awarded_amt); kept under every later rebuild"""
+        frame = pd.DataFrame({
+            "vendor": df["supplier_name"].fillna("UNKNOWN").astype(str),
+            "agency": df["agency"].fillna("UNKNOWN").astype(str),
+            "amount": pd.to_numeric(df["awarded_amt"], errors="coerce").fillna(0.0).clip(lower=0.0),
+        })
+        # One row per normalized pair, keeping the first spelling seen as display name
+        keys = [frame["vendor"].map(self._key), frame["agency"].map(self._key)]
+        self._training = frame.groupby(keys, sort=False).agg(
+            vendor=("vendor", "first"), agency=("agency", "first"),
+            amount=("amount", "sum"), count=("amount", "size")).reset_index(drop=True)
+        with self._lock:
+            self._reset()
+
+    def _key(self, name: Any) -> str:
+        key = self._keys.get(name)
+        if key is None:
+            if len(self._keys) >= RAW_CACHE_LIMIT:
+                self._keys.clear()
+            key = self._keys[name] = normalize_name(name) or "unknown"
+        return key
+
+    def _node(self, vendors: int, agencies: int) -> int:
+        self.parent.append(len(self.parent))
+        self.component_vendors.append(vendors)
+        self.component_agencies.append(agencies)
+        return len(self.parent) - 1
+
+    def _find(self, node: int) -> int:
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, a: int, b: int) -> None:
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        if self.component_vendors[a] + self.component_agencies[a] < self.component_vendors[b] + self.component_agencies[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.component_vendors[a] += self.component_vendors[b]
+        self.component_agencies[a] += self.component_agencies[b]
+
+    def _vendor(self, key: str, display: str) -> int:
+        v = self.vendor_index.get(key)
+        if v is None:
+            v = self.vendor_index[key] = len(self.vendor_names)
+            self.vendor_names.append(display)
+            self.vendor_count.append(0)
+            self.vendor_agencies.append(set())
+            self.vendor_node.append(self._node(1, 0))
+        return v
+
+    def _agency(self, key: str, display: str) -> int:
+        a = self.agency_index.get(key)
+        if a is None:
+            a = self.agency_index[key] = len(self.agency_names)
+            self.agency_names.append(display)
+            self.agency_count.append(0)
+            self.agency_amount.append(0.0)
+            self.agency_amount_sq.append(0.0)
+            self.agency_vendors.append(0)
+            self.agency_node.append(self._node(0, 1))
+        return a
+
+    def _clusterable(self, agencies: frozenset) -> bool:
+        return 2 <= len(agencies) <= self.cluster_max_agencies
+
+    def _regroup(self, old: frozenset, new: frozenset) -> None:
+        if self._clusterable(old):
+            self.groups[old] -= 1
+            if not self.groups[old]:
+                del self.groups[old]
+        if self._clusterable(new):
+            self.groups[new] = self.groups.get(new, 0) + 1
+
+    def _add(self, vendor: Any, agency: Any, amount: float, count: int = 1) -> None:
+        v = self._vendor(self._key(vendor), str(vendor))
+        a = self._agency(self._key(agency), str(agency))
+        x = max(float(amount or 0.0), 0.0)
+        p = self.pairs.get((v, a))
+        if p is None:
+            p = self.pairs[(v, a)] = self.pair_count.size
+            for column, value in ((self.pair_vendor, v), (self.pair_agency, a), (self.pair_count, 0), (self.pair_amount, 0.0)):
+                column.append(value)
+            old = frozenset(self.vendor_agencies[v])
+            self.vendor_agencies[v].add(a)
+            self._regroup(old, frozenset(self.vendor_agencies[v]))
+            self.agency_vendors[a] += 1
+            self._union(self.vendor_node[v], self.agency_node[a])
+            self.edges += 1
+
+        spend = self.pair_amount.data[p]
+        self.agency_amount_sq[a] += 2.0 * spend * x + x * x
+        self.pair_amount.data[p] = spend + x
+        self.pair_count.data[p] += count
+        self.agency_amount[a] += x
+        self.agency_count[a] += count
+        self.vendor_count[v] += count
+        self.version += 1
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        tx = record.get("input", {})
+        self._add(tx.get("vendor") or "UNKNOWN", tx.get("agency") or "UNKNOWN", tx.get("amount"))
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "vendor_names": np.array(self.vendor_names, dtype=str),
+            "agency_names": np.array(self.agency_names, dtype=str),
+            "pair_vendor": self.pair_vendor.view().copy(),
+            "pair_agency": self.pair_agency.view().copy(),
+            "pair_count": self.pair_count.view().copy(),
+            "pair_amount": self.pair_amount.view().copy(),
+        }
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        # _reset() re-seeded the training graph; the checkpoint already contains it
+        self._training, training = None, self._training
+        self._reset()
+        self._training = training
+        vendors, agencies = arrays["vendor_names"].tolist(), arrays["agency_names"].tolist()
+        for v, a, count, amount in zip(arrays["pair_vendor"].tolist(), arrays["pair_agency"].tolist(),
+                                       arrays["pair_count"].tolist(), arrays["pair_amount"].tolist()):
+            self._add(vendors[v], agencies[a], amount, count)
+
+    # ----- per-transaction signals -----
+    def hhi(self, a: int) -> float:
+        total = self.agency_amount[a]
+        return self.agency_amount_sq[a] / (total * total) if total > 0 else 0.0
+
+    def snapshot(self, tx: Dict[str, Any], batch: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Network position of a (vendor, agency) pair before this transaction
+
+        batch holds the earlier rows of the batch being scored (not in the graph
+        until after scoring): contract counts and fan-in include them; spend
+        shares, HHI and clusters are read from the stored graph only.
+        """
+        vendor_key = self._key(tx.get("vendor") or "UNKNOWN")
+        agency_key = self._key(tx.get("agency") or "UNKNOWN")
+        with self._lock:
+            v = self.vendor_index.get(vendor_key)
+            a = self.agency_index.get(agency_key)
+            result = {
+                "agency_hhi": round(self.hhi(a), 4) if a is not None else 0.0,
+                "agency_vendors": self.agency_vendors[a] if a is not None else 0,
+                "agency_contracts": self.agency_count[a] if a is not None else 0,
+                "vendor_agency_share": 0.0,
+                "vendor_fan_in": len(self.vendor_agencies[v]) if v is not None else 0,
+                "vendor_contracts": self.vendor_count[v] if v is not None else 0,
+                "cluster_vendors": 0,
+                "cluster_agencies": 0,
+                "component_vendors": 0,
+                "component_agencies": 0,
+            }
+            if v is not None and a is not None and (v, a) in self.pairs and self.agency_amount[a] > 0:
+                result["vendor_agency_share"] = round(self.pair_amount.data[self.pairs[(v, a)]] / self.agency_amount[a], 4)
+            if v is not None:
+                agencies = frozenset(self.vendor_agencies[v])
+                if self._clusterable(agencies):
+                    result["cluster_vendors"] = self.groups.get(agencies, 0)
+                    result["cluster_agencies"] = len(agencies)
+                root = self._find(self.vendor_node[v])
+                result["component_vendors"] = self.component_vendors[root]
+                result["component_agencies"] = self.component_agencies[root]
+            if batch:
+                result["vendor_contracts"] += batch["vendor"].get(vendor_key, 0)
+                result["agency_contracts"] += batch["agency"].get(agency_key, 0)
+                stored = self.vendor_agencies[v] if v is not None else ()
+                result["vendor_fan_in"] += sum(1 for key in batch["fan_in"].get(vendor_key, ())
+                                               if self.agency_index.get(key) not in stored)
+        return result
+
+    def features(self, txs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Rule context arrays for the network layers"""
+        snapshots, batch = [], {"vendor": {}, "agency": {}, "fan_in": {}}
+        for tx in txs:
+            snapshots.append(self.snapshot(tx, batch))
+            vendor_key = self._key(tx.get("vendor") or "UNKNOWN")
+            agency_key = self._key(tx.get("agency") or "UNKNOWN")
+            batch["vendor"][vendor_key] = batch["vendor"].get(vendor_key, 0) + 1
+            batch["agency"][agency_key] = batch["agency"].get(agency_key, 0) + 1
+            batch["fan_in"].setdefault(vendor_key, set()).add(agency_key)
+        features: Dict[str, Any] = {"network": snapshots}
+        for field, context_name in (("agency_hhi", "agency_hhi"), ("vendor_agency_share", "vendor_agency_share"),
+                                    ("agency_contracts", "agency_network_contracts"), ("vendor_fan_in", "vendor_fan_in"),
+                                    ("vendor_contracts", "vendor_network_contracts"), ("cluster_vendors", "cluster_vendors"),
+                                    ("cluster_agencies", "cluster_agencies")):
+            features[context_name] = np.array([s[field] for s in snapshots])
+        return features
+
+    def report(self, features: Dict[str, Any], i: int) -> Dict[str, Any]:
+        """Per-transaction output fragment (prediction['network'])"""
+        return features["network"][i]
+
+    # ----- analytics -----
+    def matrix(self) -> sp.csr_matrix:
+        """vendors x agencies spend matrix (CSR), cached until the graph changes"""
+        with self._lock:
+            version = self.version
+            if self._matrix is None or self._matrix[0] != version:
+                shape = (len(self.vendor_names), len(self.agency_names))
+                matrix = sp.csr_matrix((self.pair_amount.view().copy(),
+                                        (self.pair_vendor.view().copy(), self.pair_agency.view().copy())), shape=shape)
+                self._matrix = (version, matrix)
+            return self._matrix[1]
+
+    def agency_concentration(self, limit: int = 20, min_contracts: int = 10) -> List[Dict[str, Any]]:
+        """Agencies ranked by HHI of spend across vendors"""
+        with self._lock:
+            rows = [a for a in range(len(self.agency_names)) if self.agency_count[a] >= min_contracts]
+            rows.sort(key=lambda a: (-self.hhi(a), -self.agency_amount[a]))
+            result = []
+            for a in rows[:limit]:
+                result.append({
+                    "agency": self.agency_names[a],
+                    "hhi": round(self.hhi(a), 4),
+                    "vendors": self.agency_vendors[a],
+                    "contracts": self.agency_count[a],
+                    "total_amount": round(self.agency_amount[a], 2),
+                })
+            return result
+
+    def vendor_profile(self, name: str, limit: int = 10) -> Optional[Dict[str, Any]]:
+        """Agencies a vendor wins from (with its share of each) and its strongest co-bidders"""
+        matrix = self.matrix()
+        with self._lock:
+            v = self.vendor_index.get(self._key(name))
+            if v is None or v >= matrix.shape[0]:
+                return None
+            row = matrix.getrow(v)
+            agencies = []
+            for a, spend in sorted(zip(row.indices.tolist(), row.data.tolist()), key=lambda item: -item[1]):
+                agencies.append({
+                    "agency": self.agency_names[a],
+                    "contracts": int(self.pair_count.data[self.pairs[(v, a)]]),
+                    "amount": round(spend, 2),
+                    "share_of_agency_spend": round(spend / self.agency_amount[a], 4) if self.agency_amount[a] > 0 else 0.0,
+                    "agency_hhi": round(self.hhi(a), 4),
+                })
+
+            # Co-occurrence: vendors sharing agencies with this one (binary B @ B[v].T)
+            binary = matrix.astype(bool).astype(np.int32)
+            shared = np.asarray((binary @ binary.getrow(v).T).todense()).ravel()
+            shared[v] = 0
+            fan_in = np.diff(binary.indptr)
+            peers = np.flatnonzero(shared)
+            jaccard = shared[peers] / (fan_in[peers] + fan_in[v] - shared[peers])
+            order = np.lexsort((-shared[peers], -jaccard))[:limit]
+            co_bidders = [{
+                "vendor": self.vendor_names[peers[j]],
+                "shared_agencies": int(shared[peers[j]]),
+                "jaccard": round(float(jaccard[j]), 4),
+            } for j in order]
+
+            root = self._find(self.vendor_node[v])
+            return {
+                "vendor": self.vendor_names[v],
+                "fan_in": len(self.vendor_agencies[v]),
+                "contracts": self.vendor_count[v],
+                "agencies": agencies,
+                "co_bidders": co_bidders,
+                "component": {"vendors": self.component_vendors[root], "agencies": self.component_agencies[root]},
+            }
+
+    def clusters(self, min_vendors: int = 2, limit: int = 20) -> List[Dict[str, Any]]:
+        """Groups of vendors that only ever win from the same small agency set, largest first"""
+        with self._lock:
+            sets = sorted(((agencies, size) for agencies, size in self.groups.items() if size >= min_vendors),
+                          key=lambda item: (-item[1], len(item[0])))[:limit]
+            wanted = {agencies: [] for agencies, _ in sets}
+            for v, agencies in enumerate(self.vendor_agencies):
+                key = frozenset(agencies)
+                if key in wanted:
+                    wanted[key].append(self.vendor_names[v])
+            return [{
+                "agencies": sorted(self.agency_names[a] for a in agencies),
+                "vendor_count": size,
+                "vendors": sorted(wanted[agencies])[:50],
+            } for agencies, size in sets]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            roots = {self._find(node) for node in self.vendor_node}
+            sizes = sorted((self.component_vendors[r] + self.component_agencies[r] for r in roots), reverse=True)
+            return {
+                "vendors": len(self.vendor_names),
+                "agencies": len(self.agency_names),
+                "edges": self.edges,
+                "components": len(roots),
+                "largest_components": sizes[:5],
+                "clusters": sum(1 for size in self.groups.values() if size >= 2),
+                "cluster_max_agencies": self.cluster_max_agencies,
+            }
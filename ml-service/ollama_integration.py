@@ -52,6 +52,15 @@ class SummaryGenerator:
             risk_score = prediction["risk_score"]
             reasons = prediction.get("reasons", [])
             
+            # Top ML score drivers (per-feature Isolation Forest attributions)
+            drivers = ""
+            attributions = prediction.get("attributions")
+            if attributions:
+                top = attributions["features"][:3]
+                drivers = "\n- ML Score Drivers: " + ", ".join(
+                    f"{f['feature']} ({f['share']:.0%} of isolation, {f['lift']}x typical)" for f in top
+                )
+            
             # Build vendor context section from MongoDB data
             vendor_history = ""
             if vendor_context:
@@ -78,7 +87,7 @@ Transaction Details:
 - Amount: ₹{amount:,.2f}
 - ML Fraud Score: {fraud_score} (0.0-1.0 scale, higher = more anomalous)
 - Risk Score: {risk_score}/99 (rule-based assessment)
-- Flagged as Anomaly: {prediction['is_anomaly']}
+- Flagged as Anomaly: {prediction['is_anomaly']}{drivers}
 {vendor_history}
 Risk Indicators Detected:
 {chr(10).join(f"• {r}" for r in reasons) if reasons else "• No specific risk indicators"}
@@ -110,9 +119,11 @@ Be concise, factual, and focus only on the provided risk indicators and vendor h
             return SummaryGenerator.generate_basic_summary(prediction) + " [LLM failed]"
 
     @staticmethod
-    def chat_response(message: str) -> str:
+    def chat_response(message: str, context: Optional[str] = None) -> str:
         """
         Interative Chat with PFMS Sahayak
+        
+        context: stored prediction data retrieved for this message (ChatIndex), cited verbatim
         """
         try:
             import ollama
@@ -130,6 +141,15 @@ The user is an oversight officer monitoring real-time transactions.
 
 If the user asks about specific vendors or schemes, explain that you can analyze them if they navigate to the respective dashboard or provide an ID.
 Do not hallucinate specific data unless provided in the context."""
+            
+            if context:
+                system_prompt += f"""
+
+Data Context (from the fraud detection prediction store):
+{context}
+
+Answer questions about these vendors, agencies and records using only the data above, citing prediction IDs where relevant.
+The system identifies risk indicators; it never declares fraud."""
 
             response = ollama.chat(
                 model='llama3:8b',
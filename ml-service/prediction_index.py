@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Prediction Index - Secondary indexes over the prediction store
+Columnar filter fields + per-agency / per-vendor posting lists + file offsets,
+so list queries touch only matching records instead of scanning the file
+"""
+
+import threading
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from entity_stats import normalize_name
+from streaming import record_epoch
+
+SCAN_BLOCK = 65536  # rows examined per vectorized filter step
+MAX_PAGE_SIZE = 1000
+
+
+class _Column:
+    """Append-only numpy column with amortized O(1) growth"""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value) -> None:
+        if self.size == self.data.size:
+            grown = np.empty(self.data.size * 2, dtype=self.data.dtype)
+            grown[:self.size] = self.data
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def view(self) -> np.ndarray:
+        # Rows below size never change, so the view stays valid while appends continue
+        return self.data[:self.size]
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """ISO date / datetime ('2026-01-10', '2026-01-10T20:00:00Z') -> UTC epoch seconds"""
+    if value is None:
+        return None
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class PredictionIndex:
+    """
+    In-memory secondary indexes for PredictionStore
+
+    - Row i = i-th stored record; columns hold its offset, time, risk, fraud
+      score, anomaly flag and interned agency / vendor ids (~40 bytes per row)
+    - Posting lists per normalized agency / vendor name (ascending rows)
+    - Queries walk candidate rows newest-first in blocks with vectorized masks;
+      the cursor is the last row returned, so pages are stable under appends
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.offsets = _Column(np.int64)
+        self.epochs = _Column(np.float64)
+        self.risk = _Column(np.int16)
+        self.fraud = _Column(np.float32)
+        self.anomaly = _Column(np.bool_)
+        self.agency_ids = _Column(np.int32)
+        self.vendor_ids = _Column(np.int32)
+        self.entity_ids: Dict[str, Dict[str, int]] = {"agency": {}, "vendor": {}}
+        self.postings: Dict[str, List[_Column]] = {"agency": [], "vendor": []}
+        self.prediction_rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self.offsets.size
+
+    def _entity_id(self, entity: str, name: Optional[str]) -> int:
+        ids = self.entity_ids[entity]
+        key = normalize_name(name or "UNKNOWN")
+        entity_id = ids.get(key)
+        if entity_id is None:
+            entity_id = ids[key] = len(ids)
+            self.postings[entity].append(_Column(np.int64, capacity=4))
+        return entity_id
+
+    def add(self, record: Dict[str, Any], offset: int) -> None:
+        """Index one stored record located at `offset` in the store file"""
+        tx = record.get("input", {})
+        output = record.get("output", {})
+        try:
+            epoch = record_epoch(record)
+        except ValueError:
+            epoch = np.nan
+        with self._lock:
+            row = self.offsets.size
+            agency_id = self._entity_id("agency", tx.get("agency"))
+            vendor_id = self._entity_id("vendor", tx.get("vendor"))
+            self.offsets.append(offset)
+            self.epochs.append(epoch)
+            self.risk.append(output.get("risk_score") or 0)
+            self.fraud.append(output.get("fraud_score") or 0.0)
+            self.anomaly.append(bool(output.get("is_anomaly")))
+            self.agency_ids.append(agency_id)
+            self.vendor_ids.append(vendor_id)
+            self.postings["agency"][agency_id].append(row)
+            self.postings["vendor"][vendor_id].append(row)
+            self.prediction_rows[record.get("prediction_id", "")] = row
+
+    # ----- queries -----
+    def offset_of(self, prediction_id: str) -> Optional[int]:
+        with self._lock:
+            row = self.prediction_rows.get(prediction_id)
+            return None if row is None else int(self.offsets.data[row])
+
+    def scan(self, agency: Optional[str] = None, vendor: Optional[str] = None,
+             start: Optional[float] = None, end: Optional[float] = None,
+             min_risk: Optional[int] = None, max_risk: Optional[int] = None,
+             is_anomaly: Optional[bool] = None, before: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Yield (rows, offsets) blocks of matching records, newest first
+
+        before: only rows below this row number (pagination cursor)
+        """
+        with self._lock:
+            n = self.offsets.size
+            columns = {name: getattr(self, name).view() for name in
+                       ("offsets", "epochs", "risk", "fraud", "anomaly", "agency_ids", "vendor_ids")}
+            wanted = {}
+            for entity, name in (("agency", agency), ("vendor", vendor)):
+                if name is not None:
+                    entity_id = self.entity_ids[entity].get(normalize_name(name))
+                    if entity_id is None:
+                        return
+                    wanted[entity] = (entity_id, self.postings[entity][entity_id].view())
+
+        limit = n if before is None else min(before, n)
+        if wanted:
+            # Walk the shorter posting list, check the other entity by column
+            entity, (_, candidates) = min(wanted.items(), key=lambda kv: kv[1][1].size)
+            candidates = candidates[:np.searchsorted(candidates, limit)]
+        else:
+            candidates = None
+
+        stop = candidates.size if candidates is not None else limit
+        while stop > 0:
+            begin = max(0, stop - SCAN_BLOCK)
+            rows = candidates[begin:stop] if candidates is not None else np.arange(begin, stop)
+            mask = np.ones(rows.size, dtype=bool)
+            for other, (entity_id, _) in wanted.items():
+                mask &= columns[f"{other}_ids"][rows] == entity_id
+            if start is not None:
+                mask &= columns["epochs"][rows] >= start
+            if end is not None:
+                mask &= columns["epochs"][rows] < end
+            if min_risk is not None:
+                mask &= columns["risk"][rows] >= min_risk
+            if max_risk is not None:
+                mask &= columns["risk"][rows] <= max_risk
+            if is_anomaly is not None:
+                mask &= columns["anomaly"][rows] == is_anomaly
+            rows = rows[mask][::-1]
+            if rows.size:
+                yield rows, columns["offsets"][rows]
+            stop = begin
+
+    def page(self, limit: int, **filters) -> Tuple[np.ndarray, Optional[int]]:
+        """Offsets of up to `limit` newest matching records, and the cursor for the next page (None when done)"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        rows_taken, offsets_taken = [], []
+        taken = 0
+        # One row past the page tells whether another page exists
+        for rows, offsets in self.scan(**filters):
+            rows_taken.append(rows[:limit + 1 - taken])
+            offsets_taken.append(offsets[:limit + 1 - taken])
+            taken += rows_taken[-1].size
+            if taken > limit:
+                break
+        if not rows_taken:
+            return np.empty(0, dtype=np.int64), None
+        rows = np.concatenate(rows_taken)
+        next_cursor = int(rows[limit - 1]) if taken > limit else None
+        return np.concatenate(offsets_taken)[:limit], next_cursor
+
+    def nbytes(self) -> int:
+        columns = (self.offsets, self.epochs, self.risk, self.fraud, self.anomaly, self.agency_ids, self.vendor_ids)
+        postings = sum(p.data.nbytes for lists in self.postings.values() for p in lists)
+        return sum(c.data.nbytes for c in columns) + postings
@@ -4,12 +4,11 @@ Prediction Storage - Store predictions once, generate profiles later
 Architecture: /predict → save prediction with ID, /generate-profile/{id} → load stored prediction
 """
 
-import os
-import json
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Iterator, Tuple
 
-from config import PREDICTIONS_STORE
+from record_codec import RecordPayload
+from storage_backends import StorageBackend, create_backend
 
 
 class PredictionStore:
@@ -19,11 +18,69 @@ class PredictionStore:
     Architecture:
     1. /predict → save prediction with ID
     2. /generate-profile/{id} → load stored prediction, generate profile
+    
+    Listeners registered with add_listener() receive every saved record
+    (streaming aggregates update incrementally instead of rescanning the file)
+    
+    Records live in the configured StorageBackend (STORAGE_BACKEND: JSONL /
+    msgpack files by default, or SQLite). build_index() enables query() and
+    indexed load_prediction()
     """
     
+    _listeners: List[Callable[[Dict[str, Any]], None]] = []
+    _backend: StorageBackend = create_backend("predictions")
+    
+    @classmethod
+    def add_listener(cls, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callback invoked with each record after it is saved"""
+        cls._listeners.append(listener)
+    
+    @classmethod
+    def _notify(cls, record: Dict[str, Any]) -> None:
+        for listener in cls._listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                print(f"WARNING: Prediction listener failed: {e}")
+    
     @staticmethod
-    def save_prediction(tx_input: Dict[str, Any], prediction: Dict[str, Any]) -> str:
-        """Save prediction to JSONL store, return prediction ID"""
+    def iter_records() -> Iterator[Dict[str, Any]]:
+        """Stream every stored record in write order (one pass, constant memory)"""
+        yield from PredictionStore._backend.iter_records()
+    
+    @classmethod
+    def build_index(cls) -> None:
+        """Index the existing store; later saves are indexed as they are written"""
+        cls._backend.build_index()
+    
+    @classmethod
+    def is_indexed(cls) -> bool:
+        return cls._backend.indexed
+    
+    @classmethod
+    def query(cls, limit: int = 50, cursor: Optional[int] = None, **filters) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of stored predictions matching the filters, newest first
+        
+        filters: agency, vendor, start, end (epoch seconds), min_risk, max_risk, is_anomaly
+        Returns (records, next_cursor); pass next_cursor back for the following page
+        """
+        return cls._backend.query(limit=limit, cursor=cursor, **filters)
+    
+    @classmethod
+    def export(cls, cursor: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        """Every matching record, newest first, read in small batches (constant memory)"""
+        return cls._backend.export(cursor=cursor, **filters)
+    
+    @classmethod
+    def close(cls) -> None:
+        """Flush buffered writes (shutdown)"""
+        cls._backend.close()
+    
+    @staticmethod
+    def save_prediction(tx_input: Dict[str, Any], prediction: Dict[str, Any],
+                        payload: Optional[RecordPayload] = None) -> str:
+        """Save prediction to the store, return prediction ID (payload: input/output already serialized)"""
         try:
             prediction_id = f"PRED-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
             
@@ -34,9 +91,11 @@ class PredictionStore:
                 "output": prediction
             }
             
-            with open(PREDICTIONS_STORE, "a") as f:
-                f.write(json.dumps(record) + "\n")
+            line = payload.to_json(head={"prediction_id": prediction_id, "timestamp": record["timestamp"]}) \
+                if payload is not None else None
+            PredictionStore._backend.append(record, line)
             
+            PredictionStore._notify(record)
             return prediction_id
         except Exception as e:
             print(f"WARNING: Prediction storage failed: {e}")
@@ -44,18 +103,9 @@ class PredictionStore:
     
     @staticmethod
     def load_prediction(prediction_id: str) -> Optional[Dict[str, Any]]:
-        """Load stored prediction by ID"""
+        """Load stored prediction by ID (index lookup when built, else a scan)"""
         try:
-            if not os.path.exists(PREDICTIONS_STORE):
-                return None
-            
-            with open(PREDICTIONS_STORE, "r") as f:
-                for line in f:
-                    record = json.loads(line)
-                    if record.get("prediction_id") == prediction_id:
-                        return record
-            
-            return None
+            return PredictionStore._backend.get(prediction_id)
         except Exception as e:
             print(f"WARNING: Prediction load failed: {e}")
             return None
@@ -63,43 +113,28 @@ class PredictionStore:
     @staticmethod
     def get_vendor_history(vendor: str, limit: int = 100) -> Dict[str, Any]:
         """
-        Query vendor historical data from predictions_store.jsonl
+        Query vendor historical data from the prediction store
         
         Returns vendor statistics and recent transactions for Ollama context
         """
         try:
-            if not os.path.exists(PREDICTIONS_STORE):
-                return {
-                    "totalTransactions": 0,
-                    "averageAmount": 0,
-                    "totalVolume": 0,
-                    "highRiskCount": 0,
-                    "averageRiskScore": 0,
-                    "recentTransactions": []
-                }
-            
             vendor_records = []
             
             # Read all predictions for this vendor
-            with open(PREDICTIONS_STORE, "r") as f:
-                for line in f:
-                    try:
-                        record = json.loads(line)
-                        tx_input = record.get("input", {})
-                        tx_output = record.get("output", {})
-                        
-                        # Match vendor
-                        if tx_input.get("vendor", "").lower() == vendor.lower():
-                            vendor_records.append({
-                                "amount": tx_input.get("amount", 0),
-                                "riskScore": tx_output.get("risk_score", 0),
-                                "fraudScore": tx_output.get("fraud_score", 0),
-                                "timestamp": record.get("timestamp", ""),
-                                "agency": tx_input.get("agency", "Unknown"),
-                                "isAnomaly": tx_output.get("is_anomaly", False)
-                            })
-                    except json.JSONDecodeError:
-                        continue
+            for record in PredictionStore.iter_records():
+                tx_input = record.get("input", {})
+                tx_output = record.get("output", {})
+                
+                # Match vendor
+                if tx_input.get("vendor", "").lower() == vendor.lower():
+                    vendor_records.append({
+                        "amount": tx_input.get("amount", 0),
+                        "riskScore": tx_output.get("risk_score", 0),
+                        "fraudScore": tx_output.get("fraud_score", 0),
+                        "timestamp": record.get("timestamp", ""),
+                        "agency": tx_input.get("agency", "Unknown"),
+                        "isAnomaly": tx_output.get("is_anomaly", False)
+                    })
             
             # Calculate statistics
             total_transactions = len(vendor_records)
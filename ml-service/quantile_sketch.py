@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Quantile Sketches - Mergeable t-digests for global and per-agency amount percentiles
+Constant memory per agency, built at training time, optionally updated online
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Iterable, List, Optional
+
+from config import QUANTILE_COMPRESSION, QUANTILE_BUFFER_SIZE
+from entity_stats import normalize_name
+from streaming import atomic_save_npz
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) with vectorized compression
+
+    Centroids are grouped so each spans at most one unit of the arcsine scale
+    function k(q) = delta / (2 pi) * asin(2q - 1): tails stay near-exact, the
+    middle is coarse. Size is O(delta) regardless of how many values are added.
+    """
+
+    def __init__(self, compression: float = QUANTILE_COMPRESSION, buffer_size: int = QUANTILE_BUFFER_SIZE):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer: List[float] = []
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum()) + len(self._buffer)
+
+    def add(self, value: float) -> None:
+        self._buffer.append(float(value))
+        if len(self._buffer) >= self.buffer_size:
+            self._flush()
+
+    def add_many(self, values: Iterable[float]) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if values.size:
+            self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(values.size)]))
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Fold another digest into this one (order-independent up to compression error)"""
+        other._flush()
+        self._flush()
+        if other.weights.size:
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    def _flush(self) -> None:
+        if self._buffer:
+            buffered = self._buffer
+            self._buffer = []
+            self.add_many(buffered)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        self.min = min(self.min, means[0])
+        self.max = max(self.max, means[-1])
+
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(cluster)) + 1])
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def quantiles(self, qs: Iterable[float]) -> np.ndarray:
+        self._flush()
+        qs = np.clip(np.asarray(qs, dtype=np.float64), 0.0, 1.0)
+        if not self.weights.size:
+            return np.full(qs.shape, np.nan)
+        if self.weights.size == 1:
+            return np.full(qs.shape, self.means[0])
+        # Interpolate between centroid centers, anchored at the exact min / max
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], centers, [self.weights.sum()]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(qs * self.weights.sum(), positions, values)
+
+    def nbytes(self) -> int:
+        return self.means.nbytes + self.weights.nbytes
+
+
+class AmountQuantiles:
+    """
+    Global + per-agency amount t-digests
+
+    - from_frame(): built during training over the full dataset (before sampling)
+    - observe(): optional online update from saved predictions
+    - merge(): combine sketches built on separate shards of data
+    - to_arrays() / from_arrays(): flat, pickle-free serialization
+    """
+
+    def __init__(self, compression: float = QUANTILE_COMPRESSION):
+        self.compression = compression
+        self.global_digest = TDigest(compression)
+        self.agencies: Dict[str, TDigest] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, agency_col: str = "agency", amount_col: str = "awarded_amt",
+                   compression: float = QUANTILE_COMPRESSION) -> "AmountQuantiles":
+        sketches = cls(compression)
+        amounts = df[amount_col].to_numpy(dtype=np.float64)
+        sketches.global_digest.add_many(amounts)
+        keys = df[agency_col].fillna("UNKNOWN").map(normalize_name)
+        for key, idx in keys.groupby(keys).indices.items():
+            digest = TDigest(compression)
+            digest.add_many(amounts[idx])
+            sketches.agencies[key] = digest
+        return sketches
+
+    def update(self, agency: Optional[str], amount: float) -> None:
+        with self._lock:
+            self.global_digest.add(amount)
+            key = normalize_name(agency or "UNKNOWN")
+            digest = self.agencies.get(key)
+            if digest is None:
+                digest = self.agencies[key] = TDigest(self.compression)
+            digest.add(amount)
+
+    def observe(self, record: Dict[str, Any]) -> None:
+        """PredictionStore listener for online updates"""
+        tx = record.get("input", {})
+        if tx.get("amount") is not None:
+            self.update(tx.get("agency"), float(tx["amount"]))
+
+    def merge(self, other: "AmountQuantiles") -> "AmountQuantiles":
+        with self._lock:
+            self.global_digest.merge(other.global_digest)
+            for key, digest in other.agencies.items():
+                mine = self.agencies.get(key)
+                if mine is None:
+                    mine = self.agencies[key] = TDigest(self.compression)
+                mine.merge(digest)
+        return self
+
+    # ----- queries -----
+    def quantile(self, q: float, agency: Optional[str] = None) -> float:
+        with self._lock:
+            if agency is None:
+                return self.global_digest.quantile(q)
+            digest = self.agencies.get(normalize_name(agency))
+            return digest.quantile(q) if digest else float("nan")
+
+    def agency_count(self, agency: str) -> int:
+        with self._lock:
+            digest = self.agencies.get(normalize_name(agency))
+            return int(digest.count) if digest else 0
+
+    def lookup(self, agencies: List[Optional[str]], q: float) -> np.ndarray:
+        """Per-agency q-quantile for a batch (NaN for unknown agencies)"""
+        cache: Dict[str, float] = {}
+        out = np.empty(len(agencies))
+        # quantile() flushes buffered values, so reads hold the lock like update()
+        with self._lock:
+            for i, agency in enumerate(agencies):
+                key = normalize_name(agency or "UNKNOWN")
+                if key not in cache:
+                    digest = self.agencies.get(key)
+                    cache[key] = digest.quantile(q) if digest else np.nan
+                out[i] = cache[key]
+        return out
+
+    def counts(self, agencies: List[Optional[str]]) -> np.ndarray:
+        keys = [normalize_name(a or "UNKNOWN") for a in agencies]
+        with self._lock:
+            digests = [self.agencies.get(key) for key in keys]
+            return np.array([int(d.count) if d else 0 for d in digests], dtype=np.int64)
+
+    def summary(self, qs: Iterable[float] = (0.5, 0.95, 0.99), agency: Optional[str] = None) -> Dict[str, Any]:
+        qs = list(qs)
+        with self._lock:
+            digest = self.global_digest if agency is None else self.agencies.get(normalize_name(agency))
+            if digest is None:
+                return {}
+            values = digest.quantiles(qs)
+            return {
+                "count": int(digest.count),
+                "quantiles": {f"p{round(q * 100, 2):g}": round(float(v), 2) for q, v in zip(qs, values)},
+                "centroids": int(digest.weights.size),
+            }
+
+    # ----- serialization -----
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Flatten all digests into a handful of arrays (for npz snapshots)"""
+        with self._lock:
+            digests = [self.global_digest] + list(self.agencies.values())
+            for digest in digests:
+                digest._flush()
+            return {
+                "agencies": np.array(list(self.agencies), dtype=str),
+                "offsets": np.cumsum([0] + [d.means.size for d in digests]),
+                "means": np.concatenate([d.means for d in digests]),
+                "weights": np.concatenate([d.weights for d in digests]),
+                "bounds": np.array([[d.min, d.max] for d in digests]),
+                "compression": np.array(self.compression),
+            }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "AmountQuantiles":
+        sketches = cls(float(arrays["compression"]))
+        offsets = arrays["offsets"]
+        digests = []
+        for i in range(len(offsets) - 1):
+            digest = TDigest(sketches.compression)
+            digest.means = arrays["means"][offsets[i]:offsets[i + 1]].copy()
+            digest.weights = arrays["weights"][offsets[i]:offsets[i + 1]].copy()
+            digest.min, digest.max = arrays["bounds"][i]
+            digests.append(digest)
+        sketches.global_digest = digests[0]
+        sketches.agencies = dict(zip(arrays["agencies"].tolist(), digests[1:]))
+        return sketches
+
+    def save(self, path: str) -> None:
+        atomic_save_npz(path, self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> "AmountQuantiles":
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays({k: data[k] for k in data.files})
+
+    def nbytes(self) -> int:
+        return self.global_digest.nbytes() + sum(d.nbytes() for d in self.agencies.values())
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""
+Record Codec - Compact binary encoding for stored predictions and audit entries
+Append-only msgpack frames with per-file string dictionaries; reasons and
+summaries stored as template IDs plus parameters. Lossless against JSONL.
+
+Export: python record_codec.py predictions_store.msgpack > predictions_store.jsonl
+"""
+
+import re
+import sys
+import json
+import threading
+from operator import itemgetter
+from typing import Dict, Any, Callable, Iterable, List, Optional, Iterator, Tuple
+
+from config import RECORD_FORMAT, RISK_RULES
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError as e:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+    if RECORD_FORMAT == "msgpack":
+        print(f"[WARNING] msgpack not available: {e}. Falling back to JSONL records.")
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one writing process per file
+    fcntl = None
+
+COMPACT_RECORDS = RECORD_FORMAT == "msgpack" and MSGPACK_AVAILABLE
+
+# ==================== FRAME LAYOUT ====================
+# Every frame is a msgpack array:
+#   [DEFINE, table, code, value]  - dictionary entry, written before its first use
+#   [RECORD, schema, leaves]      - schema: code of the record's key tree (SCHEMA table),
+#                                   leaves: leaf values in depth-first order
+# Schemas are nested [[key, sub-schema or None], ...] lists. Records produced by the
+# same code path share one schema, so keys are written once per file, not per record.
+DEFINE, RECORD = 0, 1
+SCHEMA, VENDOR, AGENCY, LABEL, TEMPLATE = range(5)
+TABLES = 5
+ESCAPE = -1  # [ESCAPE, value]: a raw int / list in a slot that normally holds a compact code
+
+# Coded leaves by key path
+CODED_SLOTS = {
+    ("prediction_id",): "prediction_id",
+    ("timestamp",): "timestamp",
+    ("model_version",): LABEL,
+    ("trained_at",): LABEL,
+    ("input", "vendor"): VENDOR,
+    ("input", "agency"): AGENCY,
+    ("input", "payment_behavior"): LABEL,
+    ("output", "model_version"): LABEL,
+    ("output", "trained_at"): LABEL,
+    ("output", "reasons"): "reasons",
+    ("output", "summary"): "summary",
+    ("output", "prediction_id"): "prediction_id",
+}
+
+_SLOTS_BY_PARENT: Dict[tuple, Dict[str, Any]] = {}
+for _path, _kind in CODED_SLOTS.items():
+    _SLOTS_BY_PARENT.setdefault(_path[:-1], {})[_path[-1]] = _kind
+
+# Same text as SummaryGenerator.generate_basic_summary
+SUMMARY_TEMPLATES = [
+    "{severity} (ML Score: {fraud_score}): Transaction appears normal.",
+    "{severity} (ML Score: {fraud_score}): {reasons}. Recommend human review.",
+]
+_PLACEHOLDER = re.compile(r"\{[^{}]*\}")
+# Timestamps and prediction IDs are 20 digits ('%Y%m%d%H%M%S%f'); stored as an offset integer
+_PREDICTION_ID = re.compile(r"PRED-(\d{20})\Z")
+_TIMESTAMP = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})\.(\d{6})Z\Z")
+_DIGIT_OFFSET = 10 ** 19
+_MEMO_LIMIT = 10_000
+
+
+def _compile_template(template: str) -> Tuple[str, "re.Pattern"]:
+    """'Amount {z:.1f} above {agency}' -> ('Amount {} above {}', regex capturing the formatted parameters)"""
+    parts = _PLACEHOLDER.split(template)
+    literal = "{}".join(p.replace("{", "{{").replace("}", "}}") for p in parts)
+    pattern = re.compile("(.*?)".join(re.escape(p) for p in parts) + r"\Z", re.DOTALL)
+    return literal, pattern
+
+
+_TEMPLATES = [_compile_template(t) for t in [r["reason"] for r in RISK_RULES] + SUMMARY_TEMPLATES]
+# Shared by the store and audit writers, so each request's texts are parsed once
+_TEMPLATE_MEMO: Dict[str, Optional[Tuple[str, List[str]]]] = {}
+
+
+def _match_template(text: str) -> Optional[Tuple[str, List[str]]]:
+    """Reason / summary text -> (literal template, formatted parameters); memoized across writers"""
+    if text not in _TEMPLATE_MEMO:
+        if len(_TEMPLATE_MEMO) >= _MEMO_LIMIT:
+            _TEMPLATE_MEMO.clear()
+        _TEMPLATE_MEMO[text] = None
+        for literal, pattern in _TEMPLATES:
+            match = pattern.match(text)
+            if match and literal.format(*match.groups()) == text:
+                _TEMPLATE_MEMO[text] = (literal, list(match.groups()))
+                break
+    return _TEMPLATE_MEMO.get(text)
+
+
+def _pack_digits(digits: str) -> Optional[int]:
+    """20 decimal digits (years 1000-2844) -> uint64, so msgpack stores them in 9 bytes"""
+    value = int(digits) - _DIGIT_OFFSET
+    return value if 0 <= value < 1 << 64 else None
+
+
+def _pack_timestamp(value: str) -> Optional[int]:
+    """'2026-01-10T20:26:41.650957Z' -> packed digits"""
+    match = _TIMESTAMP.match(value)
+    return _pack_digits("".join(match.groups())) if match else None
+
+
+def _unpack_timestamp(value: int) -> str:
+    d = str(value + _DIGIT_OFFSET)
+    return f"{d[:4]}-{d[4:6]}-{d[6:8]}T{d[8:10]}:{d[10:12]}:{d[12:14]}.{d[14:]}Z"
+
+
+def _pack_prediction_id(value: str) -> Optional[int]:
+    """'PRED-20260110202641650924' -> packed digits"""
+    match = _PREDICTION_ID.match(value)
+    return _pack_digits(match.group(1)) if match else None
+
+
+def _unpack_prediction_id(value: int) -> str:
+    return f"PRED-{value + _DIGIT_OFFSET}"
+
+
+def _is_compact(value: Any) -> bool:
+    """Values a decoder would read as codes; raw values like these must be escaped"""
+    return type(value) is int or isinstance(value, list)
+
+
+def _schema_to_lists(schema: tuple) -> list:
+    return [[key, None if sub is None else _schema_to_lists(sub)] for key, sub in schema]
+
+
+def _schema_to_tuples(schema: list) -> tuple:
+    return tuple((key, None if sub is None else _schema_to_tuples(sub)) for key, sub in schema)
+
+
+# ==================== ENCODER ====================
+class RecordWriter:
+    """
+    Append-only compact record file
+
+    - One encoding pass per record: the key tree becomes a schema code, coded
+      leaves become dictionary / template codes, everything else is packed natively
+    - New dictionary entries are emitted as DEFINE frames immediately ahead of
+      the record that first uses them
+    - Dictionaries live in the file: before each append the writer takes an
+      exclusive lock on it (fcntl.flock) and folds in DEFINE frames other
+      processes appended since its last write, so workers sharing one file
+      assign the same codes and a restarted process continues the same tables
+    - Writes within a process are serialized so code assignment always matches file order
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._codes: List[Dict[Any, int]] = [{} for _ in range(TABLES)]
+        self._position = 0  # file offset up to which DEFINE frames are folded into _codes
+
+    def _catch_up(self, f) -> None:
+        end = f.seek(0, 2)
+        if end == self._position:
+            return
+        if end < self._position:  # file replaced or truncated: start over
+            self._codes, self._position = [{} for _ in range(TABLES)], 0
+        f.seek(self._position)
+        unpacker = msgpack.Unpacker(f, raw=False, strict_map_key=False)
+        for frame in unpacker:
+            if frame[0] == DEFINE:
+                value = _schema_to_tuples(frame[3]) if frame[1] == SCHEMA else frame[3]
+                self._codes[frame[1]][value] = frame[2]
+        self._position += unpacker.tell()
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Encode and append one record; returns the file offset of its RECORD frame"""
+        with self._lock, open(self.path, "ab+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+            self._catch_up(f)
+            sizes = [len(table) for table in self._codes]
+            try:
+                definitions: List[list] = []
+                leaves: List[Any] = []
+                schema = self._flatten(record, (), leaves, definitions)
+                frame = [RECORD, self._code(SCHEMA, schema, definitions), leaves]
+                header = b"".join(msgpack.packb(d) for d in definitions)
+                data = header + msgpack.packb(frame)
+                offset = f.seek(0, 2) + len(header)
+                f.write(data)
+                f.flush()
+            except Exception:
+                # New codes did not reach disk; forget them so the next append redefines them
+                for table, size in zip(self._codes, sizes):
+                    for value in [v for v, code in table.items() if code >= size]:
+                        del table[value]
+                raise
+            self._position = offset - len(header) + len(data)
+            return offset
+
+    def _flatten(self, value: Dict[str, Any], path: tuple, leaves: List[Any], definitions: List[list]) -> tuple:
+        """Append leaf values depth-first, return the key tree"""
+        slots = _SLOTS_BY_PARENT.get(path)
+        schema = []
+        for key, item in value.items():
+            if type(key) is not str:
+                key = str(key)
+            if isinstance(item, dict):
+                schema.append((key, self._flatten(item, path + (key,), leaves, definitions)))
+                continue
+            kind = slots.get(key) if slots else None
+            leaves.append(item if kind is None else self._encode_slot(kind, item, definitions))
+            schema.append((key, None))
+        return tuple(schema)
+
+    def _encode_slot(self, kind: Any, value: Any, definitions: List[list]) -> Any:
+        if kind == "reasons":
+            if isinstance(value, list):
+                return [self._encode_template(r, definitions) for r in value]
+            compact = None
+        elif kind == "summary":
+            return self._encode_template(value, definitions)
+        elif not isinstance(value, str):
+            compact = None
+        elif kind == "timestamp":
+            compact = _pack_timestamp(value)
+        elif kind == "prediction_id":
+            compact = _pack_prediction_id(value)
+        else:
+            compact = self._code(kind, value, definitions)
+
+        if compact is None:
+            return [ESCAPE, value] if _is_compact(value) else value
+        return compact
+
+    def _code(self, table: int, value: Any, definitions: List[list]) -> int:
+        codes = self._codes[table]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            definitions.append([DEFINE, table, code, _schema_to_lists(value) if table == SCHEMA else value])
+        return code
+
+    def _encode_template(self, text: Any, definitions: List[list]) -> Any:
+        """Reason / summary text -> template code, or [code, *params]"""
+        if isinstance(text, str):
+            matched = _match_template(text)
+            if matched is not None:
+                code = self._code(TEMPLATE, matched[0], definitions)
+                return [code, *matched[1]] if matched[1] else code
+            return text
+        return [ESCAPE, text] if _is_compact(text) else text
+
+
+# ==================== DECODER ====================
+class _Decoder:
+    """
+    Stateful decoder: DEFINE frames extend the tables, RECORD frames are rebuilt
+    by a per-schema builder (closures over the leaf list, compiled once per schema)
+    """
+
+    def __init__(self):
+        self.tables: List[Dict[int, Any]] = [{} for _ in range(TABLES)]
+        self.builders: Dict[int, Callable[[list], Dict[str, Any]]] = {}
+        self._expanders = {
+            "reasons": self._reasons,
+            "summary": self._template,
+            "timestamp": _unpack_timestamp,
+            "prediction_id": _unpack_prediction_id,
+        }
+
+    def define(self, frame: list) -> None:
+        self.tables[frame[1]][frame[2]] = frame[3]
+        if frame[1] == SCHEMA:
+            self.builders[frame[2]] = self._compile(frame[3])
+
+    def decode(self, frame: list) -> Dict[str, Any]:
+        return self.builders[frame[1]](frame[2])
+
+    # ----- slot expanders (slow paths) -----
+    @staticmethod
+    def _raw(value: Any) -> Any:
+        if isinstance(value, list) and len(value) == 2 and type(value[0]) is int and value[0] == ESCAPE:
+            return value[1]
+        return value
+
+    def _template(self, value: Any) -> Any:
+        if type(value) is int:
+            return self.tables[TEMPLATE][value]
+        if isinstance(value, list):
+            if value[0] == ESCAPE:
+                return value[1]
+            return self.tables[TEMPLATE][value[0]].format(*value[1:])
+        return value
+
+    def _reasons(self, value: Any) -> Any:
+        if not isinstance(value, list) or (value and type(value[0]) is int and value[0] == ESCAPE):
+            return self._raw(value)
+        return [self._template(v) for v in value]
+
+    def _leaf(self, i: int, kind: Any) -> Callable[[list], Any]:
+        """Getter for leaf i of a slot kind"""
+        if kind is None:
+            return itemgetter(i)
+        raw = self._raw
+        if kind in ("reasons", "summary"):
+            expand = self._expanders[kind]
+            return lambda v: expand(v[i])
+        if isinstance(kind, int):
+            table = self.tables[kind]
+            return lambda v: table[v[i]] if type(v[i]) is int else raw(v[i])
+        expand = self._expanders[kind]
+        return lambda v: expand(v[i]) if type(v[i]) is int else raw(v[i])
+
+    def _compile(self, schema: list) -> Callable[[list], Dict[str, Any]]:
+        """Schema -> builder(leaves) returning {"prediction_id": ..., "input": {"amount": v[2], ...}, ...}"""
+        index = iter(range(1 << 30))
+
+        def level_builder(level: list, path: tuple) -> Callable[[list], Dict[str, Any]]:
+            getters = []
+            for key, sub in level:
+                if sub is not None:
+                    getters.append((key, level_builder(sub, path + (key,))))
+                else:
+                    getters.append((key, self._leaf(next(index), CODED_SLOTS.get(path + (key,)))))
+            return lambda v: {key: get(v) for key, get in getters}
+
+        return level_builder(schema, ())
+
+
+def _frames(path: str) -> Iterator[list]:
+    """Raw frames in file order (stops quietly at a truncated trailing frame)"""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        yield from msgpack.Unpacker(f, raw=False, strict_map_key=False)
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Streaming decoder: yields records exactly as they were passed to RecordWriter.append"""
+    for _, record in read_records_with_offsets(path):
+        yield record
+
+
+def read_records_with_offsets(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(RECORD frame offset, record) pairs in file order"""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    decoder = _Decoder()
+    with f:
+        unpacker = msgpack.Unpacker(f, raw=False, strict_map_key=False)
+        offset = 0
+        for frame in unpacker:
+            if frame[0] == DEFINE:
+                decoder.define(frame)
+            else:
+                yield offset, decoder.decode(frame)
+            offset = unpacker.tell()
+
+
+class RecordReader:
+    """
+    Random access to RECORD frames by offset (as returned by RecordWriter.append)
+
+    Dictionaries are read from the file once and caught up from where the last
+    read stopped whenever a frame uses a code not seen yet.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._decoder = _Decoder()
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def _catch_up(self, f) -> None:
+        f.seek(self._position)
+        unpacker = msgpack.Unpacker(f, raw=False, strict_map_key=False)
+        for frame in unpacker:
+            if frame[0] == DEFINE:
+                self._decoder.define(frame)
+        self._position += unpacker.tell()
+
+    def read(self, offsets: Iterable[int]) -> List[Dict[str, Any]]:
+        records = []
+        with self._lock, open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                frame = next(msgpack.Unpacker(f, raw=False, strict_map_key=False, read_size=4096))
+                try:
+                    records.append(self._decoder.decode(frame))
+                except KeyError:
+                    self._catch_up(f)
+                    records.append(self._decoder.decode(frame))
+        return records
+
+
+def export_jsonl(path: str, out=sys.stdout) -> int:
+    """Write a compact file back out as JSONL (byte-identical to the JSONL writers); returns record count"""
+    count = 0
+    for record in read_records(path):
+        out.write(json.dumps(record) + "\n")
+        count += 1
+    return count
+
+
+# ==================== SHARED PAYLOAD ====================
+class RecordPayload:
+    """
+    A request's input and output, serialized at most once and shared by
+    PredictionStore and AuditLogger (JSONL writers splice the same fragments)
+
+    Build it before prediction_id is added to the prediction.
+    """
+
+    __slots__ = ("tx_input", "prediction", "_input_json", "_output_json")
+
+    def __init__(self, tx_input: Dict[str, Any], prediction: Dict[str, Any]):
+        self.tx_input = tx_input
+        self.prediction = dict(prediction)  # snapshot: the caller adds prediction_id later
+        self._input_json: Optional[str] = None
+        self._output_json: Optional[str] = None
+
+    def to_json(self, head: Dict[str, Any], tail: Optional[Dict[str, Any]] = None,
+                prediction_id: Optional[str] = None) -> str:
+        """
+        Same text as json.dumps({**head, "input": ..., "output": ..., **tail}),
+        with prediction_id appended to the output when given
+        """
+        if self._input_json is None:
+            self._input_json = json.dumps(self.tx_input)
+            self._output_json = json.dumps(self.prediction)
+        output = self._output_json
+        if prediction_id is not None:
+            suffix = '"prediction_id": ' + json.dumps(prediction_id) + "}"
+            output = output[:-1] + (", " + suffix if self.prediction else suffix)
+
+        parts = [f"{json.dumps(k)}: {json.dumps(v)}" for k, v in head.items()]
+        parts += ['"input": ' + self._input_json, '"output": ' + output]
+        parts += [f"{json.dumps(k)}: {json.dumps(v)}" for k, v in (tail or {}).items()]
+        return "{" + ", ".join(parts) + "}"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python record_codec.py <compact file>  (writes JSONL to stdout)", file=sys.stderr)
+        sys.exit(2)
+    if not MSGPACK_AVAILABLE:
+        print("ERROR: msgpack is required to read compact record files", file=sys.stderr)
+        sys.exit(1)
+    exported = export_jsonl(sys.argv[1])
+    print(f"[OK] Exported {exported} records", file=sys.stderr)
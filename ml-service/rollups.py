@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Daily Rollups - Materialized per-day time series by agency and by vendor
+Count, amount, anomaly count and risk / fraud score histograms per (entity, day)
+"""
+
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import ROLLUP_CHECKPOINT, ROLLUP_RISK_BINS, ROLLUP_FRAUD_BINS
+from entity_stats import normalize_name
+from streaming import StreamingAggregate, record_epoch
+
+SECONDS_PER_DAY = 86400
+ENTITY_TYPES = ("agency", "vendor", "all")  # "all": one global series
+
+
+class DailyRollups(StreamingAggregate):
+    """
+    Incremental (entity, UTC day) rollups
+
+    - One row per (entity type, normalized name, day) in a growable float matrix:
+      count | amount | anomalies | risk histogram | fraud histogram
+    - O(1) update per saved prediction; a series query touches only the
+      requested days (O(days), independent of transaction volume)
+    - Checkpointed to ROLLUP_CHECKPOINT, rebuildable from the prediction store
+    """
+
+    name = "rollups"
+
+    def __init__(self, checkpoint_path: Optional[str] = ROLLUP_CHECKPOINT,
+                 risk_bins: int = ROLLUP_RISK_BINS, fraud_bins: int = ROLLUP_FRAUD_BINS, **kwargs):
+        self.risk_bins = risk_bins
+        self.fraud_bins = fraud_bins
+        self.width = 3 + risk_bins + fraud_bins
+        super().__init__(checkpoint_path, **kwargs)
+
+    def _reset(self) -> None:
+        self.values = np.zeros((1024, self.width))
+        self.size = 0
+        self.keys: List[Tuple[str, str, int]] = []
+        # (entity type, normalized name) -> {day: row}
+        self.rows: Dict[Tuple[str, str], Dict[int, int]] = {}
+
+    def _row(self, entity: str, key: str, day: int) -> int:
+        days = self.rows.get((entity, key))
+        if days is None:
+            days = self.rows[(entity, key)] = {}
+        row = days.get(day)
+        if row is None:
+            if self.size == self.values.shape[0]:
+                grown = np.zeros((self.size * 2, self.width))
+                grown[:self.size] = self.values
+                self.values = grown
+            row = days[day] = self.size
+            self.keys.append((entity, key, day))
+            self.size += 1
+        return row
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        tx = record.get("input", {})
+        output = record.get("output", {})
+        day = int(record_epoch(record) // SECONDS_PER_DAY)
+        risk = float(output.get("risk_score") or 0)
+        fraud = float(output.get("fraud_score") or 0)
+        risk_bin = 3 + min(max(int(risk * self.risk_bins / 100), 0), self.risk_bins - 1)
+        fraud_bin = 3 + self.risk_bins + min(max(int(fraud * self.fraud_bins), 0), self.fraud_bins - 1)
+        amount = float(tx.get("amount") or 0)
+        anomaly = 1.0 if output.get("is_anomaly") else 0.0
+
+        for entity, key in (("agency", normalize_name(tx.get("agency") or "UNKNOWN")),
+                            ("vendor", normalize_name(tx.get("vendor") or "UNKNOWN")),
+                            ("all", "")):
+            values = self.values[self._row(entity, key, day)]
+            values[0] += 1
+            values[1] += amount
+            values[2] += anomaly
+            values[risk_bin] += 1
+            values[fraud_bin] += 1
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "entities": np.array([k[0] for k in self.keys], dtype=str),
+            "names": np.array([k[1] for k in self.keys], dtype=str),
+            "days": np.array([k[2] for k in self.keys], dtype=np.int64),
+            "values": self.values[:self.size].copy(),
+        }
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        values = arrays["values"]
+        if values.shape[1] != self.width:
+            raise ValueError("histogram bins changed since checkpoint")
+        self.values = np.zeros((max(1024, 2 * len(values)), self.width))
+        self.values[:len(values)] = values
+        self.size = len(values)
+        self.keys = list(zip(arrays["entities"].tolist(), arrays["names"].tolist(), arrays["days"].tolist()))
+        for row, (entity, key, day) in enumerate(self.keys):
+            self.rows.setdefault((entity, key), {})[day] = row
+
+    # ----- queries -----
+    def bin_edges(self) -> Dict[str, List[float]]:
+        return {
+            "risk": np.linspace(0, 100, self.risk_bins + 1).round(2).tolist(),
+            "fraud": np.linspace(0, 1, self.fraud_bins + 1).round(3).tolist(),
+        }
+
+    def series(self, entity: str, name: Optional[str], start_day: int, end_day: int) -> Dict[str, Any]:
+        """Per-day rows for one agency / vendor (or "all") over [start_day, end_day], plus totals"""
+        key = "" if entity == "all" else normalize_name(name or "")
+        with self._lock:
+            days = self.rows.get((entity, key), {})
+            # Walk whichever is shorter: the requested range or the days this entity has data for
+            if end_day - start_day + 1 <= len(days):
+                hits = [(day, days[day]) for day in range(start_day, end_day + 1) if day in days]
+            else:
+                hits = sorted((day, row) for day, row in days.items() if start_day <= day <= end_day)
+            block = self.values[[row for _, row in hits]] if hits else np.zeros((0, self.width))
+
+        def describe(values: np.ndarray) -> Dict[str, Any]:
+            return {
+                "count": int(values[0]),
+                "amount": round(float(values[1]), 2),
+                "anomalies": int(values[2]),
+                "risk_histogram": values[3:3 + self.risk_bins].astype(int).tolist(),
+                "fraud_histogram": values[3 + self.risk_bins:].astype(int).tolist(),
+            }
+
+        return {
+            "entity": entity,
+            "name": name if entity != "all" else None,
+            "start": _day_iso(start_day),
+            "end": _day_iso(end_day),
+            "bins": self.bin_edges(),
+            "days": [{"date": _day_iso(day), **describe(values)} for (day, _), values in zip(hits, block)],
+            "totals": describe(block.sum(axis=0)),
+        }
+
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+
+def _day_iso(day: int) -> str:
+    return str(np.datetime64(day, "D"))
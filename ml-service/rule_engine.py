@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Rule Engine - Declarative, vectorized risk layers
+Rules are loaded from config.RISK_RULES and evaluated as boolean masks over a batch
+"""
+
+import string
+import time
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+from config import BASE_RISK_SCORE, RISK_RULES
+
+
+# ==================== CONDITION REGISTRY ====================
+# condition(ctx, **params) -> boolean mask of length n
+CONDITIONS: Dict[str, Callable[..., np.ndarray]] = {}
+
+
+def condition(name: str):
+    """Register a rule condition under a config-addressable name"""
+    def decorator(fn):
+        CONDITIONS[name] = fn
+        return fn
+    return decorator
+
+
+@condition("zscore_above")
+def _zscore_above(ctx, threshold):
+    return (ctx["agency_std"] > 0) & (ctx["z"] > threshold)
+
+
+@condition("supplier_multiple")
+def _supplier_multiple(ctx, factor):
+    return (ctx["supplier_avg"] > 0) & (ctx["amount"] > ctx["supplier_avg"] * factor)
+
+
+@condition("above_global_99th")
+def _above_global_99th(ctx):
+    return ctx["amount"] > ctx["global_99th"]
+
+
+@condition("above_agency_quantile")
+def _above_agency_quantile(ctx, field, min_count):
+    return (ctx["agency_sample_count"] >= min_count) & (ctx["amount"] > ctx[field])  # NaN for unknown agencies
+
+
+@condition("isolation_forest_outlier")
+def _isolation_forest_outlier(ctx):
+    return ctx["if_label"] == -1
+
+
+@condition("reconstruction_error_above")
+def _reconstruction_error_above(ctx, threshold):
+    return ctx["ae_score"] > threshold  # NaN when autoencoder unavailable
+
+
+@condition("round_amount")
+def _round_amount(ctx, min_amount, unit):
+    amount = ctx["amount"]
+    return (amount > min_amount) & (np.mod(amount, unit) == 0)
+
+
+@condition("amount_above")
+def _amount_above(ctx, threshold):
+    return ctx["amount"] > threshold
+
+
+@condition("first_digit_at_least")
+def _first_digit_at_least(ctx, digit, min_amount):
+    return (ctx["amount"] >= min_amount) & (ctx["first_digit"] >= digit)
+
+
+@condition("hour_outside")
+def _hour_outside(ctx, start, end):
+    hour = ctx["hour"]
+    return (hour < start) | (hour >= end)
+
+
+@condition("hour_within")
+def _hour_within(ctx, start, end):
+    hour = ctx["hour"]
+    return (hour >= start) & (hour < end)
+
+
+@condition("days_since_last_below")
+def _days_since_last_below(ctx, behavior, days, tolerance=0):
+    return (ctx["behavior"] == behavior) & (ctx["days"] < days - tolerance)
+
+
+@condition("feature_at_least")
+def _feature_at_least(ctx, field, threshold):
+    values = ctx.get(field)  # Absent when the providing component is not attached
+    return False if values is None else values >= threshold
+
+
+@condition("volume_spike")
+def _volume_spike(ctx, ratio, min_count_30d):
+    if "vendor_volume_ratio" not in ctx:
+        return False
+    return (ctx["vendor_count_30d"] >= min_count_30d) & (ctx["vendor_volume_ratio"] >= ratio)
+
+
+@condition("agency_concentration")
+def _agency_concentration(ctx, hhi, min_share, min_contracts):
+    if "agency_hhi" not in ctx:
+        return False
+    return ((ctx["agency_network_contracts"] >= min_contracts) & (ctx["agency_hhi"] >= hhi)
+            & (ctx["vendor_agency_share"] >= min_share))
+
+
+@condition("captive_vendor")
+def _captive_vendor(ctx, max_agencies, min_contracts):
+    if "vendor_fan_in" not in ctx:
+        return False
+    return (ctx["vendor_network_contracts"] >= min_contracts) & (ctx["vendor_fan_in"] >= 1) & (ctx["vendor_fan_in"] <= max_agencies)
+
+
+# ==================== VECTORIZED FEATURE HELPERS ====================
+def first_digits(amounts: np.ndarray, n_digits: int = 1) -> np.ndarray:
+    """Leading n_digits decimal digits of int(amount) for each amount (0 for |amount| < 1)"""
+    n = np.trunc(np.abs(np.asarray(amounts, dtype=np.float64)))
+    digits = np.zeros(len(n), dtype=np.int64)
+    small = (n >= 1) & (n < 1e18)
+    if small.any():
+        v = n[small].astype(np.int64)
+        power = (10 ** np.floor(np.log10(v)).astype(np.int64))
+        # log10 can land one decade off near exact powers of ten
+        power = np.where(v // power >= 10, power * 10, power)
+        power = np.where(v < power, power // 10, power)
+        digits[small] = v // np.maximum(power // 10 ** (n_digits - 1), 1)
+    for i in np.flatnonzero(n >= 1e18):
+        digits[i] = int(str(int(n[i]))[:n_digits])
+    return digits
+
+
+@lru_cache(maxsize=4096)
+def _parse_hour(transaction_time: str) -> float:
+    try:
+        return float(int(transaction_time.split(":")[0]))
+    except (ValueError, AttributeError):
+        return np.nan
+
+
+def parse_hours(times: List[Optional[str]]) -> np.ndarray:
+    """Hour of day from 'HH:MM' strings (NaN when missing or malformed)"""
+    return np.fromiter((_parse_hour(t) if t else np.nan for t in times), dtype=np.float64, count=len(times))
+
+
+# ==================== RULES ====================
+class Rule:
+    """One declarative risk layer: condition, weight, reason template, enabled flag"""
+
+    def __init__(self, name: str, condition: str, weight: int, reason: str,
+                 enabled: bool = True, params: Optional[Dict[str, Any]] = None):
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown rule condition: {condition}")
+        self.name = name
+        self.condition = condition
+        self.weight = int(weight)
+        self.reason = reason
+        self.enabled = enabled
+        self.params = dict(params or {})
+        self.fields = [f for _, f, _, _ in string.Formatter().parse(reason) if f]
+        self._fn = CONDITIONS[condition]
+
+        self.hits = 0
+        self.evaluated = 0
+        self.eval_ns = 0
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "Rule":
+        return cls(
+            name=spec["name"],
+            condition=spec.get("condition", spec["name"]),
+            weight=spec["weight"],
+            reason=spec["reason"],
+            enabled=spec.get("enabled", True),
+            params=spec.get("params"),
+        )
+
+    def mask(self, ctx: Dict[str, Any], n: int) -> np.ndarray:
+        return np.broadcast_to(np.asarray(self._fn(ctx, **self.params), dtype=bool), (n,))
+
+    def format_reason(self, ctx: Dict[str, Any], i: int) -> str:
+        if not self.fields:
+            return self.reason
+        return self.reason.format(**{f: ctx[f][i] for f in self.fields})
+
+
+class RuleEngine:
+    """
+    Evaluates risk layers as boolean masks over a batch
+
+    - Rule order defines reason order
+    - risk_score = BASE_RISK_SCORE + sum of weights of firing rules (clipping is the caller's job)
+    - Per-rule hit counts and evaluation time for instrumentation
+    """
+
+    def __init__(self, rules: List[Rule], base_score: int = BASE_RISK_SCORE):
+        self.rules = list(rules)
+        self.base_score = base_score
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, specs: Optional[List[Dict[str, Any]]] = None) -> "RuleEngine":
+        return cls([Rule.from_spec(s) for s in (RISK_RULES if specs is None else specs)])
+
+    def add_rule(self, rule: Rule, before: Optional[str] = None) -> None:
+        """Append a rule, or insert it ahead of the named rule"""
+        names = [r.name for r in self.rules]
+        if rule.name in names:
+            raise ValueError(f"Duplicate rule name: {rule.name}")
+        position = names.index(before) if before in names else len(self.rules)
+        self.rules.insert(position, rule)
+
+    def get(self, name: str) -> Optional[Rule]:
+        return next((r for r in self.rules if r.name == name), None)
+
+    def inherit_metrics(self, previous: "RuleEngine") -> None:
+        """Carry hit / timing counters over from the engine this one replaces (matched by rule name)"""
+        with previous._lock, self._lock:
+            for rule in self.rules:
+                old = previous.get(rule.name)
+                if old is not None:
+                    rule.hits, rule.evaluated, rule.eval_ns = old.hits, old.evaluated, old.eval_ns
+
+    def evaluate(self, ctx: Dict[str, Any], n: int) -> Tuple[np.ndarray, List[List[str]], List[List[str]]]:
+        """Return (raw risk scores, reasons per transaction, names of the rules that fired per transaction)"""
+        scores = np.full(n, self.base_score, dtype=np.int64)
+        reasons: List[List[str]] = [[] for _ in range(n)]
+        fired: List[List[str]] = [[] for _ in range(n)]
+
+        for rule in self.rules:
+            if not rule.enabled:
+                continue
+            start = time.perf_counter_ns()
+            hits = np.flatnonzero(rule.mask(ctx, n))
+            if hits.size:
+                scores[hits] += rule.weight
+                for i in hits:
+                    reasons[i].append(rule.format_reason(ctx, i))
+                    fired[i].append(rule.name)
+            elapsed = time.perf_counter_ns() - start
+            with self._lock:
+                rule.hits += int(hits.size)
+                rule.evaluated += n
+                rule.eval_ns += elapsed
+
+        return scores, reasons, fired
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """Per-rule configuration and instrumentation counters"""
+        with self._lock:
+            return [{
+                "name": r.name,
+                "condition": r.condition,
+                "weight": r.weight,
+                "enabled": r.enabled,
+                "params": r.params,
+                "hits": r.hits,
+                "evaluated": r.evaluated,
+                "hit_rate": round(r.hits / r.evaluated, 4) if r.evaluated else 0.0,
+                "total_ms": round(r.eval_ns / 1e6, 3),
+                "avg_us_per_tx": round(r.eval_ns / 1e3 / r.evaluated, 3) if r.evaluated else 0.0,
+            } for r in self.rules]
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Shadow Scoring - Evaluate a candidate FraudEngine on live traffic, off the request path
+Sampled batches are queued for a background worker; the primary response is never touched
+"""
+
+import queue
+import random
+import threading
+import numpy as np
+from typing import Dict, Any, List, Optional
+
+from config import RANDOM_SEED, SHADOW_SAMPLE_RATE, SHADOW_QUEUE_SIZE, SHADOW_BATCH_SIZE
+
+
+class ShadowScorer:
+    """
+    Shadow engine fed by the primary engine's batch observer hook
+
+    - Primary-path cost: one random draw per transaction and, when sampled, a
+      non-blocking enqueue of references (tx, live context, primary result);
+      a full queue drops the sample instead of waiting
+    - The worker re-scores queued samples in batches with the shadow engine,
+      reusing the primary's live context (velocity, duplicates, last payment)
+      so both engines see the same state
+    - Agreement statistics: risk_score deltas, is_anomaly flips, per-rule
+      differences (names of the rules each engine fired)
+    """
+
+    def __init__(self, engine, sample_rate: float = SHADOW_SAMPLE_RATE,
+                 queue_size: int = SHADOW_QUEUE_SIZE, batch_size: int = SHADOW_BATCH_SIZE):
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._rng = random.Random(RANDOM_SEED)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.sampled = 0
+        self.dropped = 0
+        self.compared = 0
+        self.errors = 0
+        self.risk_delta_sum = 0
+        self.risk_delta_abs_sum = 0
+        self.risk_delta_max = 0
+        self.risk_exact = 0
+        self.fraud_delta_abs_sum = 0.0
+        self.flips = {"primary_only": 0, "shadow_only": 0}
+        self.rules: Dict[str, Dict[str, int]] = {}
+
+    # ----- primary path -----
+    def observe_batch(self, X: np.ndarray, fraud_scores: np.ndarray, txs: List[Dict[str, Any]],
+                      context: list, results: List[Dict[str, Any]], fired: List[List[str]]) -> None:
+        """FraudEngine batch observer: sample and enqueue, never block"""
+        for i in range(len(txs)):
+            if self._rng.random() >= self.sample_rate:
+                continue
+            try:
+                self.queue.put_nowait((txs[i], context, i, (results[i], fired[i])))
+                dropped = 0
+            except queue.Full:
+                dropped = 1
+            with self._lock:
+                self.sampled += 1
+                self.dropped += dropped
+
+    # ----- worker -----
+    def start(self) -> "ShadowScorer":
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                jobs = [self.queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.score(jobs)
+            except Exception as e:
+                with self._lock:
+                    self.errors += len(jobs)
+                print(f"WARNING: Shadow scoring failed: {e}")
+
+    def score(self, jobs: list) -> None:
+        """Re-score (tx, context, row, (primary result, primary rules)) samples with the shadow engine and compare"""
+        txs = [tx for tx, _, _, _ in jobs]
+        shadow_results, shadow_fired = self.engine.score_batch(txs, context=self._merge_context(jobs))
+        for (_, _, _, (primary, primary_rules)), shadow, shadow_rules in zip(jobs, shadow_results, shadow_fired):
+            self._compare(primary, shadow, set(primary_rules), set(shadow_rules))
+
+    @staticmethod
+    def _merge_context(jobs: list) -> list:
+        """Row-slice each job's provider features and stack them into one batch context"""
+        merged = []
+        for p, (provider, first) in enumerate(jobs[0][1]):
+            features: Dict[str, Any] = {}
+            for key, value in first.items():
+                if isinstance(value, np.ndarray):
+                    features[key] = np.concatenate([context[p][1][key][i:i + 1] for _, context, i, _ in jobs])
+                elif isinstance(value, list):
+                    features[key] = [context[p][1][key][i] for _, context, i, _ in jobs]
+                else:
+                    features[key] = value  # batch-wide scalar
+            merged.append((provider, features))
+        return merged
+
+    def _compare(self, primary: Dict[str, Any], shadow: Dict[str, Any], primary_rules: set, shadow_rules: set) -> None:
+        delta = shadow["risk_score"] - primary["risk_score"]
+        with self._lock:
+            self.compared += 1
+            self.risk_delta_sum += delta
+            self.risk_delta_abs_sum += abs(delta)
+            self.risk_delta_max = max(self.risk_delta_max, abs(delta))
+            self.risk_exact += delta == 0
+            self.fraud_delta_abs_sum += abs(shadow["fraud_score"] - primary["fraud_score"])
+            if primary["is_anomaly"] != shadow["is_anomaly"]:
+                self.flips["primary_only" if primary["is_anomaly"] else "shadow_only"] += 1
+            for name in primary_rules | shadow_rules:
+                counts = self.rules.setdefault(name, {"both": 0, "primary_only": 0, "shadow_only": 0})
+                if name in primary_rules and name in shadow_rules:
+                    counts["both"] += 1
+                else:
+                    counts["primary_only" if name in primary_rules else "shadow_only"] += 1
+
+    # ----- queries -----
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = max(self.compared, 1)
+            return {
+                "shadow_model_version": self.engine.model_version,
+                "shadow_params": self.engine.params,
+                "sample_rate": self.sample_rate,
+                "sampled": self.sampled,
+                "dropped": self.dropped,
+                "queued": self.queue.qsize(),
+                "compared": self.compared,
+                "errors": self.errors,
+                "risk_score_delta": {
+                    "mean": round(self.risk_delta_sum / n, 3),
+                    "mean_abs": round(self.risk_delta_abs_sum / n, 3),
+                    "max_abs": self.risk_delta_max,
+                    "exact_agreement": round(self.risk_exact / n, 4),
+                },
+                "fraud_score_mean_abs_delta": round(self.fraud_delta_abs_sum / n, 4),
+                "is_anomaly_flips": {**self.flips, "rate": round(sum(self.flips.values()) / n, 4)},
+                "rules": {name: dict(counts) for name, counts in sorted(self.rules.items())},
+            }
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Similarity Index - "Similar past transactions" for investigators
+k-nearest neighbours over FraudEngine's scaled feature vectors of stored and training transactions
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Iterable, List, Optional
+from sklearn.neighbors import KDTree
+
+from config import (
+    SIMILARITY_FEATURES, SIMILARITY_BATCH_SIZE, SIMILARITY_REBUILD_EVERY, SIMILARITY_LEAF_SIZE
+)
+
+
+class SimilarityIndex:
+    """
+    Euclidean kNN in the engine's scaler-transformed feature space
+
+    - Rows: training transactions (ref = row number) and stored predictions
+      (ref = prediction_id), as one growable float32 matrix
+    - PredictionStore listener: a save only buffers the input; inputs are
+      vectorized SIMILARITY_BATCH_SIZE at a time, or when a query needs them
+    - Rows [0, tree_rows) are served by a KD-tree, newer rows by brute force;
+      once SIMILARITY_REBUILD_EVERY rows sit outside the tree, a new tree is
+      built in the background and swapped in (queries never wait for it)
+
+    The index keeps the engine it was built with, so queries and stored
+    vectors share one feature space even after a drift retrain.
+    """
+
+    name = "similarity"
+
+    def __init__(self, engine, features: Optional[List[str]] = None, batch_size: int = SIMILARITY_BATCH_SIZE,
+                 rebuild_every: int = SIMILARITY_REBUILD_EVERY, leaf_size: int = SIMILARITY_LEAF_SIZE):
+        self.engine = engine
+        self.features = [name for name in (features or SIMILARITY_FEATURES) if name in engine.feature_names]
+        self.columns = [engine.feature_names.index(name) for name in self.features]
+        self.batch_size = batch_size
+        self.rebuild_every = rebuild_every
+        self.leaf_size = leaf_size
+        self._lock = threading.RLock()
+
+        self.vectors = np.empty((1024, len(self.columns)), dtype=np.float32)
+        self.size = 0
+        self.refs: list = []  # int = training row, str = prediction_id
+        self.training: List[Dict[str, Any]] = []
+        self._raw: list = []  # (prediction_id, input) saved but not yet vectorized
+        self.tree: Optional[KDTree] = None
+        self.tree_rows = 0
+        self._rebuilding = False
+        self.rebuilds = 0
+
+    # ----- building -----
+    def vectorize(self, txs: List[Dict[str, Any]]) -> np.ndarray:
+        """(n, features) float32 vectors, as the engine scales them"""
+        X = self.engine.scaled_features(txs)[:, self.columns]
+        return np.nan_to_num(X).astype(np.float32)
+
+    def _append(self, vectors: np.ndarray, refs: list) -> None:
+        needed = self.size + len(vectors)
+        if needed > len(self.vectors):
+            # Rows below size are never written again, so tree snapshots stay valid after growth
+            grown = np.empty((max(needed, 2 * len(self.vectors)), self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size:needed] = vectors
+        self.size = needed
+        self.refs.extend(refs)
+
+    def add_training(self, df: pd.DataFrame) -> int:
+        """Index the training transactions (awarded_amt, supplier_name, agency, award_date)"""
+        frame = pd.DataFrame({
+            "amount": df["awarded_amt"].astype(float),
+            "agency": df["agency"].fillna("UNKNOWN"),
+            "vendor": df["supplier_name"].fillna("UNKNOWN"),
+            "award_date": pd.to_datetime(df["award_date"], errors="coerce").dt.strftime("%Y-%m-%d"),
+        })
+        rows = frame.astype(object).where(frame.notna(), None).to_dict("records")
+        with self._lock:
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start:start + self.batch_size]
+                first = len(self.training)
+                self.training.extend(chunk)
+                self._append(self.vectorize(chunk), list(range(first, first + len(chunk))))
+        return len(rows)
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Index stored predictions in batches, then build the KD-tree once"""
+        count = 0
+        with self._lock:
+            for record in records:
+                self._raw.append((record["prediction_id"], record["input"]))
+                count += 1
+                if len(self._raw) >= self.batch_size:
+                    self._vectorize(rebuild=False)
+            self._vectorize(rebuild=False)
+            self._build(self.size)
+        return count
+
+    def observe(self, record: Dict[str, Any]) -> None:
+        """PredictionStore listener: buffer the saved input"""
+        with self._lock:
+            self._raw.append((record["prediction_id"], record["input"]))
+            if len(self._raw) >= self.batch_size:
+                self._vectorize()
+
+    def _vectorize(self, rebuild: bool = True) -> None:
+        if not self._raw:
+            return
+        refs = [ref for ref, _ in self._raw]
+        vectors = self.vectorize([tx for _, tx in self._raw])
+        self._raw = []
+        self._append(vectors, refs)
+        if rebuild and self.size - self.tree_rows >= self.rebuild_every and not self._rebuilding:
+            self._rebuilding = True
+            threading.Thread(target=self._build, args=(self.size,), name="similarity-rebuild", daemon=True).start()
+
+    def _build(self, rows: int) -> None:
+        try:
+            tree = KDTree(self.vectors[:rows], leaf_size=self.leaf_size) if rows else None
+            with self._lock:
+                if rows >= self.tree_rows:
+                    self.tree, self.tree_rows = tree, rows
+                    self.rebuilds += 1
+        except Exception as e:
+            print(f"WARNING: Similarity index rebuild failed: {e}")
+        finally:
+            self._rebuilding = False
+
+    # ----- queries -----
+    def query(self, tx: Dict[str, Any], k: int = 10, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        k nearest indexed transactions to tx, closest first
+
+        Returns [{"distance", "prediction_id"}] for stored predictions and
+        [{"distance", "training": {...}}] for training rows; exclude drops one prediction_id
+        """
+        vector = self.vectorize([tx])
+        with self._lock:
+            self._vectorize()
+            tree, tree_rows, size = self.tree, self.tree_rows, self.size
+            vectors = self.vectors
+        want = k + (exclude is not None)
+
+        distances, rows = [], []
+        if tree is not None and tree_rows:
+            d, i = tree.query(vector, k=min(want, tree_rows))
+            distances.append(d[0])
+            rows.append(i[0])
+        if size > tree_rows:
+            d = np.sqrt(((vectors[tree_rows:size] - vector) ** 2).sum(axis=1))
+            top = np.argpartition(d, want - 1)[:want] if len(d) > want else np.arange(len(d))
+            distances.append(d[top])
+            rows.append(top + tree_rows)
+        if not rows:
+            return []
+
+        distances, rows = np.concatenate(distances), np.concatenate(rows)
+        neighbors = []
+        for j in np.argsort(distances, kind="stable"):
+            ref = self.refs[rows[j]]
+            if ref == exclude:
+                continue
+            neighbor = {"distance": round(float(distances[j]), 4)}
+            if isinstance(ref, str):
+                neighbor["prediction_id"] = ref
+            else:
+                neighbor["training"] = self.training[ref]
+            neighbors.append(neighbor)
+            if len(neighbors) == k:
+                break
+        return neighbors
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "features": self.features,
+                "rows": self.size,
+                "training_rows": len(self.training),
+                "tree_rows": self.tree_rows,
+                "brute_force_rows": self.size - self.tree_rows,
+                "buffered_inputs": len(self._raw),
+                "rebuilds": self.rebuilds,
+                "vector_bytes": self.size * self.vectors.shape[1] * self.vectors.itemsize,
+            }
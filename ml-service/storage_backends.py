@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""
+Storage Backends - Where PredictionStore and AuditLogger keep their records
+JSONL files (default), compact msgpack frames, or an embedded SQLite database
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from config import (
+    STORAGE_BACKEND, SQLITE_PATH, SQLITE_BATCH_SIZE, SQLITE_FLUSH_SECONDS,
+    PREDICTIONS_STORE, PREDICTIONS_STORE_PACKED, AUDIT_LOG_PATH, AUDIT_LOG_PACKED
+)
+from entity_stats import normalize_name
+from prediction_index import PredictionIndex
+from record_codec import (
+    COMPACT_RECORDS, MSGPACK_AVAILABLE, RecordReader, RecordWriter, read_records, read_records_with_offsets
+)
+from streaming import record_epoch
+
+EXPORT_BATCH = 500  # records read per step when streaming a result set
+
+# kind -> (JSONL path, compact path, SQLite table)
+LOCATIONS = {
+    "predictions": (PREDICTIONS_STORE, PREDICTIONS_STORE_PACKED, "predictions"),
+    "audit": (AUDIT_LOG_PATH, AUDIT_LOG_PACKED, "audit_log"),
+}
+
+
+class StorageBackend:
+    """
+    Append-only store of prediction-shaped records ({prediction_id, timestamp, input, output, ...})
+
+    Subclasses implement append / iter_records / get / query; query() and
+    export() serve /predictions (filters: agency, vendor, start, end as epoch
+    seconds, min_risk, max_risk, is_anomaly), newest first with an integer cursor
+    """
+
+    def append(self, record: Dict[str, Any], line: Optional[str] = None) -> None:
+        """Store one record (line: the record already serialized as JSON, if available)"""
+        raise NotImplementedError
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Every record in write order (one pass, constant memory)"""
+        raise NotImplementedError
+
+    def get(self, prediction_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def build_index(self) -> None:
+        """Prepare query() / fast get(); no-op where the store is indexed already"""
+
+    @property
+    def indexed(self) -> bool:
+        return False
+
+    def query(self, limit: int = 50, cursor: Optional[int] = None,
+              **filters) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """One page of matching records and the cursor for the next page (None when done)"""
+        raise NotImplementedError
+
+    def export(self, cursor: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        """Every matching record, newest first, in bounded batches"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush anything buffered"""
+
+
+# ==================== FILE BACKENDS ====================
+class FileBackend(StorageBackend):
+    """
+    Append-only file; queries go through an in-memory PredictionIndex
+    (record locations are byte offsets, so reads seek instead of scanning)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index: Optional[PredictionIndex] = None
+        # Serialized so index offsets follow file order
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any], line: Optional[str]) -> int:
+        """Append one record, return its byte offset"""
+        raise NotImplementedError
+
+    def iter_with_offsets(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def read_at(self, offsets: Iterable[int]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def append(self, record: Dict[str, Any], line: Optional[str] = None) -> None:
+        with self._lock:
+            offset = self._write(record, line)
+            if self.index is not None:
+                self.index.add(record, offset)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for _, record in self.iter_with_offsets():
+            yield record
+
+    def build_index(self) -> None:
+        index = PredictionIndex()
+        with self._lock:
+            for offset, record in self.iter_with_offsets():
+                index.add(record, offset)
+            self.index = index
+        print(f"[INDEX] Indexed {len(index)} stored records from {self.path} ({index.nbytes() / 1e6:.2f} MB)")
+
+    @property
+    def indexed(self) -> bool:
+        return self.index is not None
+
+    def get(self, prediction_id: str) -> Optional[Dict[str, Any]]:
+        if self.index is not None:
+            offset = self.index.offset_of(prediction_id)
+            return self.read_at([offset])[0] if offset is not None else None
+        for record in self.iter_records():
+            if record.get("prediction_id") == prediction_id:
+                return record
+        return None
+
+    def query(self, limit: int = 50, cursor: Optional[int] = None,
+              **filters) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        offsets, next_cursor = self.index.page(limit, before=cursor, **filters)
+        return self.read_at(offsets.tolist()), next_cursor
+
+    def export(self, cursor: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        for _, offsets in self.index.scan(before=cursor, **filters):
+            for i in range(0, offsets.size, EXPORT_BATCH):
+                yield from self.read_at(offsets[i:i + EXPORT_BATCH].tolist())
+
+
+class JsonlBackend(FileBackend):
+    """One JSON document per line (the original format)"""
+
+    def _write(self, record: Dict[str, Any], line: Optional[str]) -> int:
+        if line is None:
+            line = json.dumps(record)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(line.encode("utf-8") + b"\n")
+        return offset
+
+    def iter_with_offsets(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    yield offset, json.loads(line)
+                except json.JSONDecodeError:
+                    pass
+                offset += len(line)
+
+    def read_at(self, offsets: Iterable[int]) -> List[Dict[str, Any]]:
+        records = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                records.append(json.loads(f.readline()))
+        return records
+
+
+class PackedBackend(FileBackend):
+    """Compact msgpack frames (record_codec)"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._writer = RecordWriter(path)
+        self._reader = RecordReader(path)
+
+    def _write(self, record: Dict[str, Any], line: Optional[str]) -> int:
+        return self._writer.append(record)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        return read_records(self.path)
+
+    def iter_with_offsets(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        return read_records_with_offsets(self.path)
+
+    def read_at(self, offsets: Iterable[int]) -> List[Dict[str, Any]]:
+        return self._reader.read(offsets)
+
+
+# ==================== SQLITE BACKEND ====================
+class SqliteBackend(StorageBackend):
+    """
+    Embedded SQLite table, shared safely by several worker processes
+
+    - WAL journal: readers never block the writer, writers queue on busy_timeout
+    - Indexed columns (prediction_id, vendor, agency, epoch) extracted per row;
+      the full record is kept as JSON text
+    - Inserts are buffered and committed in batches of batch_size rows, or after
+      flush_seconds, whichever comes first; reads flush this process's buffer
+    - Cursor = row id, so pages are stable under concurrent appends
+    """
+
+    COLUMNS = ("prediction_id", "timestamp", "epoch", "vendor", "agency",
+               "risk_score", "fraud_score", "is_anomaly", "record")
+
+    def __init__(self, path: str = SQLITE_PATH, table: str = "predictions",
+                 batch_size: int = SQLITE_BATCH_SIZE, flush_seconds: float = SQLITE_FLUSH_SECONDS):
+        self.path = path
+        self.table = table
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._lock = threading.RLock()
+        self._pending: List[tuple] = []
+        self._timer: Optional[threading.Timer] = None
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                prediction_id TEXT,
+                timestamp TEXT,
+                epoch REAL,
+                vendor TEXT,
+                agency TEXT,
+                risk_score INTEGER,
+                fraud_score REAL,
+                is_anomaly INTEGER,
+                record TEXT NOT NULL
+            )""")
+        for column in ("prediction_id", "vendor", "agency", "epoch"):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})")
+
+    @staticmethod
+    def _row(record: Dict[str, Any], line: Optional[str]) -> tuple:
+        tx = record.get("input", {})
+        output = record.get("output", {})
+        try:
+            epoch = record_epoch(record)
+        except ValueError:
+            epoch = None
+        return (
+            record.get("prediction_id"),
+            record.get("timestamp"),
+            epoch,
+            normalize_name(tx.get("vendor") or "UNKNOWN"),
+            normalize_name(tx.get("agency") or "UNKNOWN"),
+            output.get("risk_score"),
+            output.get("fraud_score"),
+            int(bool(output.get("is_anomaly"))),
+            line if line is not None else json.dumps(record),
+        )
+
+    def append(self, record: Dict[str, Any], line: Optional[str] = None) -> None:
+        """Buffer one row; never raises once buffered (a failed commit is retried, the row counts as stored)"""
+        row = self._row(record, line)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) < self.batch_size or not self._try_flush():
+                self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._timer is None and self.flush_seconds > 0:
+            self._timer = threading.Timer(self.flush_seconds, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _try_flush(self) -> bool:
+        """flush(), logging instead of raising; failed rows stay buffered for the next attempt"""
+        try:
+            self.flush()
+            return True
+        except sqlite3.Error as e:
+            print(f"WARNING: SQLite flush failed ({len(self._pending)} rows kept for retry): {e}")
+            return False
+
+    def _flush_on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            if not self._try_flush():
+                self._schedule_flush()
+
+    def flush(self) -> None:
+        """Commit buffered rows in one transaction (rows stay buffered if it fails)"""
+        with self._lock:
+            if not self._pending:
+                return
+            placeholders = ", ".join("?" * len(self.COLUMNS))
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO {self.table} ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+                    self._pending)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._pending = []
+
+    def _fetch(self, sql: str, params: Iterable[Any]) -> List[tuple]:
+        with self._lock:
+            self._try_flush()  # A locked database must not break reads of committed rows
+            return self._conn.execute(sql, list(params)).fetchall()
+
+    def count(self) -> int:
+        return self._fetch(f"SELECT COUNT(*) FROM {self.table}", [])[0][0]
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        last = 0
+        while True:
+            rows = self._fetch(f"SELECT id, record FROM {self.table} WHERE id > ? ORDER BY id LIMIT ?",
+                               [last, EXPORT_BATCH])
+            for _, text in rows:
+                yield json.loads(text)
+            if len(rows) < EXPORT_BATCH:
+                return
+            last = rows[-1][0]
+
+    def get(self, prediction_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._fetch(f"SELECT record FROM {self.table} WHERE prediction_id = ? ORDER BY id DESC LIMIT 1",
+                           [prediction_id])
+        return json.loads(rows[0][0]) if rows else None
+
+    def build_index(self) -> None:
+        print(f"[INDEX] SQLite {self.path}:{self.table} holds {self.count()} records (indexed in database)")
+
+    @property
+    def indexed(self) -> bool:
+        return True
+
+    @staticmethod
+    def _where(cursor: Optional[int], agency: Optional[str] = None, vendor: Optional[str] = None,
+               start: Optional[float] = None, end: Optional[float] = None,
+               min_risk: Optional[int] = None, max_risk: Optional[int] = None,
+               is_anomaly: Optional[bool] = None) -> Tuple[str, List[Any]]:
+        conditions = [
+            ("id < ?", cursor),
+            ("agency = ?", normalize_name(agency) if agency is not None else None),
+            ("vendor = ?", normalize_name(vendor) if vendor is not None else None),
+            ("epoch >= ?", start),
+            ("epoch < ?", end),
+            ("risk_score >= ?", min_risk),
+            ("risk_score <= ?", max_risk),
+            ("is_anomaly = ?", int(is_anomaly) if is_anomaly is not None else None),
+        ]
+        active = [(clause, value) for clause, value in conditions if value is not None]
+        where = " AND ".join(clause for clause, _ in active) or "1"
+        return where, [value for _, value in active]
+
+    def query(self, limit: int = 50, cursor: Optional[int] = None,
+              **filters) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        limit = max(1, min(limit, 1000))
+        where, params = self._where(cursor, **filters)
+        rows = self._fetch(f"SELECT id, record FROM {self.table} WHERE {where} ORDER BY id DESC LIMIT ?",
+                           params + [limit + 1])
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [json.loads(text) for _, text in rows[:limit]], next_cursor
+
+    def export(self, cursor: Optional[int] = None, **filters) -> Iterator[Dict[str, Any]]:
+        # Keyset pages: the lock is held per batch, not for the whole stream
+        while True:
+            records, cursor = self.query(limit=EXPORT_BATCH, cursor=cursor, **filters)
+            yield from records
+            if cursor is None:
+                return
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.flush()
+
+
+def create_backend(kind: str) -> StorageBackend:
+    """Configured backend for "predictions" or "audit" (STORAGE_BACKEND, RECORD_FORMAT)"""
+    jsonl_path, packed_path, table = LOCATIONS[kind]
+    if STORAGE_BACKEND == "sqlite":
+        return SqliteBackend(SQLITE_PATH, table)
+    if STORAGE_BACKEND != "jsonl":
+        print(f"WARNING: Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, using jsonl")
+    if COMPACT_RECORDS:
+        return PackedBackend(packed_path)
+    return JsonlBackend(jsonl_path)
+
+
+# ==================== MIGRATION ====================
+def migrate(source: str, target: SqliteBackend) -> int:
+    """Stream a JSONL (or compact .msgpack) record file into a SQLite table; returns rows copied"""
+    if target.count():
+        raise ValueError(f"{target.path}:{target.table} already has records; refusing to migrate twice")
+
+    copied = 0
+    if source.endswith(".msgpack"):
+        for record in read_records(source):
+            target.append(record)
+            copied += 1
+    else:
+        with open(source, "r") as f:
+            for line in f:
+                line = line.strip()
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                target.append(record, line)
+                copied += 1
+    target.close()
+    return copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy existing prediction store / audit log files into SQLite")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--db", default=SQLITE_PATH)
+    parser.add_argument("--predictions", default=None, help=f"default: {PREDICTIONS_STORE}")
+    parser.add_argument("--audit", default=None, help=f"default: {AUDIT_LOG_PATH}")
+    args = parser.parse_args()
+
+    sources = {
+        "predictions": args.predictions or (PREDICTIONS_STORE_PACKED if COMPACT_RECORDS else PREDICTIONS_STORE),
+        "audit": args.audit or (AUDIT_LOG_PACKED if COMPACT_RECORDS else AUDIT_LOG_PATH),
+    }
+    for kind, source in sources.items():
+        if not os.path.exists(source):
+            print(f"[SKIP] {source} not found")
+            continue
+        if source.endswith(".msgpack") and not MSGPACK_AVAILABLE:
+            print(f"ERROR: msgpack is required to read {source}", file=sys.stderr)
+            sys.exit(1)
+        target = SqliteBackend(args.db, LOCATIONS[kind][2], batch_size=5000, flush_seconds=0)
+        try:
+            copied = migrate(source, target)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"[OK] Migrated {copied} records from {source} to {args.db}:{target.table}")
+    print("Set STORAGE_BACKEND = \"sqlite\" in config.py to serve from the database")
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming Aggregates - State derived incrementally from the prediction stream
+Each aggregate observes saved records, checkpoints to disk, and can be rebuilt
+from PredictionStore history in one streaming pass
+"""
+
+import os
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional
+
+from config import STATE_CHECKPOINT_EVERY
+
+
+def record_epoch(record: Dict[str, Any]) -> float:
+    """UTC epoch seconds of a stored record's ISO timestamp ('...Z')"""
+    timestamp = record.get("timestamp", "").rstrip("Z")
+    return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+
+def iso_utc(epoch: float) -> str:
+    """Inverse of record_epoch: '2026-01-10T20:26:41.650957Z'"""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+def atomic_save_npz(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    """Write an .npz checkpoint via temp file + rename so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+class StreamingAggregate:
+    """
+    Base class for incrementally maintained state
+
+    Subclasses implement:
+    - _reset(): empty state
+    - _apply(record): fold one stored prediction record into state (called under lock)
+    - _to_arrays() / _from_arrays(arrays): checkpoint (de)serialization;
+      _to_arrays() returns copies, since the file is written after the lock is released
+
+    Periodic checkpoints from observe() copy the state under the lock and
+    compress / write it on a background thread, so /predict never waits on disk.
+    """
+
+    name = "aggregate"
+
+    def __init__(self, checkpoint_path: Optional[str] = None, checkpoint_every: int = STATE_CHECKPOINT_EVERY):
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()  # one checkpoint file write at a time
+        self._writer: Optional[threading.Thread] = None
+        self._last_id = ""
+        self._pending = 0
+        self.observed = 0
+        self._reset()
+
+    # ----- subclass hooks -----
+    def _reset(self) -> None:
+        raise NotImplementedError
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        raise NotImplementedError
+
+    # ----- stream interface -----
+    def observe(self, record: Dict[str, Any]) -> None:
+        """PredictionStore listener: fold one saved record into state"""
+        with self._lock:
+            self._apply(record)
+            self._last_id = max(self._last_id, record.get("prediction_id", ""))
+            self.observed += 1
+            self._pending += 1
+            if self.checkpoint_path and self._pending >= self.checkpoint_every:
+                self._checkpoint_async()
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Discard state and replay history in one streaming pass"""
+        with self._lock:
+            self._reset()
+            self._last_id = ""
+            self.observed = 0
+            for record in records:
+                self._apply(record)
+                self._last_id = max(self._last_id, record.get("prediction_id", ""))
+                self.observed += 1
+            if self.checkpoint_path:
+                self.checkpoint()
+            return self.observed
+
+    def warm(self, iter_records: Callable[[], Iterator[Dict[str, Any]]]) -> None:
+        """Load the checkpoint and replay records saved after it, or rebuild if none"""
+        try:
+            if not self.load():
+                count = self.rebuild(iter_records())
+                print(f"[{self.name.upper()}] Rebuilt from prediction store ({count} records)")
+                return
+            replayed = 0
+            with self._lock:
+                checkpoint_id = self._last_id
+                for record in iter_records():
+                    if record.get("prediction_id", "") > checkpoint_id:
+                        self.observe(record)
+                        replayed += 1
+            print(f"[{self.name.upper()}] Loaded checkpoint (+{replayed} records replayed)")
+        except Exception as e:
+            print(f"WARNING: {self.name} warm-up failed: {e}")
+
+    # ----- persistence -----
+    def _snapshot(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            arrays = self._to_arrays()
+            arrays["_last_id"] = np.array(self._last_id)
+            arrays["_observed"] = np.array(self.observed)
+            self._pending = 0
+        return arrays
+
+    def _write(self, arrays: Dict[str, np.ndarray]) -> None:
+        try:
+            with self._write_lock:
+                atomic_save_npz(self.checkpoint_path, arrays)
+        except Exception as e:
+            print(f"WARNING: {self.name} checkpoint failed: {e}")
+
+    def _checkpoint_async(self) -> None:
+        """Snapshot now, write in the background (skipped while a write is still running)"""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        try:
+            arrays = self._snapshot()
+        except Exception as e:
+            print(f"WARNING: {self.name} checkpoint failed: {e}")
+            return
+        self._writer = threading.Thread(target=self._write, args=(arrays,),
+                                        name=f"{self.name}-checkpoint", daemon=True)
+        self._writer.start()
+
+    def checkpoint(self) -> None:
+        """Synchronous checkpoint (rebuild, shutdown); waits for a background write first"""
+        if not self.checkpoint_path:
+            return
+        writer = self._writer
+        if writer is not None and writer is not threading.current_thread():
+            writer.join()
+        try:
+            arrays = self._snapshot()
+        except Exception as e:
+            print(f"WARNING: {self.name} checkpoint failed: {e}")
+            return
+        self._write(arrays)
+
+    def load(self) -> bool:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        try:
+            with np.load(self.checkpoint_path, allow_pickle=False) as data:
+                arrays = {k: data[k] for k in data.files}
+            with self._lock:
+                self._reset()
+                self._from_arrays(arrays)
+                self._last_id = str(arrays["_last_id"])
+                self.observed = int(arrays["_observed"])
+                self._pending = 0
+            return True
+        except Exception as e:
+            print(f"WARNING: {self.name} checkpoint load failed: {e}")
+            return False
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from duplicate_index import DuplicateIndex
+from fraud_engine import FraudEngine
+
+TXS = [{"amount": amount, "agency": "Agency 1", "vendor": f"Vendor {i}", "transaction_time": "23:30"}
+       for i, amount in enumerate([5e3, 2e5, 9e6, 50000, 12345, 8.9e7, 300, 1e6])]
+
+
+def _engine(**params):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "awarded_amt": rng.lognormal(11, 1.5, 400).round(2),
+        "supplier_name": [f"Vendor {i % 25}" for i in range(400)],
+        "agency": [f"Agency {i % 4}" for i in range(400)],
+        "award_date": pd.date_range("2024-01-01", periods=400, freq="D"),
+    })
+    engine = FraudEngine({"n_estimators": 50, **params})
+    engine.train(df)
+    engine.add_context_provider(DuplicateIndex())
+    return engine
+
+
+@pytest.fixture(scope="session")
+def make_engine():
+    """Factory for a small FraudEngine trained on synthetic awards (params override ENGINE_PARAMS)"""
+    return _engine
+
+
+@pytest.fixture
+def txs():
+    """Mixed-amount transactions for one agency, all at night"""
+    return [dict(tx) for tx in TXS]
@@ -0,0 +1,51 @@
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from attribution import ForestAttributor
+from fraud_engine import INFERENCE_PLACEHOLDERS
+
+NAMES = ["amount", "count", "noise"]
+
+
+def _attributor():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 3))
+    model = IsolationForest(n_estimators=100, random_state=42).fit(X)
+    return model, ForestAttributor(model, NAMES, X)
+
+
+def test_outlying_feature_dominates():
+    _, attributor = _attributor()
+    explained = attributor.explain(np.array([[8.0, 0.0, 0.0], [0.0, 0.0, -8.0], [0.0, 0.0, 0.0]]))
+
+    for row in explained:
+        assert abs(sum(f["share"] for f in row["features"]) - 1.0) < 1e-3
+    assert explained[0]["features"][0]["feature"] == "amount"
+    assert explained[0]["features"][0]["lift"] > 1.5
+    assert explained[1]["features"][0]["feature"] == "noise"
+    assert max(f["lift"] for f in explained[2]["features"]) < 1.2
+
+
+def test_contributions_track_isolation_depth():
+    model, attributor = _attributor()
+    X = np.random.default_rng(1).normal(scale=2.0, size=(500, 3))
+    totals = attributor.contributions(X).sum(axis=1)
+    # Shorter paths mean more anomalous and a larger total contribution
+    assert np.corrcoef(totals, -model.score_samples(X))[0, 1] > 0.8
+
+
+def test_engine_explain_leaves_scores_unchanged(make_engine, txs):
+    engine = make_engine()
+    plain = engine.predict_batch(txs)
+    explained = engine.predict_batch(txs, explain=True)
+
+    assert [{k: v for k, v in r.items() if k != "attributions"} for r in explained] == plain
+    assert explained[2]["attributions"] == engine.explain([txs[2]])[0]
+
+
+def test_placeholder_features_never_reported(make_engine, txs):
+    engine = make_engine()
+    for attribution in engine.explain(txs):
+        reported = [f["feature"] for f in attribution["features"]]
+        assert not set(reported) & set(INFERENCE_PLACEHOLDERS)
+        assert reported and abs(sum(f["share"] for f in attribution["features"]) - 1.0) < 1e-3
@@ -0,0 +1,40 @@
+import numpy as np
+
+from benford_analysis import BenfordTracker, P_FIRST
+
+
+def _record(i, amount, vendor="Acme Pte Ltd", agency="Health Ministry"):
+    return {"prediction_id": f"PRED-{i:06d}", "input": {"amount": amount, "vendor": vendor, "agency": agency}}
+
+
+def test_counters_and_ranking_flag_nonconforming_vendor():
+    """A vendor whose amounts all start with 9 ranks above a Benford-distributed one."""
+    tracker = BenfordTracker(checkpoint_path=None)
+    rng = np.random.default_rng(0)
+    benford_amounts = 10 ** rng.uniform(2, 7, 5000)
+    records = [_record(i, a, vendor="Natural Co") for i, a in enumerate(benford_amounts)]
+    records += [_record(10000 + i, 95000 + i, vendor="Nines Ltd") for i in range(50)]
+    tracker.rebuild(records)
+
+    ranking = tracker.ranking("vendor", digits=1, min_count=30)
+    assert [r["name"] for r in ranking] == ["Nines Ltd", "Natural Co"]
+    assert ranking[0]["conformity"] == "nonconformity"
+    assert ranking[1]["mad"] < 0.015
+
+    report = tracker.entity_report("vendor", "nines")
+    assert report["first_digit"]["observed"]["9"] == 50
+    assert report["first_digit"]["expected_share"]["1"] == round(float(P_FIRST[0]), 4)
+
+
+def test_checkpoint_roundtrip_and_replay(tmp_path):
+    """Warm-up loads the checkpoint and replays only records saved after it."""
+    path = str(tmp_path / "benford.npz")
+    history = [_record(i, 100 + i) for i in range(5)]
+
+    tracker = BenfordTracker(checkpoint_path=path)
+    tracker.rebuild(history[:3])
+
+    restored = BenfordTracker(checkpoint_path=path)
+    restored.warm(lambda: iter(history))
+    assert restored.observed == 5
+    assert restored.entity_report("agency", "health ministry")["count"] == 5
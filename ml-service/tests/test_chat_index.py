@@ -0,0 +1,63 @@
+from chat_index import ChatIndex
+from streaming import iso_utc
+
+NOW = 1_800_000_000.0
+DAY = 86400
+
+
+def _record(i, vendor, agency, risk, reasons, age_days):
+    return {
+        "prediction_id": f"PRED-{i:04d}",
+        "timestamp": iso_utc(NOW - age_days * DAY),
+        "input": {"amount": 1000.0 * (i + 1), "vendor": vendor, "agency": agency},
+        "output": {"risk_score": risk, "is_anomaly": risk > 70, "reasons": reasons, "summary": ""},
+    }
+
+
+RECORDS = [
+    _record(0, "Metro Distributors Pte Ltd", "Health Ministry", 85, ["Transaction at night (23:30)"], 3),
+    _record(1, "Metro Distributors Pte Ltd", "Health Ministry", 20, [], 2),
+    _record(2, "Metro Distributors Pte Ltd", "Rural Works", 90, ["Possible duplicate payment"], 40),
+    _record(3, "Sunrise Traders", "Health Ministry", 75, ["Possible duplicate payment"], 1),
+]
+
+
+def _index():
+    by_id = {r["prediction_id"]: r for r in RECORDS}
+    index = ChatIndex(by_id.get)
+    index.rebuild(RECORDS)
+    return index
+
+
+def test_entities_time_window_and_ranking():
+    index = _index()
+    assert index.recognize("why was metro distributors flagged by the health ministry?") == [
+        ("vendor", "metro distributors"), ("agency", "health ministry")]
+
+    retrieval = index.retrieve("Why was Metro Distributors flagged last week?", now=NOW)
+    vendor = retrieval["entities"][0]
+    assert (vendor["name"], vendor["predictions"], vendor["flagged"]) == ("Metro Distributors Pte Ltd", 2, 1)
+    assert retrieval["rows"] == ["PRED-0000", "PRED-0001"]  # PRED-0002 is outside the window
+
+    # Reason words retrieve without a named entity
+    assert index.retrieve("any duplicate payments?", now=NOW)["rows"] == ["PRED-0002", "PRED-0003"]  # higher risk first
+    assert index.retrieve("hello there", now=NOW)["rows"] == []
+
+
+def test_context_is_capped_and_updates_on_save():
+    index = _index()
+    block, retrieval, sources = index.context("Metro Distributors", now=NOW)
+    assert "Vendor Metro Distributors Pte Ltd: 3 predictions, 2 flagged" in block
+    assert "PRED-0002" in block and "Possible duplicate payment" in block
+    assert sources == retrieval["rows"] and all(s in block for s in sources)
+
+    short, _, short_sources = index.context("Metro Distributors", now=NOW, max_chars=350)
+    assert len(short) <= 350 and short.count("\n") < block.count("\n")
+    assert short_sources == ["PRED-0002"]
+
+    index.load_record = lambda prediction_id: None if prediction_id == "PRED-0002" else RECORDS[int(prediction_id[-4:])]
+    assert "PRED-0002" not in index.context("Metro Distributors", now=NOW)[2]
+
+    index.observe(_record(4, "New Vendor Co", "Rural Works", 95, ["Amount is 4.0 std devs above Rural Works average"], 0))
+    assert index.retrieve("new vendor", now=NOW)["rows"] == ["PRED-0004"]
+    assert index.context("tell me a joke", now=NOW)[::2] == (None, [])
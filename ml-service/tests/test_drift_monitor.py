@@ -0,0 +1,53 @@
+import numpy as np
+
+from drift_monitor import DriftMonitor, DriftReference
+
+NOW = 1_800_000_000.0
+NAMES = ["awarded_amt", "supplier_contract_count"]
+
+
+def _reference(rng):
+    X = np.column_stack([rng.lognormal(10, 1, 20000), rng.integers(1, 6, 20000)])
+    return DriftReference.from_training(X, NAMES, rng.beta(2, 8, 20000))
+
+
+def test_stable_traffic_vs_shifted_traffic():
+    rng = np.random.default_rng(0)
+    monitor = DriftMonitor(_reference(rng), features=NAMES, windows={"1h": (3600, 12)})
+
+    same = np.column_stack([rng.lognormal(10, 1, 5000), rng.integers(1, 6, 5000)])
+    monitor.observe_batch(same, rng.beta(2, 8, 5000), now=NOW)
+    report = monitor.report("1h", now=NOW)
+    assert report["samples"] == 5000
+    assert all(s["status"] == "stable" for s in report["series"].values()), report
+
+    # An hour later the old buckets expire; amounts and scores shift upward
+    later = NOW + 3600
+    shifted = np.column_stack([rng.lognormal(11, 1, 5000), rng.integers(1, 6, 5000)])
+    monitor.observe_batch(shifted, rng.beta(5, 5, 5000), now=later)
+    report = monitor.report("1h", now=later)
+    assert report["samples"] == 5000
+    assert set(report["drifted"]) == {"awarded_amt", "fraud_score"}
+    assert report["series"]["supplier_contract_count"]["status"] == "stable"
+    assert report["series"]["awarded_amt"]["ks"] > 0.3
+
+
+def test_insufficient_data_and_drift_callback(monkeypatch):
+    monkeypatch.setattr("drift_monitor.DRIFT_CHECK_EVERY", 100)
+    monkeypatch.setattr("drift_monitor.DRIFT_RETRAIN_WINDOW", "1h")
+    rng = np.random.default_rng(1)
+    fired = []
+    monitor = DriftMonitor(_reference(rng), features=NAMES, windows={"1h": (3600, 12)}, on_drift=fired.append)
+
+    monitor.observe_batch(np.array([[1e9, 3]]), np.array([0.9]), now=NOW)
+    assert monitor.report("1h", now=NOW)["series"]["awarded_amt"]["status"] == "insufficient_data"
+
+    for _ in range(3):
+        monitor.observe_batch(np.column_stack([np.full(200, 1e9), np.full(200, 3)]), np.full(200, 0.9), now=NOW)
+    assert len(fired) == 1  # cooldown suppresses repeats
+
+    monitor.set_reference(_reference(rng))  # a retrain swaps the reference; the cooldown still holds
+    for _ in range(3):
+        monitor.observe_batch(np.column_stack([np.full(200, 1e9), np.full(200, 3)]), np.full(200, 0.9), now=NOW)
+    assert len(fired) == 1
+    assert "awarded_amt" in fired[0]["drifted"]
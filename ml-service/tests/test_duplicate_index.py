@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+from duplicate_index import DuplicateIndex
+
+NOW = 1_800_000_000.0
+
+
+def _record(i, ts, amount, vendor="Ranka Enterprises", agency="Health Ministry"):
+    iso = datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+    return {"prediction_id": f"PRED-{i:04d}", "timestamp": iso,
+            "input": {"amount": amount, "vendor": vendor, "agency": agency}}
+
+
+def _index():
+    index = DuplicateIndex(duplicate_window=3600, tolerance=0.01, split_threshold=100_000,
+                           split_min_fraction=0.25, split_window=86400, split_min_count=2)
+    return index
+
+
+def test_exact_and_near_duplicates_within_window(monkeypatch):
+    monkeypatch.setattr("duplicate_index.time.time", lambda: NOW)
+    index = _index()
+    index.observe(_record(1, NOW - 60, 48_000.0))
+    index.observe(_record(2, NOW - 30, 48_300.0))
+    index.observe(_record(3, NOW - 7200, 48_000.0))  # outside the duplicate window
+    index.observe(_record(4, NOW - 10, 48_000.0, agency="Other Agency"))
+
+    found = index.find({"amount": 48_000.0, "vendor": "ranka enterprises", "agency": "Health Ministry"}, now=NOW)
+    assert found["exact_duplicates"] == ["PRED-0001"]
+    assert found["near_duplicates"] == ["PRED-0002"]
+
+
+def test_split_purchase_cluster_crosses_threshold(monkeypatch):
+    monkeypatch.setattr("duplicate_index.time.time", lambda: NOW)
+    index = _index()
+    index.observe(_record(1, NOW - 600, 45_000.0))
+    index.observe(_record(2, NOW - 300, 5_000.0))  # below the split floor, ignored
+
+    tx = {"amount": 60_000.0, "vendor": "Ranka Enterprises", "agency": "Health Ministry"}
+    split = index.find(tx, now=NOW)["split_purchase"]
+    assert split == {"count": 2, "total": 105_000.0, "threshold": 100_000, "prediction_ids": ["PRED-0001"]}
+
+    assert index.find(tx, now=NOW + 2 * 86400)["split_purchase"] is None
+    assert not index.pairs
+
+
+def test_batch_rows_see_earlier_rows_of_the_same_batch(monkeypatch):
+    """Rows scored together are not stored yet; later rows still count earlier ones."""
+    monkeypatch.setattr("duplicate_index.time.time", lambda: NOW)
+    index = _index()
+    index.observe(_record(1, NOW - 600, 30_000.0))
+    txs = [{"amount": amount, "vendor": "Ranka Enterprises", "agency": "Health Ministry"}
+           for amount in (48_000.0, 48_000.0, 48_200.0)]
+    features = index.features(txs, now=NOW)
+
+    assert list(features["exact_duplicate_count"]) == [0, 1, 0]
+    assert list(features["near_duplicate_count"]) == [0, 0, 2]
+    assert list(features["split_cluster_count"]) == [0, 3, 4]
+    assert features["duplicates"][2]["split_purchase"]["prediction_ids"] == ["PRED-0001"]
+    assert features["split_cluster_total"][2] == 174_200.0
+
+
+def test_near_duplicate_at_tolerance_boundary(monkeypatch):
+    """A gap just under the tolerance (relative to the larger amount) spans more than log1p(tolerance)."""
+    monkeypatch.setattr("duplicate_index.time.time", lambda: NOW)
+    index = _index()
+    index.observe(_record(1, NOW - 60, 1006.67))
+
+    found = index.find({"amount": 1016.837367, "vendor": "Ranka Enterprises", "agency": "Health Ministry"}, now=NOW)
+    assert found["near_count"] == 1 and found["near_duplicates"] == ["PRED-0001"]
+    for amount in (1.0, 99.0, 5_000.0, 7_654_321.0):
+        low, high = amount * (1 - 0.01 + 1e-9), amount
+        assert abs(index._bucket(high) - index._bucket(low)) <= 1
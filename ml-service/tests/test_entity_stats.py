@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from entity_stats import EntityStatsTable, normalize_name
+
+
+def test_normalize_name_variants():
+    """Case, punctuation and legal-form spellings share one key."""
+    assert normalize_name("ABC Pte Ltd") == normalize_name("abc pte. ltd")
+    assert normalize_name("ABC Private Limited") == normalize_name("ABC")
+    assert normalize_name(None) == ""
+
+
+def test_normalize_name_keeps_entity_class():
+    """Partnerships and trusts stay distinct; dangling connectors are dropped."""
+    assert normalize_name("ABC LLP") == "abc llp"
+    assert normalize_name("ABC Pte Ltd") != normalize_name("ABC LLP")
+    assert normalize_name("ABC Trust Ltd") == normalize_name("abc trust")
+    assert normalize_name("Tan & Co") == normalize_name("Tan and Company") == "tan"
+    assert normalize_name("Tan & Co LLP") == "tan llp"
+
+
+def test_table_matches_groupby_stats():
+    """Interned table reproduces pandas mean/std/count per entity."""
+    df = pd.DataFrame({
+        "agency": ["Agency 1", "Agency 2", "agency 1", "Agency 3", "AGENCY 2", "Agency 1"],
+        "awarded_amt": [1000.0, 5000.0, 10000.0, 50000.0, 100000.0, 500000.0],
+    })
+    table = EntityStatsTable.from_frame(df, "agency", "awarded_amt")
+    expected = df.groupby(df["agency"].str.lower())["awarded_amt"].agg(["mean", "std", "count"])
+
+    assert len(table) == 3
+    for name, row in expected.iterrows():
+        stats = table.get(name)
+        assert np.isclose(stats["mean"], row["mean"])
+        assert np.isclose(stats["std"], 0.0 if np.isnan(row["std"]) else row["std"])
+        assert stats["count"] == row["count"]
+
+
+def test_batch_lookup_and_aliases():
+    """Unknown names gather zeros; registered aliases resolve."""
+    df = pd.DataFrame({"supplier_name": ["Metro Distributors"], "awarded_amt": [250.0]})
+    table = EntityStatsTable.from_frame(df, "supplier_name", "awarded_amt")
+    assert table.add_alias("Metro Dist", "METRO DISTRIBUTORS")
+
+    mean, std, count = table.lookup(["metro distributors", "Metro Dist", "Nobody"])
+    assert list(mean) == [250.0, 250.0, 0.0]
+    assert list(count) == [1, 1, 0]
+
+
+def test_aliases_from_mapping():
+    """from_frame registers an alias mapping; unknown canonical names are skipped."""
+    df = pd.DataFrame({"agency": ["Ministry of Health"], "awarded_amt": [100.0]})
+    table = EntityStatsTable.from_frame(df, "agency", "awarded_amt",
+                                        {"MOH": "Ministry of Health", "MOE": "Ministry of Education"})
+    assert table.get("moh")["mean"] == 100.0
+    assert table.get("MOE") is None
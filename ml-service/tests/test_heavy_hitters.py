@@ -0,0 +1,76 @@
+import random
+from datetime import datetime, timezone
+
+from heavy_hitters import HeavyHitters, SpaceSaving
+
+NOW = 1_800_000_000.0
+
+
+def _record(ts, amount, vendor, agency="PM Awas Yojana", flagged=False):
+    iso = datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+    return {"prediction_id": f"PRED-{ts}", "timestamp": iso,
+            "input": {"amount": amount, "vendor": vendor, "agency": agency},
+            "output": {"is_anomaly": flagged}}
+
+
+def test_space_saving_error_bounds():
+    """Estimates never undercount, overcount by at most total / capacity, and heavy keys survive."""
+    rng = random.Random(7)
+    stream = ["heavy"] * 3000 + [f"v{rng.randrange(5000)}" for _ in range(7000)]
+    rng.shuffle(stream)
+    summary = SpaceSaving(capacity=50)
+    for key in stream:
+        summary.add(key, key)
+
+    true = {"heavy": 3000}
+    estimate, error, _ = summary.counters["heavy"]
+    assert estimate - error <= true["heavy"] <= estimate
+    assert estimate - true["heavy"] <= summary.total / 50
+    assert summary.top(1)[0][0] == "heavy"
+
+
+def test_merge_keeps_bounds():
+    a, b = SpaceSaving(capacity=20), SpaceSaving(capacity=20)
+    for i in range(500):
+        a.add("x", "x", 2.0)
+        b.add("x", "x", 1.0)
+        a.add(f"a{i}", f"a{i}")
+        b.add(f"b{i}", f"b{i}")
+    merged = a.merge(b)
+    estimate, error, _ = merged.counters["x"]
+    assert estimate - error <= 1500 <= estimate
+    assert merged.total == a.total + b.total
+    assert len(merged.counters) <= 20
+
+
+def test_windows_and_metrics():
+    """Flagged volume counts only anomalies; buckets age out of the 24h window."""
+    hitters = HeavyHitters(windows={"24h": (86400, 24), "7d": (7 * 86400, 7)}, capacity=10)
+    hitters.horizon = float("inf")
+    hitters.observe(_record(NOW - 3 * 86400, 900.0, "Old Vendor", flagged=True))
+    for k in range(3):
+        hitters.observe(_record(NOW - 60 + k, 100.0, "Metro Distributors Pvt Ltd"))
+    hitters.observe(_record(NOW - 30, 500.0, "Shady Traders", flagged=True))
+
+    day = hitters.top("24h", "vendor", "count", now=NOW)
+    assert day["top"][0]["name"] == "Metro Distributors Pvt Ltd"
+    assert day["top"][0]["estimate"] == 3 and day["top"][0]["error"] == 0
+
+    flagged = hitters.top("24h", "vendor", "flagged_volume", now=NOW)
+    assert [e["name"] for e in flagged["top"]] == ["Shady Traders"]
+
+    week = hitters.top("7d", "vendor", "flagged_volume", now=NOW)
+    assert [e["name"] for e in week["top"]] == ["Old Vendor", "Shady Traders"]
+    assert hitters.top("24h", "agency", "volume", now=NOW)["top"][0]["estimate"] == 800.0
+
+
+def test_heap_tracks_smallest_counter():
+    """Lazy heap eviction matches a full scan on a weighted churn-heavy stream."""
+    rng = random.Random(3)
+    summary = SpaceSaving(capacity=30)
+    for _ in range(5000):
+        key = f"v{rng.randrange(400)}"
+        summary.add(key, key, rng.uniform(0.5, 20.0))
+        assert summary.floor() == min(c[0] for c in summary.counters.values()) or len(summary.counters) < 30
+    assert len(summary.heap) == len(summary.counters) == 30
+    assert {key for _, key in summary.heap} == set(summary.counters)
@@ -0,0 +1,48 @@
+from last_payment import LastPaymentTracker
+
+DAY = 86400
+
+
+def _record(i, ts_iso, vendor="Metro Distributors", agency="PM Awas Yojana"):
+    return {"prediction_id": f"PRED-{i:04d}", "timestamp": ts_iso,
+            "input": {"amount": 1000.0, "vendor": vendor, "agency": agency}}
+
+
+def test_tracker_fills_days_and_caller_overrides():
+    """Server-side days are used unless the caller supplies timing_accuracy_days."""
+    tracker = LastPaymentTracker(checkpoint_path=None)
+    tracker.observe(_record(1, "2026-01-10T00:00:00Z"))
+    tracker.observe(_record(2, "2026-01-01T00:00:00Z"))  # out of order: max wins
+    now = tracker.last_payment({"vendor": "metro distributors", "agency": "pm awas yojana"}) + 5 * DAY + 10
+
+    txs = [
+        {"vendor": "Metro Distributors", "agency": "PM Awas Yojana", "timing_accuracy_days": None},
+        {"vendor": "Metro Distributors", "agency": "PM Awas Yojana", "timing_accuracy_days": 40},
+        {"vendor": "New Vendor", "agency": "PM Awas Yojana", "timing_accuracy_days": None},
+    ]
+    features = tracker.features(txs, now=now)
+
+    assert features["days_since_last"] == [5, 40, None]
+    assert [r["source"] for r in features["last_payment"]] == ["tracker", "caller", None]
+    assert features["last_payment"][0]["last_payment_at"] == "2026-01-10T00:00:00Z"
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    path = str(tmp_path / "last_payment.npz")
+    tracker = LastPaymentTracker(checkpoint_path=path)
+    tracker.rebuild([_record(1, "2026-01-10T00:00:00Z"), _record(2, "2026-01-11T00:00:00Z", agency="Health")])
+
+    restored = LastPaymentTracker(checkpoint_path=path)
+    assert restored.load()
+    assert restored.last_paid == tracker.last_paid
+
+
+def test_earlier_batch_row_is_the_last_payment():
+    tracker = LastPaymentTracker(checkpoint_path=None)
+    tracker.observe(_record(1, "2026-01-10T00:00:00Z"))
+    now = tracker.last_payment({"vendor": "Metro Distributors", "agency": "PM Awas Yojana"}) + 20 * DAY
+    txs = [{"vendor": "Metro Distributors", "agency": "PM Awas Yojana"}] * 2 + [{"vendor": "New Vendor", "agency": "X"}] * 2
+    features = tracker.features(txs, now=now)
+
+    assert features["days_since_last"] == [20, 0, None, 0]
+    assert [r["source"] for r in features["last_payment"]] == ["tracker"] * 2 + [None, "tracker"]
@@ -0,0 +1,88 @@
+import time
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def _score(calls):
+    def score(txs, explain):
+        calls.append(len(txs))
+        if any(tx["amount"] < 0 for tx in txs):
+            raise ValueError("negative amount")
+        return [{"risk_score": tx["amount"], **({"attributions": {}} if explain else {})} for tx in txs]
+    return score
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+    batcher = MicroBatcher(_score(calls), max_size=8, max_wait_ms=200)
+    results = {}
+
+    def request(i):
+        results[i] = batcher.submit({"amount": i}, explain=i == 3)
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    while batcher.queue.qsize() < 8:
+        time.sleep(0.001)
+    batcher.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    assert calls == [8]
+    assert all(results[i]["risk_score"] == i for i in range(8))
+    assert [i for i in range(8) if "attributions" in results[i]] == [3]
+    stats = batcher.stats()
+    assert stats["batch_size_histogram"] == {"1": 0, "2-3": 0, "4-7": 0, "8": 1}
+    assert stats["mean_batch_size"] == 8.0
+
+
+def test_failed_batch_only_fails_the_bad_request():
+    calls = []
+    batcher = MicroBatcher(_score(calls), max_size=4)
+    jobs = [({"amount": a}, False, 0.0, Future()) for a in (1, -1, 2)]
+    batcher.run_batch(jobs)
+
+    assert [job[3].result()["risk_score"] for job in (jobs[0], jobs[2])] == [1, 2]
+    assert isinstance(jobs[1][3].exception(), ValueError)
+    assert calls == [3, 1, 1, 1]
+    assert batcher.stats()["failed_batches"] == 2
+
+
+def test_short_results_fail_instead_of_hanging():
+    batcher = MicroBatcher(lambda txs, explain: [{"risk_score": 1}] if len(txs) > 1 else [{"risk_score": 2}])
+    jobs = [({"amount": a}, False, 0.0, Future()) for a in (1, 2)]
+    batcher.run_batch(jobs)
+
+    assert [job[3].result(timeout=1)["risk_score"] for job in jobs] == [2, 2]
+    assert batcher.stats()["failed_batches"] == 1
+
+
+def test_stop_fails_queued_requests_and_submit_times_out():
+    batcher = MicroBatcher(_score([]), timeout_s=0.05)
+    with pytest.raises(TimeoutError):
+        batcher.submit({"amount": 1})
+    assert batcher.queue.get_nowait()[3].cancelled()
+
+    errors = []
+
+    def request():
+        with pytest.raises(RuntimeError) as caught:
+            batcher.submit({"amount": 2})
+        errors.append(caught.value)
+
+    batcher.timeout = 5.0
+    thread = threading.Thread(target=request)
+    thread.start()
+    while batcher.queue.qsize() < 1:
+        time.sleep(0.001)
+    batcher.stop()
+    thread.join()
+    assert len(errors) == 1
+    with pytest.raises(RuntimeError):
+        batcher.submit({"amount": 3})
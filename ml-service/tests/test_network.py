@@ -0,0 +1,94 @@
+import pandas as pd
+
+from network import VendorAgencyNetwork
+from rule_engine import CONDITIONS
+
+TRAINING = pd.DataFrame({
+    "supplier_name": ["Alpha Pte Ltd", "Alpha", "Beta", "Gamma", "Delta", "Delta"],
+    "agency": ["Health", "Health", "Health", "Works", "Works", "Parks"],
+    "awarded_amt": [900.0, 100.0, 250.0, 50.0, 10.0, 10.0],
+})
+
+
+def _record(i, vendor, agency, amount):
+    return {"prediction_id": f"PRED-{i:04d}", "input": {"vendor": vendor, "agency": agency, "amount": amount}}
+
+
+STREAM = [_record(0, "Echo", "Works", 40.0), _record(1, "Foxtrot", "Parks", 5.0), _record(2, "Foxtrot", "Works", 5.0),
+          _record(3, "Golf", "Parks", 1.0), _record(4, "Golf", "Works", 1.0), _record(5, "Hotel", "Zoo", 7.0)]
+
+
+def _network(tmp_path=None):
+    network = VendorAgencyNetwork(str(tmp_path / "network.npz") if tmp_path else None)
+    network.seed(TRAINING)
+    network.rebuild(STREAM)
+    return network
+
+
+def test_incremental_stats_match_sparse_matrix():
+    network = _network()
+    matrix = network.matrix().toarray()
+    shares = matrix / matrix.sum(axis=0)
+    for a, name in enumerate(network.agency_names):
+        assert abs(network.hhi(a) - (shares[:, a] ** 2).sum()) < 1e-12, name
+
+    alpha = network.snapshot({"vendor": "ALPHA PTE. LTD.", "agency": "Health"})
+    assert alpha["vendor_agency_share"] == 0.8 and alpha["vendor_fan_in"] == 1 and alpha["vendor_contracts"] == 2
+    assert alpha["agency_hhi"] == round(0.8 ** 2 + 0.2 ** 2, 4)
+    # Delta, Foxtrot and Golf only ever win from {Works, Parks}
+    assert network.snapshot({"vendor": "Golf", "agency": "Works"})["cluster_vendors"] == 3
+    assert network.clusters() == [{"agencies": ["Parks", "Works"], "vendor_count": 3, "vendors": ["Delta", "Foxtrot", "Golf"]}]
+
+    summary = network.summary()
+    assert (summary["vendors"], summary["agencies"], summary["edges"], summary["components"]) == (8, 4, 11, 3)
+    profile = network.vendor_profile("Foxtrot")
+    assert [p["vendor"] for p in profile["co_bidders"][:2]] == ["Delta", "Golf"]
+    assert profile["component"] == {"vendors": 5, "agencies": 2}
+
+
+def test_checkpoint_and_rebuild_keep_training_graph(tmp_path):
+    network = _network(tmp_path)
+    network.checkpoint()
+
+    restored = VendorAgencyNetwork(str(tmp_path / "network.npz"))
+    restored.seed(TRAINING)
+    assert restored.load()
+    for tx in ({"vendor": "Alpha", "agency": "Health"}, {"vendor": "Golf", "agency": "Parks"}):
+        assert restored.snapshot(tx) == network.snapshot(tx)
+    assert restored.summary() == network.summary()
+
+    rebuilt = _network()
+    rebuilt.rebuild(STREAM)
+    assert rebuilt.snapshot({"vendor": "Alpha", "agency": "Health"})["vendor_contracts"] == 2
+
+
+def test_network_conditions():
+    network = _network()
+    ctx = network.features([{"vendor": "Alpha", "agency": "Health"}, {"vendor": "Beta", "agency": "Health"}])
+    concentrated = CONDITIONS["agency_concentration"](ctx, hhi=0.5, min_share=0.5, min_contracts=3)
+    assert concentrated.tolist() == [True, False]
+    assert CONDITIONS["captive_vendor"](ctx, max_agencies=1, min_contracts=2).tolist() == [True, False]
+    assert CONDITIONS["agency_concentration"]({}, hhi=0.5, min_share=0.5, min_contracts=3) is False
+
+
+def test_batch_rows_count_earlier_rows_of_the_same_batch():
+    network = _network()
+    txs = [{"vendor": "Alpha", "agency": "Works"}, {"vendor": "Alpha", "agency": "Works"},
+           {"vendor": "New Vendor", "agency": "Works"}, {"vendor": "New Vendor", "agency": "Zoo"}]
+    features = network.features(txs)
+
+    assert list(features["vendor_fan_in"]) == [1, 2, 0, 1]
+    assert list(features["vendor_network_contracts"]) == [2, 3, 0, 1]
+    assert list(features["agency_network_contracts"][:3]) == [network.snapshot(txs[0])["agency_contracts"] + k for k in range(3)]
+    assert network.snapshot(txs[0]) == features["network"][0]
+
+
+def test_matrix_follows_reseed_with_same_pairs():
+    network = _network()
+    before = network.vendor_profile("Alpha")
+    network.seed(TRAINING.assign(awarded_amt=TRAINING["awarded_amt"] * 10))
+    network.rebuild(STREAM)
+
+    assert network.edges == 11
+    assert network.matrix().sum() == TRAINING["awarded_amt"].sum() * 10 + sum(r["input"]["amount"] for r in STREAM)
+    assert network.vendor_profile("Alpha") != before
@@ -0,0 +1,102 @@
+import random
+from datetime import datetime, timezone
+
+import prediction_index
+from prediction_index import PredictionIndex, parse_time
+
+BASE = 1_800_000_000
+
+
+def _records(n, seed=3):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        ts = BASE + i * 60
+        iso = datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+        records.append({
+            "prediction_id": f"PRED-{i}",
+            "timestamp": iso,
+            "input": {"vendor": f"Vendor {rng.randrange(20)}", "agency": rng.choice(["Health", "Roads", "Water"])},
+            "output": {"risk_score": rng.randrange(101), "fraud_score": rng.random(), "is_anomaly": rng.random() < 0.2},
+        })
+    return records
+
+
+def _brute_force(records, agency=None, vendor=None, start=None, end=None, min_risk=None, max_risk=None, is_anomaly=None):
+    out = []
+    for i, r in enumerate(records):
+        ts = BASE + i * 60
+        if agency is not None and r["input"]["agency"].lower() != agency.lower():
+            continue
+        if vendor is not None and r["input"]["vendor"].lower() != vendor.lower():
+            continue
+        if start is not None and ts < start or end is not None and ts >= end:
+            continue
+        if min_risk is not None and r["output"]["risk_score"] < min_risk:
+            continue
+        if max_risk is not None and r["output"]["risk_score"] > max_risk:
+            continue
+        if is_anomaly is not None and r["output"]["is_anomaly"] != is_anomaly:
+            continue
+        out.append(i)
+    return out[::-1]
+
+
+def test_filters_match_brute_force(monkeypatch):
+    monkeypatch.setattr(prediction_index, "SCAN_BLOCK", 64)  # exercise multi-block scans
+    records = _records(1000)
+    index = PredictionIndex()
+    for i, record in enumerate(records):
+        index.add(record, offset=i * 10)
+
+    queries = [
+        {},
+        {"agency": "health"},
+        {"vendor": "Vendor 3", "min_risk": 50},
+        {"agency": "Roads", "vendor": "vendor 7", "is_anomaly": False},
+        {"start": BASE + 60 * 100, "end": BASE + 60 * 400, "max_risk": 30},
+        {"vendor": "Nobody"},
+    ]
+    for filters in queries:
+        got = [int(o) // 10 for _, offsets in index.scan(**filters) for o in offsets]
+        assert got == _brute_force(records, **filters), filters
+
+
+def test_cursor_pagination_is_stable_under_appends():
+    records = _records(300)
+    index = PredictionIndex()
+    for i, record in enumerate(records[:250]):
+        index.add(record, offset=i)
+
+    seen, cursor = [], None
+    while True:
+        offsets, cursor = index.page(40, agency="Water", before=cursor)
+        seen.extend(offsets.tolist())
+        if len(seen) == 40:
+            for i in range(250, 300):  # new saves between pages don't shift later pages
+                index.add(records[i], offset=i)
+        if cursor is None:
+            break
+
+    assert seen == _brute_force(records[:250], agency="Water")
+    assert index.offset_of("PRED-299") == 299
+    assert index.offset_of("PRED-missing") is None
+
+
+def test_exactly_full_last_page_has_no_cursor():
+    index = PredictionIndex()
+    for i, record in enumerate(_records(80)):
+        index.add(record, offset=i)
+    total = 80
+
+    first, cursor = index.page(total // 2)
+    second, cursor = index.page(total - total // 2, before=cursor)
+    assert len(first) + len(second) == total
+    assert cursor is None
+    assert index.page(total)[1] is None and index.page(total - 1)[1] is not None
+
+
+def test_parse_time():
+    assert parse_time("2026-01-10") == datetime(2026, 1, 10, tzinfo=timezone.utc).timestamp()
+    assert parse_time("2026-01-10T05:30:00+05:30") == parse_time("2026-01-10T00:00:00Z")
+    assert parse_time(None) is None
@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from fraud_engine import FraudEngine
+from quantile_sketch import TDigest, AmountQuantiles
+
+
+def test_tdigest_rank_error_on_heavy_tail():
+    """p95/p99 of a lognormal stay within 0.2% rank error in bounded size."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(11, 2, 100_000)
+    digest = TDigest(compression=200)
+    digest.add_many(values)
+
+    for q in (0.5, 0.95, 0.99):
+        assert abs(np.mean(values <= digest.quantile(q)) - q) < 0.002
+    assert digest.weights.size <= 200
+    assert digest.quantile(0.0) == values.min() and digest.quantile(1.0) == values.max()
+
+
+def test_merge_matches_single_digest():
+    """Sketches built on shards and merged agree with one built on everything."""
+    rng = np.random.default_rng(1)
+    values = rng.exponential(1000, 40_000)
+    whole, left, right = TDigest(), TDigest(), TDigest()
+    whole.add_many(values)
+    left.add_many(values[:25_000])
+    for v in values[25_000:]:
+        right.add(v)
+    left.merge(right)
+
+    assert left.count == whole.count == 40_000
+    assert np.allclose(left.quantiles([0.5, 0.95, 0.99]), whole.quantiles([0.5, 0.95, 0.99]), rtol=0.02)
+
+
+def test_agency_sketches_roundtrip_arrays():
+    df = pd.DataFrame({"agency": ["A", "a", "B", None], "awarded_amt": [10.0, 20.0, 30.0, 40.0]})
+    sketches = AmountQuantiles.from_frame(df)
+    restored = AmountQuantiles.from_arrays(sketches.to_arrays())
+
+    assert restored.agency_count("A") == 2
+    assert restored.quantile(1.0, "b") == 30.0
+    assert np.isnan(restored.lookup(["Nowhere"], 0.99)[0])
+    assert restored.summary([0.5])["count"] == 4
+
+
+def test_lookup_concurrent_with_online_updates():
+    """Batch lookups and counts stay consistent while a listener flushes buffered values."""
+    df = pd.DataFrame({"agency": ["A"] * 100, "awarded_amt": np.arange(100.0)})
+    sketches = AmountQuantiles.from_frame(df)
+    for digest in sketches.agencies.values():
+        digest.buffer_size = 7
+
+    def writer():
+        for i in range(20_000):
+            sketches.update("A", float(i % 100))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        assert 0.0 <= sketches.lookup(["A", "a"], 0.99)[0] <= 99.0
+        assert sketches.counts(["A"])[0] >= 100
+    thread.join()
+    assert sketches.counts(["A"])[0] == 20_100
+
+
+def test_engine_global_99th_is_exact_on_small_frames():
+    """The global top-1% rule uses pandas' exact quantile, not the sketch estimate."""
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "awarded_amt": rng.lognormal(11, 2, 60).round(2),
+        "supplier_name": [f"Vendor {i % 6}" for i in range(60)],
+        "agency": [f"Agency {i % 3}" for i in range(60)],
+        "award_date": pd.date_range("2024-01-01", periods=60, freq="D"),
+    })
+    engine = FraudEngine({"n_estimators": 10})
+    engine.train(df)
+
+    assert engine.stats["global_99th"] == df["awarded_amt"].quantile(0.99)
+    assert engine.stats["amount_quantiles"].quantile(0.99) != engine.stats["global_99th"]
@@ -0,0 +1,111 @@
+import io
+import os
+import json
+
+from record_codec import (
+    RecordPayload, RecordReader, RecordWriter, export_jsonl, read_records, read_records_with_offsets
+)
+
+TX = {"amount": 200000.0, "agency": "Health Ministry", "vendor": "Metro Distributors",
+      "transaction_time": None, "payment_behavior": "REGULAR", "timing_accuracy_days": None}
+PREDICTION = {
+    "fraud_score": 0.431, "risk_score": 65, "is_anomaly": False,
+    "reasons": ["Amount is 4.2 std devs above Health Ministry average", "Suspiciously round amount",
+                "Some reason no rule produces"],
+    "model_version": "FraudEngine-v2.5-Full-Ollama", "trained_at": "2026-01-10T21:32:10.816758Z",
+    "velocity": {"vendor": {"1h": {"count": 1, "sum": 10.0}}},
+    "summary": "MODERATE RISK (ML Score: 0.431): Amount is 4.2 std devs above Health Ministry average; "
+               "Suspiciously round amount; Some reason no rule produces. Recommend human review.",
+}
+
+
+def _record(i, **output):
+    return {"prediction_id": f"PRED-20260110202641{i:06d}", "timestamp": f"2026-01-10T20:26:41.{i:06d}Z",
+            "input": dict(TX), "output": {**PREDICTION, **output}}
+
+
+def test_round_trip_is_lossless_across_restarts(tmp_path):
+    """Records decode to exactly what was written, including odd values and a reopened writer."""
+    path = str(tmp_path / "store.msgpack")
+    records = [
+        _record(1),
+        _record(2, reasons=[], summary="LOW RISK (ML Score: 0.1): Transaction appears normal."),
+        {"prediction_id": "PRED-UNKNOWN", "timestamp": "2026-01-10T20:26:41Z",
+         "input": {**TX, "vendor": 42, "agency": None}, "output": {"reasons": None, "summary": [1, 2]}},
+        {"prediction_id": 7, "timestamp": [-1, 3], "input": {}, "output": {"reasons": [5, [-1]]}},
+    ]
+    RecordWriter(path).append(records[0])
+    writer = RecordWriter(path)
+    for record in records[1:]:
+        writer.append(record)
+    writer.append(_record(3))
+
+    decoded = list(read_records(path))
+    assert decoded == records + [_record(3)]
+    assert [json.dumps(r) for r in decoded[:2]] == [json.dumps(r) for r in records[:2]]
+
+
+def test_writers_sharing_a_file_agree_on_codes(tmp_path):
+    """Two writers (as two worker processes would) interleave appends without code collisions."""
+    path = str(tmp_path / "store.msgpack")
+    first, second = RecordWriter(path), RecordWriter(path)
+    records = [{**_record(i), "input": {**TX, "vendor": f"Vendor {i}"}} for i in range(6)]
+    for i, record in enumerate(records):
+        (first if i % 3 else second).append(record)
+    first.append(records[1])  # reuses a code defined before the other writer's entries
+
+    assert list(read_records(path)) == records + [records[1]]
+
+
+def test_compact_frames_are_smaller(tmp_path):
+    path = str(tmp_path / "store.msgpack")
+    writer = RecordWriter(path)
+    records = [_record(i) for i in range(200)]
+    for record in records:
+        writer.append(record)
+    jsonl = sum(len(json.dumps(r)) + 1 for r in records)
+    assert os.path.getsize(path) * 3 < jsonl
+
+
+def test_random_access_by_offset(tmp_path):
+    """Offsets returned on append read back the same records, including codes defined after the reader started."""
+    path = str(tmp_path / "store.msgpack")
+    writer = RecordWriter(path)
+    reader = RecordReader(path)
+    offsets = [writer.append(_record(i)) for i in range(3)]
+    assert reader.read(offsets[::-1]) == [_record(i) for i in (2, 1, 0)]
+
+    offsets.append(writer.append({**_record(9), "input": {**TX, "vendor": "New Vendor"}}))
+    assert reader.read(offsets[-1:])[0]["input"]["vendor"] == "New Vendor"
+    assert [o for o, _ in read_records_with_offsets(path)] == offsets
+
+
+def test_truncated_tail_and_export(tmp_path):
+    """A partially written last frame is ignored; export reproduces the JSONL lines."""
+    path = str(tmp_path / "store.msgpack")
+    writer = RecordWriter(path)
+    for i in range(3):
+        writer.append(_record(i))
+    with open(path, "ab") as f:
+        f.write(b"\x93\x01")
+
+    out = io.StringIO()
+    assert export_jsonl(path, out) == 3
+    assert out.getvalue().splitlines() == [json.dumps(_record(i)) for i in range(3)]
+
+
+def test_payload_matches_json_dumps():
+    """Spliced store and audit lines are byte-identical to serializing each entry separately."""
+    prediction = dict(PREDICTION)
+    payload = RecordPayload(TX, prediction)
+    store = {"prediction_id": "PRED-1", "timestamp": "2026-01-10T20:26:41.000001Z", "input": TX, "output": prediction}
+    assert payload.to_json(head={"prediction_id": "PRED-1", "timestamp": store["timestamp"]}) == json.dumps(store)
+
+    prediction["prediction_id"] = "PRED-1"
+    audit = {"timestamp": "t", "prediction_id": "PRED-1", "input": TX, "output": prediction,
+             "model_version": prediction["model_version"], "trained_at": prediction["trained_at"]}
+    line = payload.to_json(head={"timestamp": "t", "prediction_id": "PRED-1"},
+                           tail={"model_version": audit["model_version"], "trained_at": audit["trained_at"]},
+                           prediction_id="PRED-1")
+    assert line == json.dumps(audit)
+    assert RecordPayload({}, {}).to_json(head={}, prediction_id="P") == json.dumps({"input": {}, "output": {"prediction_id": "P"}})
@@ -0,0 +1,54 @@
+import random
+from datetime import datetime, timezone
+
+from rollups import DailyRollups, SECONDS_PER_DAY
+
+DAY0 = 20_000  # 2024-10-04
+
+
+def _records(n, seed=11):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        ts = DAY0 * SECONDS_PER_DAY + rng.randrange(20 * SECONDS_PER_DAY)
+        iso = datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+        records.append({
+            "prediction_id": f"PRED-{i:06d}",
+            "timestamp": iso,
+            "input": {"amount": rng.randrange(1, 10**6), "vendor": f"Vendor {rng.randrange(5)}",
+                      "agency": rng.choice(["Health", "Roads"])},
+            "output": {"risk_score": rng.randrange(101), "fraud_score": rng.random(), "is_anomaly": rng.random() < 0.2},
+        })
+    return records
+
+
+def test_series_matches_raw_records():
+    records = _records(2000)
+    rollups = DailyRollups(checkpoint_path=None)
+    for record in records:
+        rollups.observe(record)
+
+    result = rollups.series("agency", "health", DAY0 + 3, DAY0 + 9)
+    expected = [r for r in records if r["input"]["agency"] == "Health"
+                and DAY0 + 3 <= int(datetime.fromisoformat(r["timestamp"][:-1]).replace(tzinfo=timezone.utc).timestamp()
+                                    // SECONDS_PER_DAY) <= DAY0 + 9]
+
+    totals = result["totals"]
+    assert len(result["days"]) == 7
+    assert totals["count"] == len(expected) == sum(totals["risk_histogram"]) == sum(totals["fraud_histogram"])
+    assert totals["amount"] == sum(r["input"]["amount"] for r in expected)
+    assert totals["anomalies"] == sum(r["output"]["is_anomaly"] for r in expected)
+    assert totals["risk_histogram"][-1] == sum(r["output"]["risk_score"] >= 90 for r in expected)
+    assert rollups.series("all", None, DAY0, DAY0 + 19)["totals"]["count"] == 2000
+    assert rollups.series("vendor", "Nobody", DAY0, DAY0 + 19)["days"] == []
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "rollups.npz")
+    rollups = DailyRollups(checkpoint_path=path)
+    rollups.rebuild(_records(500))
+
+    restored = DailyRollups(checkpoint_path=path)
+    assert restored.load()
+    for entity, name in [("agency", "Roads"), ("vendor", "Vendor 2"), ("all", None)]:
+        assert restored.series(entity, name, DAY0, DAY0 + 19) == rollups.series(entity, name, DAY0, DAY0 + 19)
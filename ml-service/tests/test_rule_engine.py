@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from rule_engine import Rule, RuleEngine, first_digits, parse_hours
+
+
+def _ctx(amounts, **extra):
+    ctx = {"amount": np.array(amounts, dtype=float), "vendor": ["V"] * len(amounts)}
+    ctx.update(extra)
+    return ctx
+
+
+def test_first_digits_match_string_conversion():
+    """Vectorized leading digit equals int(str(int(amount))[0])."""
+    amounts = [10, 99, 100, 999.99, 1000, 8_000_000, 9_999_999_999_999, 123456789012.5]
+    assert list(first_digits(amounts)) == [int(str(int(a))[0]) for a in amounts]
+
+
+def test_parse_hours_handles_missing_and_malformed():
+    hours = parse_hours(["23:10", "7", None, "", "bad"])
+    assert list(hours[:2]) == [23.0, 7.0]
+    assert np.isnan(hours[2:]).all()
+
+
+def test_reasons_follow_rule_order_and_disabled_rules_skip():
+    """Scores add weights of firing rules; reasons are emitted in registry order."""
+    engine = RuleEngine([
+        Rule("big", "amount_above", 10, "Big {vendor}", params={"threshold": 100}),
+        Rule("round", "round_amount", 15, "Round", params={"min_amount": 0, "unit": 1000}),
+        Rule("off", "amount_above", 50, "Never", enabled=False, params={"threshold": 0}),
+    ], base_score=10)
+
+    scores, reasons, fired = engine.evaluate(_ctx([5000, 50, 1500]), 3)
+
+    assert list(scores) == [35, 10, 20]
+    assert reasons == [["Big V", "Round"], [], ["Big V"]]
+    assert fired == [["big", "round"], [], ["big"]]
+    metrics = {m["name"]: m for m in engine.metrics()}
+    assert metrics["big"]["hits"] == 2 and metrics["big"]["evaluated"] == 3
+    assert metrics["off"]["evaluated"] == 0
+
+
+def test_unknown_condition_rejected():
+    with pytest.raises(ValueError):
+        Rule("bogus", "no_such_condition", 1, "x")
+
+
+def test_inherit_metrics_by_rule_name():
+    """A replacement engine continues the previous engine's per-rule counters."""
+    specs = [{"name": "round", "condition": "round_amount", "weight": 10, "reason": "Round",
+              "params": {"min_amount": 0, "unit": 1000}}]
+    old, new = RuleEngine.from_config(specs), RuleEngine.from_config(specs)
+    old.evaluate(_ctx([1000.0, 1234.0]), 2)
+    new.inherit_metrics(old)
+    new.evaluate(_ctx([5000.0]), 1)
+    assert new.metrics()[0]["hits"] == 2 and new.metrics()[0]["evaluated"] == 3
@@ -0,0 +1,29 @@
+from shadow import ShadowScorer
+
+
+def test_sampling_never_blocks_or_changes_primary_output(make_engine, txs):
+    primary = make_engine()
+    expected = primary.predict_batch(txs)
+    scorer = ShadowScorer(make_engine(contamination=0.2), sample_rate=1.0, queue_size=5)
+    primary.add_batch_observer(scorer)
+
+    assert primary.predict_batch(txs) == expected
+    stats = scorer.stats()
+    assert (stats["sampled"], stats["dropped"], stats["queued"]) == (8, 3, 5)
+
+
+def test_identical_engines_agree_exactly(make_engine, txs):
+    primary = make_engine()
+    scorer = ShadowScorer(primary, sample_rate=1.0)
+    primary.batch_observers.append(scorer)
+    primary.predict_batch(txs)
+    primary.batch_observers.remove(scorer)
+
+    jobs = [scorer.queue.get_nowait() for _ in range(len(txs))]
+    scorer.score(jobs)
+    stats = scorer.stats()
+    assert stats["compared"] == len(txs)
+    assert stats["risk_score_delta"]["exact_agreement"] == 1.0
+    assert stats["is_anomaly_flips"]["rate"] == 0.0
+    assert stats["rules"] and all(c["primary_only"] == c["shadow_only"] == 0 for c in stats["rules"].values())
+    assert "night_hours" in stats["rules"]
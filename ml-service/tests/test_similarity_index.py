@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from similarity_index import SimilarityIndex
+
+
+@pytest.fixture(scope="module")
+def engine(make_engine):
+    return make_engine()
+
+
+def _record(i, amount, vendor="Vendor 3"):
+    return {"prediction_id": f"PRED-{i:06d}", "input": {"amount": amount, "agency": "Agency 1", "vendor": vendor}}
+
+
+def test_matches_brute_force_across_tree_and_new_rows(engine):
+    rng = np.random.default_rng(0)
+    records = [_record(i, float(a), f"Vendor {i % 25}") for i, a in enumerate(rng.lognormal(11, 1.5, 3000))]
+    index = SimilarityIndex(engine, batch_size=256, rebuild_every=10 ** 9)
+    index.load(records[:2000])
+    for record in records[2000:]:
+        index.observe(record)
+
+    query = records[2500]
+    neighbors = index.query(query["input"], k=5, exclude=query["prediction_id"])
+    assert index.tree_rows == 2000 and index.size == 3000
+
+    vectors = index.vectorize([r["input"] for r in records])
+    distances = np.sqrt(((vectors - vectors[2500]) ** 2).sum(axis=1))
+    distances[2500] = np.inf
+    expected = np.sort(distances)[:5]
+    assert np.allclose([n["distance"] for n in neighbors], expected, atol=1e-3)
+    assert query["prediction_id"] not in {n["prediction_id"] for n in neighbors}
+
+
+def test_training_rows_and_background_rebuild(engine):
+    index = SimilarityIndex(engine, batch_size=4, rebuild_every=8)
+    index.add_training(pd.DataFrame({
+        "awarded_amt": [1000.0, 2e6], "supplier_name": ["Vendor 3", None],
+        "agency": ["Agency 1", "Agency 1"], "award_date": ["2024-03-01", None],
+    }))
+    index.load([])
+    for i in range(10):
+        index.observe(_record(i, 5e5 + i))
+    index._vectorize()
+    while index._rebuilding:
+        time.sleep(0.01)
+    assert index.rebuilds == 2 and index.tree_rows >= 10
+
+    nearest = index.query({"amount": 1001.0, "agency": "Agency 1", "vendor": "Vendor 3"}, k=1)[0]
+    assert nearest["training"] == {"amount": 1000.0, "agency": "Agency 1", "vendor": "Vendor 3", "award_date": "2024-03-01"}
+    assert index.stats()["rows"] == 12
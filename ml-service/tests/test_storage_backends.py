@@ -0,0 +1,100 @@
+import json
+import random
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from storage_backends import JsonlBackend, SqliteBackend, migrate
+
+BASE = 1_800_000_000
+
+
+def _records(n, seed=5):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        iso = datetime.fromtimestamp(BASE + i * 60, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+        records.append({
+            "prediction_id": f"PRED-{i}",
+            "timestamp": iso,
+            "input": {"vendor": f"Vendor {rng.randrange(10)}", "agency": rng.choice(["Health", "Roads"])},
+            "output": {"risk_score": rng.randrange(101), "fraud_score": rng.random(), "is_anomaly": rng.random() < 0.3},
+        })
+    return records
+
+
+def _pages(backend, **filters):
+    ids, cursor = [], None
+    while True:
+        records, cursor = backend.query(limit=7, cursor=cursor, **filters)
+        ids.extend(r["prediction_id"] for r in records)
+        if cursor is None:
+            return ids
+
+
+def test_sqlite_queries_match_jsonl(tmp_path):
+    records = _records(200)
+    jsonl = JsonlBackend(str(tmp_path / "store.jsonl"))
+    db = SqliteBackend(str(tmp_path / "store.sqlite3"), "predictions", batch_size=16, flush_seconds=0)
+    for record in records:
+        jsonl.append(record)
+        db.append(record)
+    jsonl.build_index()
+
+    for filters in [{}, {"vendor": "vendor 3"}, {"agency": "Roads", "min_risk": 40, "max_risk": 80},
+                    {"is_anomaly": True, "start": BASE + 600, "end": BASE + 6000}]:
+        expected = [r["prediction_id"] for r in jsonl.export(**filters)]
+        assert _pages(db, **filters) == expected
+        assert [r["prediction_id"] for r in db.export(**filters)] == expected
+
+    assert db.get("PRED-42") == records[42] == jsonl.get("PRED-42")
+    assert [r["prediction_id"] for r in db.iter_records()] == [r["prediction_id"] for r in records]
+
+
+def test_sqlite_batches_inserts(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    db = SqliteBackend(path, "predictions", batch_size=10, flush_seconds=0)
+    other = sqlite3.connect(path)
+    mode = other.execute("PRAGMA journal_mode").fetchone()[0]
+
+    for record in _records(15):
+        db.append(record)
+    assert mode == "wal"
+    assert other.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 10  # one committed batch
+
+    db.close()
+    assert other.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 15
+
+
+def test_sqlite_locked_database_keeps_rows_and_reads(tmp_path):
+    """A failed batch commit neither raises from append nor breaks reads; the rows land on the next flush."""
+    path = str(tmp_path / "store.sqlite3")
+    db = SqliteBackend(path, "predictions", batch_size=2, flush_seconds=0)
+    db._conn.execute("PRAGMA busy_timeout=0")
+    records = _records(3)
+    db.append(records[0])
+
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    db.append(records[1])  # batch is full; the commit fails on the lock
+    assert len(db._pending) == 2
+    assert db.count() == 0 and db.get("PRED-1") is None
+
+    other.execute("COMMIT")
+    db.append(records[2])
+    assert db.count() == 3 and not db._pending
+    assert db.get("PRED-1") == records[1]
+    db.close()
+
+
+def test_migrate_jsonl(tmp_path):
+    source = tmp_path / "store.jsonl"
+    records = _records(30)
+    source.write_text("".join(json.dumps(r) + "\n" for r in records) + "{truncated")
+
+    target = SqliteBackend(str(tmp_path / "store.sqlite3"), "predictions", batch_size=8, flush_seconds=0)
+    assert migrate(str(source), target) == 30
+    assert list(target.iter_records()) == records
+    with pytest.raises(ValueError):
+        migrate(str(source), target)
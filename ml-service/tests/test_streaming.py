@@ -0,0 +1,38 @@
+import time
+import threading
+
+import streaming
+from benford_analysis import BenfordTracker
+
+
+def _record(i, amount=100.0):
+    return {"prediction_id": f"PRED-{i:06d}", "input": {"amount": amount, "vendor": "Acme", "agency": "Health"}}
+
+
+def test_periodic_checkpoint_writes_off_the_observing_thread(tmp_path, monkeypatch):
+    """observe() snapshots and returns; the slow file write runs in the background."""
+    entered, release = threading.Event(), threading.Event()
+    writers = []
+
+    def slow_save(path, arrays):
+        writers.append(threading.current_thread().name)
+        entered.set()
+        release.wait(5)
+        original_save(path, arrays)
+
+    original_save = streaming.atomic_save_npz
+    monkeypatch.setattr(streaming, "atomic_save_npz", slow_save)
+    path = str(tmp_path / "benford.npz")
+    tracker = BenfordTracker(checkpoint_path=path, checkpoint_every=2)
+
+    started = time.perf_counter()
+    for i in range(4):
+        tracker.observe(_record(i))
+    assert time.perf_counter() - started < 1.0
+    assert entered.wait(5)
+    assert writers == ["benford-checkpoint"]  # second trigger skipped while the first write runs
+
+    release.set()
+    tracker.checkpoint()  # waits for the background write, then saves the latest state
+    restored = BenfordTracker(checkpoint_path=path)
+    assert restored.load() and restored.observed == 4
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+from velocity import VelocityTracker
+
+NOW = 1_800_000_000.0
+
+
+def _record(ts, amount, vendor="Metro Distributors", agency="PM Awas Yojana"):
+    iso = datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+    return {"prediction_id": f"PRED-{ts}", "timestamp": iso,
+            "input": {"amount": amount, "vendor": vendor, "agency": agency}}
+
+
+def test_windows_count_and_evict():
+    """Payments fall out of the 1h window but stay in 24h / 30d."""
+    tracker = VelocityTracker(windows={"1h": (3600, 12), "24h": (86400, 24), "30d": (30 * 86400, 30)})
+    tracker.horizon = float("inf")
+    for k in range(5):
+        tracker.observe(_record(NOW - 7200 + k, 100.0))
+    for k in range(3):
+        tracker.observe(_record(NOW - 60 + k, 50.0))
+
+    snap = tracker.snapshot({"vendor": "metro distributors", "agency": "PM Awas Yojana"}, now=NOW)
+    assert snap["vendor"]["1h"] == {"count": 3, "sum": 150.0}
+    assert snap["vendor"]["24h"] == {"count": 8, "sum": 650.0}
+    assert snap["vendor_agency"]["30d"]["count"] == 8
+
+    later = tracker.snapshot({"vendor": "Metro Distributors", "agency": "PM Awas Yojana"}, now=NOW + 40 * 86400)
+    assert later["vendor"]["30d"] == {"count": 0, "sum": 0.0}
+
+
+def test_lru_bounds_entities():
+    tracker = VelocityTracker(max_entities=2)
+    tracker.horizon = float("inf")
+    for i, vendor in enumerate(["A", "B", "C"]):
+        tracker.observe(_record(NOW + i, 10.0, vendor=vendor))
+    assert list(tracker.vendors) == ["b", "c"]
+
+    features = tracker.features([{"vendor": "A", "agency": "PM Awas Yojana"},
+                                 {"vendor": "C", "agency": "PM Awas Yojana"}], now=NOW + 5)
+    assert list(features["vendor_count_1h"]) == [0, 1]
+
+
+def test_batch_rows_count_earlier_rows_of_the_same_batch():
+    tracker = VelocityTracker(windows={"1h": (3600, 12), "24h": (86400, 24)})
+    tracker.horizon = float("inf")
+    tracker.observe(_record(NOW - 60, 100.0))
+    txs = [{"amount": 10.0, "vendor": "Metro Distributors", "agency": "PM Awas Yojana"},
+           {"amount": 20.0, "vendor": "Metro Distributors", "agency": "Other"},
+           {"amount": 30.0, "vendor": "metro distributors", "agency": "PM Awas Yojana"}]
+    features = tracker.features(txs, now=NOW)
+
+    assert list(features["vendor_count_1h"]) == [1, 2, 3]
+    assert list(features["vendor_sum_24h"]) == [100.0, 110.0, 130.0]
+    assert list(features["pair_count_1h"]) == [1, 0, 2]
+    assert tracker.snapshot(txs[0], now=NOW)["vendor"]["1h"] == {"count": 1, "sum": 100.0}
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Velocity Features - Per-vendor and per-vendor x agency sliding-window counters
+Time-bucketed ring buffers: O(1) update and query, no store scan on the request path
+"""
+
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import VELOCITY_WINDOWS, VELOCITY_MAX_ENTITIES
+from entity_stats import normalize_name
+from streaming import StreamingAggregate, record_epoch
+
+
+class _RingWindow:
+    """
+    Count and sum over the last `size` buckets of `width` seconds
+
+    Buckets older than the window are evicted as time advances; the window
+    therefore covers between (size - 1) and size bucket widths.
+    """
+
+    __slots__ = ("width", "size", "counts", "sums", "head", "count", "total")
+
+    def __init__(self, width: float, size: int):
+        self.width = width
+        self.size = size
+        self.counts = [0] * size
+        self.sums = [0.0] * size
+        self.head = None
+        self.count = 0
+        self.total = 0.0
+
+    def _advance(self, bucket: int) -> None:
+        if self.head is None:
+            self.head = bucket
+            return
+        steps = bucket - self.head
+        if steps <= 0:
+            return
+        if steps >= self.size:
+            self.counts = [0] * self.size
+            self.sums = [0.0] * self.size
+            self.count = 0
+            self.total = 0.0
+        else:
+            for b in range(self.head + 1, bucket + 1):
+                slot = b % self.size
+                self.count -= self.counts[slot]
+                self.total -= self.sums[slot]
+                self.counts[slot] = 0
+                self.sums[slot] = 0.0
+            if not self.count:
+                self.total = 0.0  # drop float residue from subtraction
+        self.head = bucket
+
+    def add(self, ts: float, amount: float) -> None:
+        bucket = int(ts // self.width)
+        self._advance(bucket)
+        if bucket <= self.head - self.size:
+            return  # older than the window
+        slot = bucket % self.size
+        self.counts[slot] += 1
+        self.sums[slot] += amount
+        self.count += 1
+        self.total += amount
+
+    def query(self, ts: float) -> Tuple[int, float]:
+        self._advance(int(ts // self.width))
+        return self.count, self.total
+
+
+class _EntityWindows:
+    """One ring buffer per configured window"""
+
+    __slots__ = ("windows",)
+
+    def __init__(self, specs: Dict[str, Tuple[float, int]]):
+        self.windows = {name: _RingWindow(span / buckets, buckets) for name, (span, buckets) in specs.items()}
+
+    def add(self, ts: float, amount: float) -> None:
+        for window in self.windows.values():
+            window.add(ts, amount)
+
+    def query(self, ts: float) -> Dict[str, Tuple[int, float]]:
+        return {name: window.query(ts) for name, window in self.windows.items()}
+
+
+class VelocityTracker(StreamingAggregate):
+    """
+    Live payment velocity per vendor and per (vendor, agency) pair
+
+    - Updated from every saved prediction (PredictionStore listener)
+    - Memory bounded by an LRU over entities (cold entities evicted first)
+    - In-memory only: warmed at startup by replaying the prediction store
+    - Context provider for FraudEngine: window values feed risk layers and
+      are returned under "velocity" in the prediction output
+    """
+
+    name = "velocity"
+
+    def __init__(self, windows: Optional[Dict[str, Tuple[float, int]]] = None,
+                 max_entities: int = VELOCITY_MAX_ENTITIES):
+        self.windows = dict(VELOCITY_WINDOWS if windows is None else windows)
+        self.max_entities = max_entities
+        self.horizon = max(span for span, _ in self.windows.values())
+        super().__init__(checkpoint_path=None)
+
+    def _reset(self) -> None:
+        self.vendors: "OrderedDict[str, _EntityWindows]" = OrderedDict()
+        self.pairs: "OrderedDict[Tuple[str, str], _EntityWindows]" = OrderedDict()
+
+    def _entity(self, table: OrderedDict, key, create: bool) -> Optional[_EntityWindows]:
+        entity = table.get(key)
+        if entity is not None:
+            table.move_to_end(key)
+        elif create:
+            entity = table[key] = _EntityWindows(self.windows)
+            if len(table) > self.max_entities:
+                table.popitem(last=False)
+        return entity
+
+    @staticmethod
+    def _keys(tx: Dict[str, Any]) -> Tuple[str, Tuple[str, str]]:
+        vendor = normalize_name(tx.get("vendor"))
+        return vendor, (vendor, normalize_name(tx.get("agency")))
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        tx = record.get("input", {})
+        ts = record_epoch(record)
+        if ts < time.time() - self.horizon:
+            return  # already outside every window
+        amount = float(tx.get("amount") or 0)
+        vendor_key, pair_key = self._keys(tx)
+        self._entity(self.vendors, vendor_key, create=True).add(ts, amount)
+        self._entity(self.pairs, pair_key, create=True).add(ts, amount)
+
+    def _to_arrays(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def _from_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        pass
+
+    # ----- queries -----
+    def snapshot(self, tx: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Window counts and sums for one transaction's vendor and (vendor, agency) pair"""
+        now = time.time() if now is None else now
+        vendor_key, pair_key = self._keys(tx)
+        result = {}
+        with self._lock:
+            for label, table, key in (("vendor", self.vendors, vendor_key), ("vendor_agency", self.pairs, pair_key)):
+                entity = self._entity(table, key, create=False)
+                values = entity.query(now) if entity else {name: (0, 0.0) for name in self.windows}
+                result[label] = {name: {"count": count, "sum": round(total, 2)} for name, (count, total) in values.items()}
+        return result
+
+    def features(self, txs: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+        """Rule context arrays: vendor_/pair_ count and sum per window, 24h-vs-30d volume ratio"""
+        now = time.time() if now is None else now
+        snapshots = [self.snapshot(tx, now) for tx in txs]
+        # Earlier rows of the same batch are not stored until after scoring: add them to every window
+        seen: Dict[Any, List[float]] = {}
+        for tx, snap in zip(txs, snapshots):
+            amount = float(tx.get("amount") or 0)
+            for label, key in zip(("vendor", "vendor_agency"), self._keys(tx)):
+                count, total = seen.setdefault((label, key), [0, 0.0])
+                if count:
+                    for window in snap[label].values():
+                        window["count"] += count
+                        window["sum"] = round(window["sum"] + total, 2)
+                seen[(label, key)] = [count + 1, total + amount]
+        features: Dict[str, Any] = {"velocity": snapshots}
+        for prefix, label in (("vendor", "vendor"), ("pair", "vendor_agency")):
+            for name in self.windows:
+                features[f"{prefix}_count_{name}"] = np.array([s[label][name]["count"] for s in snapshots])
+                features[f"{prefix}_sum_{name}"] = np.array([s[label][name]["sum"] for s in snapshots], dtype=np.float64)
+
+        if "24h" in self.windows and "30d" in self.windows:
+            daily_avg = features["vendor_sum_30d"] / 30
+            with np.errstate(invalid="ignore", divide="ignore"):
+                features["vendor_volume_ratio"] = np.where(daily_avg > 0, features["vendor_sum_24h"] / daily_avg, 0.0)
+        return features
+
+    def report(self, features: Dict[str, Any], i: int) -> Dict[str, Any]:
+        """Per-transaction output fragment (prediction['velocity'])"""
+        return features["velocity"][i]